@@ -9,7 +9,7 @@ from fastapi import APIRouter
 from app.api import contact_email
 from app.kb.loader import get_entry_with_rag
 from app.summarize.llm import _get_groq_key
-from groq import Groq
+from app.summarize.client import achat
 
 from pydantic import BaseModel
 from typing import List, Dict, Any
@@ -24,8 +24,10 @@ router.include_router(contact_email.router)
 
 # --- Reports Endpoints (moved from report_api.py) ---
 from app.storage import reports_store as store
-from fastapi import Query
+from app.storage.reports_store import ReportQuery
+from fastapi import Query, Header
 from typing import Optional
+from datetime import date
 
 @router.get("/report/{rid}")
 def get_report(rid: str):
@@ -35,19 +37,37 @@ def get_report(rid: str):
     return rep
 
 @router.get("/reports")
-def list_reports(page: int = Query(1, ge=1), page_size: int = Query(10, ge=1, le=100)):
-    total, items = store.list_paginated(page, page_size)
-    def extract_field(item, key):
-        # Try top-level, then context dict
-        return item.get(key) or item.get("context", {}).get(key)
-    return {"total": total, "items": [
+def list_reports(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from a previous page"),
+    q: Optional[str] = Query(None, description="Search report name and test names (prefix match)"),
+    sex: Optional[str] = Query(None),
+    age_min: Optional[int] = Query(None, ge=0),
+    age_max: Optional[int] = Query(None, ge=0),
+    status: Optional[str] = Query(None),
+    flagged_test: Optional[str] = Query(None, description="Only reports where this test was flagged"),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+):
+    # Reads only the summary columns; full report documents are never loaded for listing.
+    query = ReportQuery(q=q, sex=sex, age_min=age_min, age_max=age_max, status=status,
+                        flagged_test=flagged_test, date_from=date_from, date_to=date_to)
+    try:
+        items, next_cursor = store.list_summaries(cursor=cursor, limit=page_size,
+                                                  offset=0 if cursor else (page - 1) * page_size,
+                                                  query=query)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+    return {"total": store.count(query), "next_cursor": next_cursor, "items": [
         {
-            "id": extract_field(item, "id") or extract_field(item, "report_id"),
-            "report_name": extract_field(item, "report_name") or "Lab Report",
-            "age": extract_field(item, "age"),
-            "sex": extract_field(item, "sex"),
-            "filename": item.get("filename") or extract_field(item, "report_name") or "report.pdf",
-            "status": item.get("status") or "done",
+            "id": item["id"],
+            "report_name": item["report_name"] or "Lab Report",
+            "age": item["age"],
+            "sex": item["sex"],
+            "filename": item["filename"] or item["report_name"] or "report.pdf",
+            "status": item["status"] or "done",
+            "created_at": item["created_at"],
         } for item in items
     ]}
 
@@ -89,7 +109,7 @@ async def chatbot(body: ChatbotRequest):
         test_name = test_match.group(1).strip().lower()
         value = test_match.group(2)
         unit = test_match.group(3)
-        kb = get_entry_with_rag(KB, test_name)
+        kb = get_entry_with_rag(get_kb(), test_name)
         if kb:
             # Compose a short KB-based answer
             status = ''
@@ -122,14 +142,13 @@ async def chatbot(body: ChatbotRequest):
         print('[DEBUG] /api/chatbot: About to get GROQ key')
         key = _get_groq_key() or ''
         print(f'[DEBUG] /api/chatbot: GROQ key = {key[:6]}...')
-        client = Groq(api_key=key)
-        print('[DEBUG] /api/chatbot: Created Groq client')
         print('[DEBUG] /api/chatbot: About to call Groq completion')
-        completion = client.chat.completions.create(
+        completion = await achat(
             model="llama-3.3-70b-versatile",
             messages=chat_msgs,
             temperature=0.3,
             max_tokens=400,
+            priority="interactive",
         )
         print('[DEBUG] /api/chatbot: Got completion')
         content = completion.choices[0].message.content.strip()
@@ -143,25 +162,33 @@ async def chatbot(body: ChatbotRequest):
 # app/api/routes.py
 
 
-from typing import List, Dict, Any, Optional, Tuple
-import uuid, re, io
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
+import asyncio, time, uuid, re
 
 
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from app.storage import reports_store as store
-from app.ingest.parser import parse_pdf_bytes, normalize_test_name
+from app.ingest.parser import parse_upload, normalize_test_name
+from app.ingest.pool import get_parse_pool, ParsePoolSaturated
+from app.ingest.cache import get_parse_cache, parse_key
 from app.normalize.unit_normalization import normalize_units_for_test
-from app.normalize.normalized_values import is_recognized_unit
-from app.kb.loader import load_kb, get_entry_with_rag
-from app.summarize.llm import summarize_results_structured, _get_groq_key
-from app.rag.store import get_rag_store, RangeDoc
+from app.normalize.normalized_values import is_recognized_unit, canonical_unit
+from app.core.resolver import RangeIndex, classify, evaluate_batch
+from app.kb.loader import get_entry_with_rag
+from app.kb.compiled import get_kb
+from app.normalize.name_resolver import get_name_resolver
+from app.summarize.llm import summarize_results_structured, stream_structured_summary, _get_groq_key, _compose_summary
+from app.kb.range_lookup import get_range_lookup
+from app.core.latency import MODES, analyze_mode, get_latency_tracker
+from app.core.deadline import Deadline
 import os, json
-from PyPDF2 import PdfReader
 
 # Use the router defined at the top of the file
-KB: Dict[str, Any] = load_kb()
 DEBUG_PARSE_ECHO = True
 
+def _analyzer_version() -> str:
+    return f"v2.0.0+kb.{get_kb().version}"
+
 def _build_disclaimer() -> str:
     return ("⚠️ NutriScope is an AI-powered tool designed to help you understand your lab reports. "
             "We use standard reference ranges for children, adults, and elderly patients, which may differ slightly from your testing "
@@ -179,123 +206,29 @@ def _title_from_kb_key(k: str) -> str:
                   .replace("Hdl", "HDL")
                   .replace("Tg", "TG"))
 
-# ---------------- Fallback text parsing (when table parser returns 0) --------
-CBC_FALLBACK_PATTERNS = [
-    (r"White\s*Blood\s*Cell\s*\(WBC\)\s*[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "white blood cell (wbc)"),
-    (r"Red\s*Blood\s*Cell\s*\(RBC\)\s*[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "red blood cell (rbc)"),
-    (r"Hemoglobin.*?\(HB\/?Hgb\)?\)?\s*[:\-]?\s*([\d.,]+)\s*(g\/dL)?", "hemoglobin"),
-    (r"Hematocrit.*?\(HCT\).*?[:\-]?\s*([\d.,]+)\s*(%)", "hematocrit"),
-    (r"Mean\s*Cell\s*Volume\s*\(MCV\).*?[:\-]?\s*([\d.,]+)\s*(fL)?", "mean cell volume (mcv)"),
-    (r"Mean\s*Cell\s*Hemoglobin\s*\(MCH\).*?[:\-]?\s*([\d.,]+)\s*(pg)?", "mean cell hemoglobin (mch)"),
-    (r"Mean\s*Cell\s*Hb\s*Conc\s*\(MCHC\).*?[:\-]?\s*([\d.,]+)\s*(g\/dL)?", "mean cell hb conc (mchc)"),
-    (r"Red\s*Cell\s*Dist\s*Width\s*\(RDW\).*?[:\-]?\s*([\d.,]+)\s*(%)", "red cell dist width (rdw)"),
-    (r"Platelet\s*count\s*[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "platelet count"),
-    (r"Mean\s*Platelet\s*Volume.*?[:\-]?\s*([\d.,]+)\s*(fL)?", "mean platelet volume (mpv)"),
-    (r"Neutrophil.*?\(Neut\).*?[:\-]?\s*([\d.,]+)\s*(%)", "neutrophils %"),
-    (r"Lymphocyte.*?\(Lymph\).*?[:\-]?\s*([\d.,]+)\s*(%)", "lymphocytes %"),
-    (r"Monocyte.*?\(Mono\).*?[:\-]?\s*([\d.,]+)\s*(%)", "monocytes %"),
-    (r"Eosinophil.*?\(Eos\).*?[:\-]?\s*([\d.,]+)\s*(%)", "eosinophils %"),
-    (r"Basophil.*?\(Baso\).*?[:\-]?\s*([\d.,]+)\s*(%)", "basophils %"),
-    (r"Neutrophil.*?Absolute.*?[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "absolute neutrophils"),
-    (r"Lymphocyte.*?Absolute.*?[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "absolute lymphocytes"),
-    (r"Monocyte.*?Absolute.*?[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "absolute monocytes"),
-    (r"Eosinophil.*?Absolute.*?[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "absolute eosinophils"),
-    (r"Basophil.*?Absolute.*?[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "absolute basophils"),
-]
-
-def _extract_rows_from_pdf_text_fallback(pdf_bytes: bytes) -> List[Dict[str, Any]]:
-    try:
-        reader = PdfReader(io.BytesIO(pdf_bytes))
-        text = "\n".join([page.extract_text() or "" for page in reader.pages])
-    except Exception:
-        return []
-    rows: List[Dict[str, Any]] = []
-    for pat, kb_like_name in CBC_FALLBACK_PATTERNS:
-        m = re.search(pat, text, flags=re.IGNORECASE | re.DOTALL)
-        if not m: continue
-        raw_val = (m.group(1) or "").replace(",", "")
-        try:
-            val = float(raw_val)
-        except Exception:
-            continue
-        unit = (m.group(2) or "").strip() if m.lastindex and m.lastindex >= 2 else ""
-        # reasonable defaults when unit omitted
-        if kb_like_name in {"white blood cell (wbc)", "platelet count"} and not unit:
-            unit = "K/uL"
-        if kb_like_name == "red blood cell (rbc)" and not unit:
-            unit = "M/uL"
-        if kb_like_name.startswith("absolute ") and not unit:
-            unit = "K/uL"
-        rows.append({"test": kb_like_name, "value": val, "unit": unit})
-    return rows
-
 # ---------------- Name resolution & status ----------------------------------
 def _resolve_kb_key(name: str) -> Optional[str]:
-    if not name: return None
-    n = (name or "").strip().lower()
-    if n in KB: return n
-    if n.endswith(" %") and n[:-2].strip() in KB:
-        return n[:-2].strip()
-    no_parens = re.sub(r"\s*\([^)]*\)\s*", "", n).strip()
-    if no_parens in KB: return no_parens
-
-    m = re.search(r"\(([^)]+)\)", n)
-    if m:
-        for a in re.split(r"[\/\s,]+", m.group(1).strip().lower()):
-            if not a: continue
-            if a in KB: return a
-            if f"{a} %" in KB: return f"{a} %"
-        EXPAND = {
-            "hb": "hemoglobin", "hgb": "hemoglobin", "hct": "hematocrit",
-            "wbc": "white blood cell", "rbc": "red blood cell",
-            "mcv": "mean corpuscular volume (mcv)",
-            "mch": "mean corpuscular hemoglobin (mch)",
-            "mchc": "mean corpuscular hemoglobin concentration (mchc)",
-            "rdw": "red cell distribution width (rdw)",
-            "mpv": "mean platelet volume (mpv)",
-            "plt": "platelet count",
-            "vit d": "vitamin d (25-oh)", "vitamin d3": "vitamin d (25-oh)",
-        }
-        lf = EXPAND.get(m.group(1).strip().lower())
-        if lf and lf in KB:
-            return lf
-
-    CANON = {
-        "white blood cell (wbc)": ["wbc", "white blood cell"],
-        "red blood cell (rbc)": ["rbc", "red blood cell"],
-        "hemoglobin (hb/hgb)": ["hemoglobin", "hb", "hgb"],
-        "hematocrit (hct)": ["hematocrit", "hct"],
-        "mean cell volume (mcv)": ["mcv", "mean corpuscular volume (mcv)"],
-        "mean cell hemoglobin (mch)": ["mch", "mean corpuscular hemoglobin (mch)"],
-        "mean cell hb conc (mchc)": ["mchc", "mean corpuscular hemoglobin concentration (mchc)"],
-        "red cell dist width (rdw)": ["rdw", "red cell distribution width (rdw)"],
-        "mean platelet volume": ["mpv", "mean platelet volume (mpv)"],
-        "neutrophil (neut)": ["neutrophils %", "neutrophils"],
-        "lymphocyte (lymph)": ["lymphocytes %", "lymphocytes"],
-        "monocyte (mono)": ["monocytes %", "monocytes"],
-        "eosinophil (eos)": ["eosinophils %", "eosinophils"],
-        "basophil (baso)": ["basophils %", "basophils"],
-        "platelet count": ["platelet count", "platelets", "plt"],
-        "vitamin d (25-oh)": ["vit d", "vitamin d", "vitamin d3"],
-    }
-    for k, variants in CANON.items():
-        if n == k or n in variants:
-            for v in [n, k, *variants]:
-                if v in KB: return v
+    return get_name_resolver().resolve(name)
+
+RangeFetch = Callable[[str, int, str], Awaitable[Optional[Dict[str, Any]]]]
 
-    simp = " ".join(n.split())
-    return simp if simp in KB else None
+async def _llm_range(name: str, age: int, sex: str) -> Optional[Dict[str, Any]]:
+    if not _get_groq_key():
+        return None
+    # a report is waiting on the answer: queue with summaries, not behind them
+    return await get_range_lookup().lookup(name, age, sex, priority="summary")
 
-def _apply_range_and_status(
-    kb_key_in: str, value: Optional[float], unit: str, age: int, sex: str
+async def _apply_range_and_status(
+    kb_key_in: str, value: Optional[float], unit: str, age: int, sex: str, kb_key: Optional[str] = None,
+    llm_range: RangeFetch = _llm_range, deadline: Optional[Deadline] = None,
 ) -> Dict[str, Any]:
-    kb_key = _resolve_kb_key(kb_key_in)
-    kb_entry = KB.get(kb_key) if kb_key else None
+    kb_key = kb_key or _resolve_kb_key(kb_key_in)
+    kb_entry = get_kb().entry_for_unit(kb_key, unit) if kb_key else None
 
 
     # RAG fallback if static KB misses it
     if not kb_entry:
-        rag_entry = get_entry_with_rag(KB, kb_key_in) if kb_key_in else None
+        rag_entry = get_entry_with_rag(get_kb(), kb_key_in, deadline) if kb_key_in else None
         if rag_entry and isinstance(rag_entry, dict) and rag_entry.get("ranges"):
             kb_entry = rag_entry
             kb_key = kb_key or kb_key_in
@@ -305,113 +238,63 @@ def _apply_range_and_status(
     if not kb_entry or not kb_entry.get("ranges") or all((r.get("low") is None and r.get("high") is None) for r in kb_entry.get("ranges", [])):
         needs_llm = True
     if needs_llm:
-        groq_key = _get_groq_key()
-        if groq_key:
-            from groq import Groq
-            client = Groq(api_key=groq_key)
-            try:
-                models = []
-                if "_discover_models" in globals():
-                    from app.summarize.llm import _discover_models
-                    models = _discover_models(client)
-                if not models:
-                    models = [os.getenv("GROQ_MODEL", "llama-2-70b-4096")]
-                model_to_use = models[0] if models else "llama-2-70b-4096"
-                prompt = f"For the lab test '{kb_key_in}', what is the standard unit and reference range for a {age}-year-old {sex}? Provide a JSON with keys: unit, ranges (list of dicts with low/high), and advice (dict with 'low' and 'high')."
-                completion = client.chat.completions.create(
-                    model=model_to_use,
-                    messages=[
-                        {"role": "system", "content": "You are a medical assistant AI."},
-                        {"role": "user", "content": prompt},
-                        {"role": "system", "content": "Return ONLY valid JSON. No prose."},
-                    ],
-                    temperature=0.1,
-                    max_tokens=400,
-                    response_format={"type": "json_object"},
-                )
-                content = completion.choices[0].message.content.strip()
-                data = json.loads(content)
-                kb_entry = {
-                    "unit": data.get("unit"),
-                    "ranges": data.get("ranges", []),
-                    "advice": data.get("advice", {}),
-                    "source": "groq_llm"
-                }
-                # Optionally, cache to RAG
-                try:
-                    doc = RangeDoc(
-                        id=f"groq_{kb_key_in}",
-                        test_name=kb_key_in,
-                        unit=data.get("unit"),
-                        ranges=data.get("ranges", []),
-                        source="groq_llm",
-                        notes="Auto-added from Groq LLM"
-                    )
-                    rag_store = get_rag_store()
-                    rag_store.add_docs([doc])
-                except Exception as e:
-                    print(f"[RAG] Could not cache Groq doc: {e}")
-            except Exception as e:
-                print(f"[GROQ] Exception getting info for {kb_key_in}: {e}")
+        kb_entry = await llm_range(kb_key_in, age, sex) or kb_entry
         if not kb_entry:
             return {"applied_range": {"low": None, "high": None, "source": "NONE", "note": "not_in_kb"}, "status": "needs_review"}
 
-    # Convert value into the unit the KB expects (no hardcoding)
+    # Compare directly when the KB has a table in this unit; otherwise convert
+    # the value into the unit of the table we fell back to (no hardcoding)
     kb_unit = (kb_entry.get("unit") or "").strip() or None
-    norm_value, norm_unit = normalize_units_for_test(kb_key, value, unit, kb_unit)
-
-    applied = {"low": None, "high": None, "source": "KB", "note": None}
-    ranges = kb_entry.get("ranges") or []
-
-    # fixed low/high
-    chosen = None
-    for r in ranges:
-        applies = (r.get("applies") or {})
-        s_ok = applies.get("sex") in (None, "any", sex)
-        a_min = applies.get("age_min"); a_max = applies.get("age_max")
-        a_ok = (a_min is None or age >= a_min) and (a_max is None or age <= a_max)
-        if s_ok and a_ok and ("low" in r or "high" in r):
-            chosen = r; break
-
-    if chosen is not None:
-        low, high = chosen.get("low"), chosen.get("high")
-        # Ensure low/high are floats if possible
-        try:
-            low_f = float(low) if low is not None else None
-        except Exception:
-            low_f = None
-        try:
-            high_f = float(high) if high is not None else None
-        except Exception:
-            high_f = None
-        applied["low"], applied["high"] = low, high
-        if kb_unit: applied["unit"] = kb_unit
-        if norm_value is None:
-            return {"applied_range": applied, "status": "needs_review"}
-        if low_f is not None and norm_value < low_f:
-            return {"applied_range": applied, "status": "low"}
-        if high_f is not None and norm_value > high_f:
-            return {"applied_range": applied, "status": "high"}
-        return {"applied_range": applied, "status": "normal"}
-
-    # banded categories
-    band_holder = next((r for r in ranges if (r.get("applies") or {}).get("sex") in (None, "any", sex) and r.get("bands")), None)
-    if norm_value is not None and band_holder and band_holder.get("bands"):
-        for b in band_holder["bands"]:
-            b_min = float("-inf") if b.get("min") is None else b.get("min")
-            b_max = float("inf") if b.get("max") is None else b.get("max")
-            if b_min <= norm_value <= b_max:
-                label = (b.get("label") or "").lower()
-                status = "normal" if label in ("normal", "optimal", "sufficient") else label or "needs_review"
-                applied["low"], applied["high"] = b.get("min"), b.get("max")
-                applied["note"] = "banded"
-                if kb_unit: applied["unit"] = kb_unit
-                return {"applied_range": applied, "status": status}
-        return {"applied_range": {"low": None, "high": None, "source": "KB", "note": "band_no_match"}, "status": "needs_review"}
-
-    return {"applied_range": {"low": None, "high": None, "source": "KB", "note": "no_applicable_range"}, "status": "needs_review"}
+    if kb_entry.get("unit_matched"):
+        norm_value = value
+    else:
+        norm_value, norm_unit = normalize_units_for_test(kb_key, value, unit, kb_unit)
+
+    idx = kb_entry.get("range_index") or RangeIndex(kb_entry.get("ranges"))
+    return classify(idx.lookup(age, sex), norm_value, kb_unit)
+
+async def _apply_ranges_batch(
+    items: List[Tuple[str, Optional[str], Optional[float], str]], age: int, sex: str,
+    llm_range: RangeFetch = _llm_range, deadline: Optional[Deadline] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Range/status for a whole report's KB-evaluated rows in one pass.
+    Rows the static KB covers go through the precompiled range indexes together;
+    the rest take the per-row RAG/LLM path in _apply_range_and_status.
+    """
+    out: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    hits: List[Tuple[int, Tuple[RangeIndex, Optional[float], Optional[str]]]] = []
+    for i, (kb_key_in, kb_key, value, unit) in enumerate(items):
+        kb_entry = get_kb().entry_for_unit(kb_key, unit) if kb_key else None
+        if not kb_entry or not kb_entry["range_index"]:
+            out[i] = await _apply_range_and_status(kb_key_in, value, unit, age, sex, kb_key=kb_key,
+                                                    llm_range=llm_range, deadline=deadline)
+            continue
+        kb_unit = (kb_entry.get("unit") or "").strip() or None
+        if not kb_entry["unit_matched"]:
+            value, _ = normalize_units_for_test(kb_key, value, unit, kb_unit)
+        hits.append((i, (kb_entry["range_index"], value, kb_unit)))
+    for (i, _), rs in zip(hits, evaluate_batch([h for _, h in hits], age, sex)):
+        out[i] = rs
+    return out
 
 # ---------------- Summary helpers ------------------------------------------
+def _kb_per_test(r: Dict[str, Any], kb_key: Optional[str]) -> Dict[str, Any]:
+    """per_test entry for a flagged result, built from the KB alone."""
+    kb_entry = (get_kb().get(kb_key) if kb_key else None) or {}
+    return {
+        "test": r.get("test"),
+        "value": str(r.get("value", "")),
+        "unit": r.get("unit", ""),
+        "status": r.get("status", ""),
+        "importance": kb_entry.get("importance") or "",
+        "why_low": kb_entry.get("why_low") or [],
+        "why_high": kb_entry.get("why_high") or [],
+        "risks_if_low": kb_entry.get("risks_if_low") or [],
+        "risks_if_high": kb_entry.get("risks_if_high") or [],
+        "next_steps": kb_entry.get("next_steps") or [],
+    }
+
 def _fallback_summary(context: Dict[str, Any], results: List[Dict[str, Any]]) -> str:
     age = context.get("age"); sex = context.get("sex")
     if not results:
@@ -441,36 +324,178 @@ async def analyze_report(
     age: Optional[int] = Form(None),
     sex: Optional[str] = Form(None),
     file: UploadFile = File(...),
+    mode: Optional[str] = Query(None, pattern="^(fast|llm|auto)$",
+                                description="fast = KB only, llm = always use the LLM, auto = LLM only if the latency budget allows"),
+    x_request_deadline_ms: Optional[int] = Header(None, ge=1, description="Overall time budget for this request"),
 ):
+    deadline = Deadline.for_request(x_request_deadline_ms)   # started before the upload is read
     raw_bytes = await file.read()
+    try:
+        response = await run_analysis(raw_bytes, file.filename, report_name, age, sex, mode=mode, deadline=deadline)
+    except ParsePoolSaturated as e:
+        raise HTTPException(status_code=503, detail="parser_busy", headers={"Retry-After": str(e.retry_after)})
+    return JSONResponse(status_code=200, content=response)
 
-    # 1) Primary parser
+_stream_tasks: set = set()
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+# ---------------- Endpoint: /api/analyze/stream ----------------------------
+@router.post("/analyze/stream")
+async def analyze_report_stream(
+    report_name: Optional[str] = Form(None),
+    age: Optional[int] = Form(None),
+    sex: Optional[str] = Form(None),
+    file: UploadFile = File(...),
+    mode: Optional[str] = Query(None, pattern="^(fast|llm|auto)$"),
+    x_request_deadline_ms: Optional[int] = Header(None, ge=1),
+):
+    """
+    Same analysis as /api/analyze, delivered as Server-Sent Events while it runs:
+    `results` (parsed rows with statuses), `summary` (KB narrative, per_test and
+    diet lists), then `per_test` and `meal` as the LLM writes them, and finally
+    `done` with the stored report (or `error`).
+    """
+    deadline = Deadline.for_request(x_request_deadline_ms)
+    raw_bytes = await file.read()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run() -> None:
+        try:
+            report = await run_analysis(raw_bytes, file.filename, report_name, age, sex, mode=mode,
+                                        deadline=deadline, on_event=lambda ev, data: queue.put_nowait((ev, data)))
+            queue.put_nowait(("done", report))
+        except ParsePoolSaturated as e:
+            queue.put_nowait(("busy", e.retry_after))
+        except Exception as e:
+            print(f"[ANALYZE] Streamed analysis failed: {e}")
+            queue.put_nowait(("error", {"detail": str(e)}))
+        finally:
+            queue.put_nowait(None)
+
+    # the analysis outlives a disconnected client, so the report still gets stored
+    task = asyncio.create_task(run())
+    _stream_tasks.add(task)
+    task.add_done_callback(_stream_tasks.discard)
+
+    # nothing is sent before parsing is over, so a full parse pool can still be a 503
+    first = await queue.get()
+    if first and first[0] == "busy":
+        raise HTTPException(status_code=503, detail="parser_busy", headers={"Retry-After": str(first[1])})
+
+    async def events():
+        item = first
+        while item is not None:
+            yield _sse(*item)
+            item = await queue.get()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def run_analysis(
+    raw_bytes: bytes,
+    filename: Optional[str],
+    report_name: Optional[str],
+    age: Optional[int],
+    sex: Optional[str],
+    progress: Optional[Callable[..., None]] = None,
+    mode: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+    on_event: Optional[Callable[[str, Any], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Full analyze pipeline shared by /api/analyze, /api/analyze/stream and the background job queue.
+    `progress(stage, **info)` is called after each stage: parsed, evaluated, summarized.
+    `on_event(event, data)` receives partial output as soon as it exists: "results",
+    "summary" (KB based), then "per_test" / "meal" while the LLM streams its answer.
+    `mode` (default ANALYZE_MODE): "fast" builds per_test, summary and diet lists
+    from the KB alone; "llm" always asks the LLM; "auto" asks it only while the
+    request is inside the p99 latency target, and falls back to the KB otherwise.
+    Any other explicit `mode` raises ValueError.
+    `deadline` (default ANALYZE_DEADLINE_MS) bounds the whole run: OCR pages,
+    RAG queries and LLM calls that no longer fit are skipped and listed in
+    meta.skipped.
+    Returns the stored report document.
+    """
+    t0 = time.monotonic()
+    if mode is not None and mode.strip().lower() not in MODES:
+        raise ValueError(f"unknown analyze mode: {mode!r} (expected one of {', '.join(MODES)})")
+    mode = analyze_mode(mode)
+    deadline = deadline or Deadline.for_request()
+    tracker = get_latency_tracker()
+    llm_allowed = mode != "fast" and bool(_get_groq_key())
+
+    def _stage(name: str, **info: Any) -> None:
+        if progress:
+            progress(name, **info)
+
+    def _emit(event: str, data: Any) -> None:
+        if on_event:
+            on_event(event, data)
+
+    def _budget_left() -> Optional[float]:
+        # seconds the LLM may still use: the request deadline and, in auto mode, the
+        # p99 target minus a 10% margin for everything after the LLM (None = unbounded)
+        lefts = [deadline.remaining()]
+        if mode == "auto":
+            lefts.append(tracker.p99_target_ms * 0.9 / 1000.0 - (time.monotonic() - t0))
+        lefts = [x for x in lefts if x is not None]
+        return max(0.0, min(lefts)) if lefts else None
+
+    async def _range_for_mode(name: str, age_: int, sex_: str) -> Optional[Dict[str, Any]]:
+        if not llm_allowed:
+            return None
+        left = _budget_left()
+        if left is not None and left <= 0:
+            deadline.skip(f"llm_range:{name}")
+            return None
+        try:
+            # the lookup itself is shielded: it finishes and gets cached for the next report
+            return await asyncio.wait_for(_llm_range(name, age_, sex_), left)
+        except asyncio.TimeoutError:
+            deadline.skip(f"llm_range:{name}")
+            return None
+
+    # 1) Primary parser + OCR/text fallback, off the event loop in the parse pool,
+    #    unless these exact bytes were parsed before (age/sex only matter from step 2 on)
+    parse_cache = get_parse_cache()
+    cache_key = parse_key(raw_bytes) if parse_cache.enabled else None
+    cached_parse = await asyncio.to_thread(parse_cache.get, cache_key) if cache_key else None
+    parse_cache_state = "off" if cache_key is None else ("hit" if cached_parse is not None else "miss")
     try:
-        parsed = parse_pdf_bytes(raw_bytes)
-        rows, ocr_confidence = (parsed if isinstance(parsed, tuple) else (parsed, 0.95))
-        if not rows:
-            # 2) OCR/text fallback (very tolerant)
-            rows = _extract_rows_from_pdf_text_fallback(raw_bytes)
+        if cached_parse is not None:
+            rows, ocr_confidence = cached_parse["rows"], float(cached_parse["ocr_confidence"])
+        else:
+            rows, ocr_confidence, parse_skipped, parse_text = await get_parse_pool().run(parse_upload, raw_bytes, deadline)
+            deadline.merge(parse_skipped)
+            if cache_key and not parse_skipped:   # a parse cut short (deadline, OCR missing/failed) is not the upload's real content
+                await asyncio.to_thread(parse_cache.put, cache_key, rows, ocr_confidence, parse_text)
+    except ParsePoolSaturated:
+        raise
     except Exception as e:
         response = {
             "context": {"age": age, "sex": sex, "report_name": report_name, "report_id": str(uuid.uuid4())},
             "results": [], "diet_plan": None, "summary_text": None, "disclaimer": _build_disclaimer(),
             "issues": [f"parse_error: {e}"], "status": "needs_review",
-            "meta": {"ocr_confidence": 0.0, "analyzer_version": "v2.0.0", "groq_used": False},
+            "meta": {"ocr_confidence": 0.0, "analyzer_version": _analyzer_version(), "groq_used": False,
+                     "parse_cache": parse_cache_state, **deadline.meta()},
         }
         response["id"] = response["context"]["report_id"]
-        response.setdefault("filename", file.filename or "report.pdf")
+        response.setdefault("filename", filename or "report.pdf")
         try: store.add(response)
         except Exception: pass
-        return JSONResponse(status_code=200, content=response)
+        return response
+
+    _stage("parsed", rows=len(rows))
 
     age_eff = int(age) if age is not None else 30
     sex_eff = (sex or "any").lower()
     parsed_results: List[Dict[str, Any]] = []
     debug_rows: List[Dict[str, Any]] = []
     aliased_count = 0
-
-    rag_store = get_rag_store()
+    kb_pending: List[Tuple[int, Tuple[str, Optional[str], Optional[float], str]]] = []
+    parsed_keys: List[Optional[str]] = []   # resolved KB key per parsed_results entry
 
     # If no valid test results, block meal/summary and show message
     if not rows or len([r for r in rows if r.get('test') and r.get('value') is not None]) == 0:
@@ -483,13 +508,14 @@ async def analyze_report(
             "disclaimer": _build_disclaimer(),
             "issues": ["no_rows_parsed"],
             "status": "needs_review",
-            "meta": {"ocr_confidence": float(locals().get("ocr_confidence", 0.0)), "analyzer_version": "v2.0.0", "groq_used": False},
+            "meta": {"ocr_confidence": float(locals().get("ocr_confidence", 0.0)), "analyzer_version": _analyzer_version(), "groq_used": False,
+                     "parse_cache": parse_cache_state, **deadline.meta()},
         }
         response["id"] = response["context"]["report_id"]
-        response.setdefault("filename", file.filename or "report.pdf")
+        response.setdefault("filename", filename or "report.pdf")
         try: store.add(response)
         except Exception: pass
-        return JSONResponse(status_code=200, content=response)
+        return response
 
     # List of phrases to ignore as non-test rows
     IGNORE_ROW_PREFIXES = [
@@ -523,71 +549,28 @@ async def analyze_report(
             aliased_count += 1
 
         # Try KB, then RAG, then Groq LLM for test info
-        kb_key_for_unit = _resolve_kb_key(kb_key_in) or kb_key_in
+        # resolve the KB key once; everything below reuses it
+        kb_key = _resolve_kb_key(kb_key_in)
+        kb_key_for_unit = kb_key or kb_key_in
         kb_unit = None
-        kb_entry_for_unit = KB.get(kb_key_for_unit)
+        kb_entry_for_unit = get_kb().entry_for_unit(kb_key_for_unit, unit)
         if not kb_entry_for_unit:
-            rag_entry = get_entry_with_rag(KB, kb_key_for_unit)
+            rag_entry = get_entry_with_rag(get_kb(), kb_key_for_unit, deadline)
             if rag_entry:
                 kb_entry_for_unit = rag_entry
-        # If still not found, call Groq LLM for info
+        # If still not found, ask the LLM (cached and shared with _apply_range_and_status)
         if not kb_entry_for_unit:
-            # Compose a prompt for Groq to get unit, range, advice
-            groq_key = _get_groq_key()
-            if groq_key:
-                from groq import Groq
-                client = Groq(api_key=groq_key)
-                # Try to auto-discover available models
-                try:
-                    models = []
-                    if "_discover_models" in globals():
-                        from app.summarize.llm import _discover_models
-                        models = _discover_models(client)
-                    if not models:
-                        models = [os.getenv("GROQ_MODEL", "llama-2-70b-4096")]  # fallback to a likely available model
-                    model_to_use = models[0] if models else "llama-2-70b-4096"
-                    prompt = f"For the lab test '{raw_name}', what is the standard unit and reference range for a {age_eff}-year-old {sex_eff}? Provide a JSON with keys: unit, ranges (list of dicts with low/high), and advice (dict with 'low' and 'high')."
-                    completion = client.chat.completions.create(
-                        model=model_to_use,
-                        messages=[
-                            {"role": "system", "content": "You are a medical assistant AI."},
-                            {"role": "user", "content": prompt},
-                            {"role": "system", "content": "Return ONLY valid JSON. No prose."},
-                        ],
-                        temperature=0.1,
-                        max_tokens=400,
-                        response_format={"type": "json_object"},
-                    )
-                    content = completion.choices[0].message.content.strip()
-                    data = json.loads(content)
-                    # Compose a KB-like entry
-                    kb_entry_for_unit = {
-                        "unit": data.get("unit"),
-                        "ranges": data.get("ranges", []),
-                        "advice": data.get("advice", {}),
-                        "source": "groq_llm"
-                    }
-                    # Optionally, cache to RAG
-                    try:
-                        doc = RangeDoc(
-                            id=f"groq_{kb_key_for_unit}",
-                            test_name=kb_key_for_unit,
-                            unit=data.get("unit"),
-                            ranges=data.get("ranges", []),
-                            source="groq_llm",
-                            notes="Auto-added from Groq LLM"
-                        )
-                        rag_store.add_docs([doc])
-                    except Exception as e:
-                        print(f"[RAG] Could not cache Groq doc: {e}")
-                except Exception as e:
-                    print(f"[GROQ] Exception getting info for {raw_name}: {e}")
+            kb_entry_for_unit = await _range_for_mode(kb_key_for_unit, age_eff, sex_eff)
         if kb_entry_for_unit:
             kb_unit = (kb_entry_for_unit.get("unit") or "").strip() or None
 
 
 
-        norm_value, norm_unit = normalize_units_for_test(kb_key_for_unit, value, unit, kb_unit)
+        if kb_entry_for_unit and kb_entry_for_unit.get("unit_matched"):
+            # the KB has a range table in the report's own unit: no conversion
+            norm_value, norm_unit = (float(value) if value is not None else None), canonical_unit(unit)
+        else:
+            norm_value, norm_unit = normalize_units_for_test(kb_key_for_unit, value, unit, kb_unit)
         # Ensure norm_value is float or None
         try:
             norm_value_f = float(norm_value) if norm_value is not None and norm_value != '' else None
@@ -649,9 +632,12 @@ async def analyze_report(
                         status = "high"
             rs = {"applied_range": applied, "status": status}
         else:
-            rs = _apply_range_and_status(kb_key_in, norm_value_f, norm_unit, age_eff, sex_eff)
+            # classified after the loop, together with the report's other KB rows
+            kb_pending.append((len(parsed_results), (kb_key_in, kb_key, norm_value_f, norm_unit)))
+            rs = {"applied_range": None, "status": None}
 
-        kb_key_resolved = _resolve_kb_key(kb_key_in) or kb_key_in
+        kb_key_resolved = kb_key_for_unit
+        parsed_keys.append(kb_key)
         parsed_results.append({
             "test": _title_from_kb_key(kb_key_resolved),
             "value": norm_value,
@@ -667,9 +653,19 @@ async def analyze_report(
                 "value": norm_value, "unit": norm_unit, "status": rs["status"], "applied": rs["applied_range"],
             })
 
+    if kb_pending:
+        batch = await _apply_ranges_batch([item for _, item in kb_pending], age_eff, sex_eff,
+                                          llm_range=_range_for_mode, deadline=deadline)
+        for (i, _), rs in zip(kb_pending, batch):
+            parsed_results[i].update(applied_range=rs["applied_range"], status=rs["status"])
+            if DEBUG_PARSE_ECHO:
+                debug_rows[i].update(status=rs["status"], applied=rs["applied_range"])
+
     # Only keep abnormal results (not 'normal')
-    abnormal_results = [r for r in parsed_results if r["status"] not in ("normal", "missing", "needs_review")]
+    abnormal = [(r, k) for r, k in zip(parsed_results, parsed_keys) if r["status"] not in ("normal", "missing", "needs_review")]
+    abnormal_results = [r for r, _ in abnormal]
     flagged_count = len(abnormal_results)
+    _stage("evaluated", results=len(parsed_results), flagged=flagged_count)
     if DEBUG_PARSE_ECHO:
         print(f"[DEBUG] rows_in={len(rows)} parsed={len(parsed_results)} aliased={aliased_count} flagged={flagged_count}")
         for dr in debug_rows[:30]:
@@ -677,18 +673,53 @@ async def analyze_report(
 
     # Diet suggestions (from KB only; RAG may not have advice)
     diet_add, diet_limit = [], []
-    for r in abnormal_results:
-        kb_key_adv = _resolve_kb_key(r["test"].lower())
-        adv = (KB.get(kb_key_adv) or {}).get("advice") or {}
+    for r, kb_key_adv in abnormal:
+        adv = (get_kb().get(kb_key_adv) or {}).get("advice") or {}
         if r["status"].startswith("low") and adv.get("low"): diet_add.append(adv["low"])
         if r["status"].startswith("high") and adv.get("high"): diet_limit.append(adv["high"])
     diet_add = sorted({x for x in diet_add if x}); diet_limit = sorted({x for x in diet_limit if x})
     diet_plan = {"add": diet_add, "limit": diet_limit} if (diet_add or diet_limit) else None
+    if on_event:
+        _emit("results", {"results": parsed_results, "flagged": flagged_count})
+        kb_per_test = [_kb_per_test(r, k) for r, k in abnormal if r["status"] in ("high", "low")]
+        _emit("summary", {
+            "summary_text": (_compose_summary({"age": age_eff, "sex": sex_eff}, abnormal_results, kb_per_test)
+                             if abnormal_results else "") or _fallback_summary({"age": age_eff, "sex": sex_eff}, parsed_results),
+            "per_test": kb_per_test,
+            "diet_plan": {"add": diet_add, "limit": diet_limit},
+        })
 
-    structured = summarize_results_structured({"age": age_eff, "sex": sex_eff}, abnormal_results) or {}
+    async def _summarize(ctx: Dict[str, Any]) -> Dict[str, Any]:
+        if not on_event:
+            return await summarize_results_structured(ctx, abnormal_results, deadline)
+        data: Dict[str, Any] = {}
+        async for event, item in stream_structured_summary(ctx, abnormal_results, deadline):
+            if event == "done":
+                data = item
+            else:
+                _emit(event, item)
+        return data
+
+    structured: Dict[str, Any] = {}
+    if mode == "llm" or (mode == "auto" and llm_allowed):
+        # auto: only start the LLM if a typical (p90) summary still fits in what is left of the budget
+        left = _budget_left()
+        estimate = tracker.percentile("llm.summary", 0.9) or float(os.getenv("ANALYZE_LLM_ESTIMATE_MS", "1500"))
+        if mode == "auto" and left is not None and left * 1000.0 < estimate:
+            deadline.skip("llm_summary")
+        else:
+            t_llm = time.monotonic()
+            try:
+                structured = await asyncio.wait_for(_summarize({"age": age_eff, "sex": sex_eff}), left) or {}
+            except asyncio.TimeoutError:
+                deadline.skip("llm_summary")
+            tracker.record("llm.summary", (time.monotonic() - t_llm) * 1000.0)
+    # the KB narrative stands in whenever the LLM was not used or gave nothing back
+    kb_only = not (structured.get("_debug") or {}).get("groq_used") and (mode != "llm" or "llm_summary" in deadline.skipped)
     if DEBUG_PARSE_ECHO:
         print("[DEBUG] LLM structured response:", json.dumps(structured, indent=2))
     llm_summary = structured.get("summary") or ""
+    _stage("summarized")
     llm_diet = structured.get("diet_plan") or {}
     llm_per_test = structured.get("per_test") or []
 
@@ -752,39 +783,27 @@ async def analyze_report(
             diet_plan = _fallback_meal_plan()
     else:
         diet_plan = _fallback_meal_plan()
+    if kb_only:
+        diet_plan = {**_fallback_meal_plan(), "add": diet_add, "limit": diet_limit}
 
     # Ensure all flagged (high/low) results are present in per_test, with KB details if missing
-    flagged = [r for r in parsed_results if r["status"] in ("high", "low")]
+    flagged = [(r, k) for r, k in abnormal if r["status"] in ("high", "low")]
     llm_per_test_names = {t.get("test", "").strip().lower() for t in llm_per_test}
-    for r in flagged:
+    for r, kb_key in flagged:
         tname = (r.get("test") or "").strip().lower()
         if tname and tname not in llm_per_test_names:
-            kb_key = _resolve_kb_key(tname)
-            kb_entry = KB.get(kb_key) if kb_key else None
-            importance = (kb_entry.get("importance") if kb_entry else "") or ""
-            why_low = (kb_entry.get("why_low") if kb_entry else []) or []
-            why_high = (kb_entry.get("why_high") if kb_entry else []) or []
-            risks_if_low = (kb_entry.get("risks_if_low") if kb_entry else []) or []
-            risks_if_high = (kb_entry.get("risks_if_high") if kb_entry else []) or []
-            next_steps = (kb_entry.get("next_steps") if kb_entry else []) or []
-            llm_per_test.append({
-                "test": r.get("test"),
-                "value": str(r.get("value", "")),
-                "unit": r.get("unit", ""),
-                "status": r.get("status", ""),
-                "importance": importance,
-                "why_low": why_low,
-                "why_high": why_high,
-                "risks_if_low": risks_if_low,
-                "risks_if_high": risks_if_high,
-                "next_steps": next_steps
-            })
+            llm_per_test.append(_kb_per_test(r, kb_key))
 
-    if not parsed_results or flagged_count > 0:
+    if kb_only and abnormal_results:
+        summary_text = (_compose_summary({"age": age_eff, "sex": sex_eff}, abnormal_results, llm_per_test)
+                        or _fallback_summary({"age": age_eff, "sex": sex_eff}, parsed_results)); groq_used = False
+    elif not parsed_results or flagged_count > 0:
         summary_text = _fallback_summary({"age": age_eff, "sex": sex_eff}, parsed_results); groq_used = False
     else:
         summary_text = llm_summary or _fallback_summary({"age": age_eff, "sex": sex_eff}, parsed_results)
         groq_used = bool(structured.get("_debug", {}).get("groq_used"))
+    if structured.get("_debug", {}).get("groq_used") == "cache":
+        groq_used = "cache"   # per_test/meals came from the summary cache, Groq was skipped
 
     overall_status = "analyzed" if parsed_results else "needs_review"
     response = {
@@ -793,15 +812,19 @@ async def analyze_report(
         "per_test": llm_per_test,
         "disclaimer": _build_disclaimer(), "issues": None if abnormal_results else ["no_rows_parsed"],
         "status": overall_status,
-        "meta": {"ocr_confidence": float(locals().get("ocr_confidence", 0.95)), "analyzer_version": "v2.0.0", "groq_used": groq_used},
+        "meta": {"ocr_confidence": float(locals().get("ocr_confidence", 0.95)), "analyzer_version": _analyzer_version(), "groq_used": groq_used,
+                 "mode": mode, "parse_cache": parse_cache_state, **deadline.meta()},
     }
+    latency_ms = (time.monotonic() - t0) * 1000.0
+    tracker.record(f"analyze.{mode}", latency_ms)
+    response["meta"]["latency_ms"] = round(latency_ms, 1)
     if DEBUG_PARSE_ECHO: response["_debug_rows"] = debug_rows
 
     rid = response["context"]["report_id"]; response["id"] = rid
-    response.setdefault("filename", file.filename or "report.pdf")
+    response.setdefault("filename", filename or "report.pdf")
     try: store.add(response)
     except Exception: pass
-    return JSONResponse(status_code=200, content=response)
+    return response
 
 # ---------------- Listing & detail -----------------------------------------
 @router.get("/report/{rid}")
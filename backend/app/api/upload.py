@@ -1,8 +1,24 @@
 # app/api/upload.py
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+import json, os
+
+from app.api.routes import run_analysis
+from app.core.jobs import JobManager
 
 router = APIRouter(tags=["upload"])
 
+async def _run_job(pdf_bytes: bytes, job, progress):
+    return await run_analysis(pdf_bytes, job.filename, job.report_name, job.age, job.sex, progress=progress)
+
+jobs = JobManager(
+    _run_job,
+    jobs_dir=os.getenv("JOBS_DIR", os.path.join(os.path.dirname(__file__), "..", "storage", "jobs")),
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    retention_sec=float(os.getenv("JOB_RETENTION_SEC", str(7 * 86400))),
+    max_finished=int(os.getenv("JOB_MAX_FINISHED", "500")),
+)
+
 @router.post("/upload-report")
 async def upload_report(
     file: UploadFile = File(...),
@@ -12,16 +28,37 @@ async def upload_report(
 ):
     try:
         content = await file.read()
-        # TODO: call your PDF parser / analyzer here with `content`
-        # For now just return metadata so frontend can test:
-        return {
-            "report_id": "1234",
-            "status": "done",
-            "filename": file.filename,
-            "size": len(content),
-            "report_name": report_name,
-            "age": age,
-            "sex": sex,
-        }
+        job = jobs.submit(content, file.filename, report_name, age, sex)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id,
+        "status": job.status,
+        "filename": file.filename,
+        "size": len(content),
+        "report_name": report_name,
+        "age": age,
+        "sex": sex,
+        "poll_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events",
+    })
+
+@router.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return job.public()
+
+@router.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    if not jobs.get(job_id):
+        raise HTTPException(status_code=404, detail="job_not_found")
+
+    async def stream():
+        async for snap in jobs.events(job_id):
+            event = snap["stage"] if snap["status"] == "running" and snap["stage"] else snap["status"]
+            yield f"event: {event}\ndata: {json.dumps(snap)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,75 @@
+# app/core/deadline.py
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import os, time
+
+HEADER = "X-Request-Deadline-Ms"
+
+
+class Deadline:
+    """
+    Time budget of one analyze request, handed down to every stage.
+
+    Stages ask `allows(seconds)` before optional work (OCR pages, RAG
+    queries, LLM calls) and call `skip(step)` when they leave it out; the
+    skipped steps end up in the response `meta`. A Deadline without a
+    budget never expires. It pickles as "seconds left", so it can be passed
+    into a parse-pool worker process and keeps counting down there.
+    """
+
+    def __init__(self, budget_sec: Optional[float] = None):
+        self.expires_at = None if budget_sec is None else time.monotonic() + max(0.0, budget_sec)
+        self.skipped: List[str] = []
+
+    @classmethod
+    def from_ms(cls, ms: Any) -> "Deadline":
+        try:
+            ms = float(ms)
+        except (TypeError, ValueError):
+            return cls()
+        return cls(ms / 1000.0) if ms > 0 else cls()
+
+    @classmethod
+    def for_request(cls, header_ms: Any = None) -> "Deadline":
+        """X-Request-Deadline-Ms if the client sent one, else ANALYZE_DEADLINE_MS (unset/0 = no deadline)."""
+        return cls.from_ms(header_ms if header_ms not in (None, "") else os.getenv("ANALYZE_DEADLINE_MS"))
+
+    @property
+    def bounded(self) -> bool:
+        return self.expires_at is not None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None without a budget."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def allows(self, seconds: float = 0.0) -> bool:
+        left = self.remaining()
+        return left is None or left > seconds
+
+    def skip(self, step: str) -> None:
+        if step not in self.skipped:
+            self.skipped.append(step)
+            print(f"[DEADLINE] Skipping {step} ({self.remaining() or 0.0:.2f}s left)")
+
+    def merge(self, skipped: List[str]) -> None:
+        for step in skipped or []:
+            if step not in self.skipped:
+                self.skipped.append(step)
+
+    def meta(self) -> Dict[str, Any]:
+        return {"deadline_left_ms": None if self.expires_at is None else round((self.remaining() or 0.0) * 1000.0, 1),
+                "skipped": list(self.skipped)}
+
+    # pickling for the parse pool: carry the remaining budget, not a clock reading
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"remaining": self.remaining(), "skipped": list(self.skipped)}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        left = state.get("remaining")
+        self.expires_at = None if left is None else time.monotonic() + left
+        self.skipped = list(state.get("skipped") or [])
@@ -0,0 +1,223 @@
+# backend/app/core/jobs.py
+from __future__ import annotations
+from typing import Any, Awaitable, AsyncIterator, Callable, Dict, List, Optional
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+import asyncio, json, os, uuid
+
+from app.ingest.pool import ParsePoolSaturated
+
+# Stages reported by the analyze pipeline, in order.
+STAGES = ("parsed", "evaluated", "summarized")
+TERMINAL = ("done", "failed")
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+@dataclass
+class Job:
+    id: str
+    filename: str
+    report_name: Optional[str] = None
+    age: Optional[int] = None
+    sex: Optional[str] = None
+    status: str = "queued"           # queued | running | done | failed
+    stage: Optional[str] = None      # last completed stage (see STAGES)
+    stages: List[Dict[str, Any]] = field(default_factory=list)
+    report_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: str = field(default_factory=_now)
+    updated_at: str = field(default_factory=_now)
+
+    def public(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d["job_id"] = d.pop("id")
+        d["progress"] = round(len(self.stages) / len(STAGES), 2) if self.status != "done" else 1.0
+        return d
+
+# runner(pdf_bytes, job, progress) -> stored report document
+Runner = Callable[[bytes, Job, Callable[..., None]], Awaitable[Dict[str, Any]]]
+
+class JobManager:
+    """
+    In-process analysis queue behind /upload-report.
+
+    Upload bytes and job metadata are persisted under `jobs_dir` so a restart
+    can resume unfinished jobs; a fixed number of asyncio workers drain the
+    queue and call `runner`. Stage updates fan out to any SSE subscribers.
+    Finished jobs are kept for `retention_sec` and at most `max_finished` of
+    them (newest first), in memory and on disk; uploads are deleted as soon
+    as a job finishes, whether it succeeded or failed.
+    """
+
+    def __init__(self, runner: Runner, jobs_dir: str, workers: int = 2,
+                 retention_sec: float = 7 * 86400, max_finished: int = 500):
+        self.runner = runner
+        self.jobs_dir = jobs_dir
+        self.workers = max(1, workers)
+        self.retention_sec = retention_sec
+        self.max_finished = max(0, max_finished)
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    # ---- persistence --------------------------------------------------------
+    def _pdf_path(self, jid: str) -> str:
+        return os.path.join(self.jobs_dir, f"{jid}.pdf")
+
+    def _meta_path(self, jid: str) -> str:
+        return os.path.join(self.jobs_dir, f"{jid}.json")
+
+    def _save(self, job: Job) -> None:
+        try:
+            with open(self._meta_path(job.id), "w", encoding="utf-8") as f:
+                json.dump(asdict(job), f, ensure_ascii=False)
+        except Exception as e:
+            print(f"[jobs] Failed to save job {job.id}: {e}")
+
+    def _remove_files(self, jid: str, meta: bool = True) -> None:
+        for path in ((self._pdf_path(jid), self._meta_path(jid)) if meta else (self._pdf_path(jid),)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _prune(self) -> None:
+        """Forget finished jobs past the retention time or beyond the newest `max_finished`."""
+        finished = sorted((j for j in self._jobs.values() if j.status in TERMINAL),
+                          key=lambda j: j.updated_at, reverse=True)
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.retention_sec)).isoformat() + "Z"
+        for n, job in enumerate(finished):
+            if n >= self.max_finished or job.updated_at < cutoff:
+                self._jobs.pop(job.id, None)
+                self._remove_files(job.id)
+
+    def _load_pending(self) -> List[Job]:
+        pending: List[Job] = []
+        for name in sorted(os.listdir(self.jobs_dir)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, name), "r", encoding="utf-8") as f:
+                    job = Job(**json.load(f))
+            except Exception:
+                continue
+            self._jobs[job.id] = job
+            if job.status in TERMINAL:
+                self._remove_files(job.id, meta=False)   # uploads left by older versions
+            elif os.path.exists(self._pdf_path(job.id)):
+                job.status, job.stage, job.stages = "queued", None, []
+                pending.append(job)
+        self._prune()
+        return pending
+
+    # ---- lifecycle ----------------------------------------------------------
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        for job in self._load_pending():
+            self._queue.put_nowait(job.id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ---- public API ---------------------------------------------------------
+    def submit(self, pdf_bytes: bytes, filename: Optional[str], report_name: Optional[str],
+               age: Optional[int], sex: Optional[str]) -> Job:
+        self.start()
+        job = Job(id=str(uuid.uuid4()), filename=filename or "report.pdf",
+                  report_name=report_name, age=age, sex=sex)
+        with open(self._pdf_path(job.id), "wb") as f:
+            f.write(pdf_bytes)
+        self._jobs[job.id] = job
+        self._save(job)
+        self._queue.put_nowait(job.id)
+        return job
+
+    def get(self, jid: str) -> Optional[Job]:
+        return self._jobs.get(jid)
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for j in self._jobs.values():
+            counts[j.status] = counts.get(j.status, 0) + 1
+        return {"workers": self.workers, "queue_depth": self._queue.qsize() if self._queue else 0, "jobs": counts}
+
+    async def events(self, jid: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the job's public state now and after every update until it finishes."""
+        job = self._jobs.get(jid)
+        if not job:
+            return
+        q: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(jid, []).append(q)
+        try:
+            snap = job.public()
+            yield snap
+            while snap["status"] not in TERMINAL:
+                snap = await q.get()
+                yield snap
+        finally:
+            subs = self._subscribers.get(jid, [])
+            if q in subs:
+                subs.remove(q)
+            if not subs:
+                self._subscribers.pop(jid, None)
+
+    # ---- internals ----------------------------------------------------------
+    def _update(self, job: Job, **changes: Any) -> None:
+        for k, v in changes.items():
+            setattr(job, k, v)
+        job.updated_at = _now()
+        self._save(job)
+        snapshot = job.public()
+        for q in self._subscribers.get(job.id, []):
+            q.put_nowait(snapshot)
+
+    async def _worker(self) -> None:
+        while True:
+            jid = await self._queue.get()
+            try:
+                await self._run(jid)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, jid: str) -> None:
+        job = self._jobs.get(jid)
+        if not job:
+            return
+        try:
+            with open(self._pdf_path(jid), "rb") as f:
+                pdf_bytes = f.read()
+        except Exception as e:
+            self._finish(job, status="failed", error=f"upload_missing: {e}")
+            return
+
+        def progress(stage: str, **info: Any) -> None:
+            job.stages.append({"stage": stage, "at": _now(), **info})
+            self._update(job, stage=stage)
+
+        self._update(job, status="running")
+        try:
+            report = await self.runner(pdf_bytes, job, progress)
+        except ParsePoolSaturated as e:
+            # parser is busy: requeue after the back-off without holding this worker
+            self._update(job, status="queued", stages=[], stage=None)
+            asyncio.get_running_loop().call_later(e.retry_after, self._queue.put_nowait, jid)
+            return
+        except Exception as e:
+            print(f"[jobs] Job {jid} failed: {e}")
+            self._finish(job, status="failed", error=str(e))
+            return
+        self._finish(job, status="done", report_id=report.get("id"))
+
+    def _finish(self, job: Job, **changes: Any) -> None:
+        self._update(job, **changes)
+        self._remove_files(job.id, meta=False)
+        self._prune()
@@ -0,0 +1,69 @@
+# app/core/latency.py
+from __future__ import annotations
+from typing import Any, Dict, Optional
+from collections import deque
+import os, threading
+
+MODES = ("fast", "llm", "auto")
+
+
+def analyze_mode(requested: Optional[str] = None) -> str:
+    """Requested mode, else ANALYZE_MODE, else "llm" (the historical behaviour)."""
+    for m in (requested, os.getenv("ANALYZE_MODE", "")):
+        m = (m or "").strip().lower()
+        if m in MODES:
+            return m
+    return "llm"
+
+
+class LatencyTracker:
+    """
+    Rolling window of the last `window` samples per series (e.g. "analyze.fast",
+    "llm.summary"), in milliseconds. Used for /health reporting and by
+    mode=auto to estimate whether an LLM step still fits in the budget.
+    """
+
+    def __init__(self, window: int = 500, p99_target_ms: float = 2000.0):
+        self.window = max(1, window)
+        self.p99_target_ms = p99_target_ms
+        self._series: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, series: str, ms: float) -> None:
+        with self._lock:
+            q = self._series.get(series)
+            if q is None:
+                q = self._series[series] = deque(maxlen=self.window)
+            q.append(float(ms))
+
+    def percentile(self, series: str, p: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._series.get(series) or ())
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(round(p * (len(samples) - 1))))]
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"p99_target_ms": self.p99_target_ms}
+        for name in sorted(self._series):
+            p99 = self.percentile(name, 0.99)
+            out[name] = {"n": len(self._series[name]), "p50_ms": round(self.percentile(name, 0.5), 1),
+                         "p99_ms": round(p99, 1)}
+            if name.startswith("analyze."):
+                out[name]["within_target"] = p99 <= self.p99_target_ms
+        return out
+
+
+_tracker: Optional[LatencyTracker] = None
+_tracker_lock = threading.Lock()
+
+def get_latency_tracker() -> LatencyTracker:
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = LatencyTracker(
+                    window=int(os.getenv("LATENCY_WINDOW", "500")),
+                    p99_target_ms=float(os.getenv("ANALYZE_P99_TARGET_MS", "2000")),
+                )
+    return _tracker
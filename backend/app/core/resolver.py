@@ -1,18 +1,127 @@
-from typing import Optional, Dict, Any, Tuple, List
+from typing import Optional, Dict, Any, Tuple, List, Iterable, Sequence
+from bisect import bisect_left
+
+INF = float("inf")
+SEXES = ("male", "female", "any")
+
+def sex_key(sex: Optional[str]) -> str:
+    s = (sex or "").strip().lower()
+    if s in ("m", "male", "man"):
+        return "male"
+    if s in ("f", "female", "woman"):
+        return "female"
+    return "any"
+
+def age_bucket(age: Any) -> str:
+    try:
+        a = int(age)
+    except (TypeError, ValueError):
+        return "unknown"
+    for hi, label in ((11, "0-11"), (17, "12-17"), (39, "18-39"), (64, "40-64")):
+        if a <= hi:
+            return label
+    return "65+"
+
+def _applies(r: Dict[str, Any]) -> Tuple[str, float, float]:
+    a = r.get("applies") or {}
+    lo = a.get("age_min"); hi = a.get("age_max")
+    return sex_key(a.get("sex")), (-INF if lo is None else float(lo)), (INF if hi is None else float(hi))
+
+def _representatives(bounds: List[float]) -> List[float]:
+    # one probe age per elementary segment: (-inf,b0), [b0], (b0,b1), [b1], ..., (bn,inf)
+    if not bounds:
+        return [0.0]
+    pts: List[float] = []
+    for i, b in enumerate(bounds):
+        pts.append(b - 1 if i == 0 else (bounds[i - 1] + b) / 2)
+        pts.append(b)
+    pts.append(bounds[-1] + 1)
+    return pts
+
+class RangeIndex:
+    """
+    Ranges of one KB unit table, precompiled per sex into elementary age segments.
+
+    `lookup(age, sex)` returns the most specific range with a single bisect.
+    Precedence, shared by every caller: exact sex before "any", then the
+    narrowest age span, then declaration order. Banded entries take part
+    like fixed low/high ones.
+    """
+
+    def __init__(self, ranges: Optional[Iterable[Dict[str, Any]]]):
+        self.ranges = [r for r in (ranges or []) if isinstance(r, dict) and ("low" in r or "high" in r or r.get("bands"))]
+        parsed = [_applies(r) for r in self.ranges]
+        self._bounds = sorted({b for _, lo, hi in parsed for b in (lo, hi) if b not in (-INF, INF)})
+        probes = _representatives(self._bounds)
+        self._segments: Dict[str, List[Optional[Dict[str, Any]]]] = {}
+        for sex in SEXES:
+            cands = sorted(
+                ((0 if r_sex == sex != "any" else 1, hi - lo, order), lo, hi, r)
+                for order, (r, (r_sex, lo, hi)) in enumerate(zip(self.ranges, parsed))
+                if r_sex in ("any", sex)
+            )
+            self._segments[sex] = [next((r for _, lo, hi, r in cands if lo <= p <= hi), None) for p in probes]
+
+    def __bool__(self) -> bool:
+        return bool(self.ranges)
+
+    def lookup(self, age: Optional[float], sex: Optional[str]) -> Optional[Dict[str, Any]]:
+        seg = self._segments[sex_key(sex)]
+        if age is None:
+            age = 30
+        i = bisect_left(self._bounds, age)
+        return seg[2 * i + 1 if i < len(self._bounds) and self._bounds[i] == age else 2 * i]
+
+    def lookup_many(self, queries: Iterable[Tuple[Optional[float], Optional[str]]]) -> List[Optional[Dict[str, Any]]]:
+        return [self.lookup(age, sex) for age, sex in queries]
+
+def classify(rng: Optional[Dict[str, Any]], value: Optional[float], unit: Optional[str] = None,
+             source: str = "KB") -> Dict[str, Any]:
+    """Status for `value` against one range entry: {"applied_range": ..., "status": ...}."""
+    applied: Dict[str, Any] = {"low": None, "high": None, "source": source, "note": None}
+    if rng is None:
+        applied["note"] = "no_applicable_range"
+        return {"applied_range": applied, "status": "needs_review"}
+
+    if "low" in rng or "high" in rng:
+        low, high = rng.get("low"), rng.get("high")
+        try:
+            low_f = float(low) if low is not None else None
+        except Exception:
+            low_f = None
+        try:
+            high_f = float(high) if high is not None else None
+        except Exception:
+            high_f = None
+        applied["low"], applied["high"] = low, high
+        if unit: applied["unit"] = unit
+        if value is None:
+            return {"applied_range": applied, "status": "needs_review"}
+        if low_f is not None and value < low_f:
+            return {"applied_range": applied, "status": "low"}
+        if high_f is not None and value > high_f:
+            return {"applied_range": applied, "status": "high"}
+        return {"applied_range": applied, "status": "normal"}
+
+    if value is not None:
+        for b in rng.get("bands") or []:
+            b_min = -INF if b.get("min") is None else b.get("min")
+            b_max = INF if b.get("max") is None else b.get("max")
+            if b_min <= value <= b_max:
+                label = (b.get("label") or "").lower()
+                status = "normal" if label in ("normal", "optimal", "sufficient") else label or "needs_review"
+                applied["low"], applied["high"] = b.get("min"), b.get("max")
+                applied["note"] = "banded"
+                if unit: applied["unit"] = unit
+                return {"applied_range": applied, "status": status}
+    return {"applied_range": {"low": None, "high": None, "source": source, "note": "band_no_match"}, "status": "needs_review"}
+
+def evaluate_batch(items: Sequence[Tuple[RangeIndex, Optional[float], Optional[str]]],
+                   age: Optional[float], sex: Optional[str]) -> List[Dict[str, Any]]:
+    """Classify a whole report at once: items are (index, value in the index's unit, unit)."""
+    sk = sex_key(sex)
+    return [classify(idx.lookup(age, sk), value, unit) for idx, value, unit in items]
 
 def resolve_range(test_record: Dict[str, Any], age: int, sex: str) -> Optional[Dict[str, Any]]:
-    ranges = test_record.get("ranges", [])
-    candidates: List[Tuple[bool, float, Dict[str, Any]]] = []
-    for r in ranges:
-        a = r.get("applies", {})
-        sex_ok = a.get("sex", "any") in (sex, "any")
-        age_min = a.get("age_min", float("-inf"))
-        age_max = a.get("age_max", float("inf"))
-        age_ok = (age >= age_min) and (age <= age_max)
-        if sex_ok and age_ok:
-            span = (age_max - age_min) if age_max != float("inf") and age_min != float("-inf") else 1e9
-            candidates.append((a.get("sex", "any") == "any", span, r))
-    if not candidates:
-        return None
-    candidates.sort(key=lambda t: (t[0], t[1]))  # exact sex before "any", then narrowest span
-    return candidates[0][2]
+    idx = test_record.get("range_index") or RangeIndex(test_record.get("ranges", []))
+    return idx.lookup(age, sex)
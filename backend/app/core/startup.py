@@ -0,0 +1,130 @@
+# app/core/startup.py
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+import asyncio, contextlib, inspect, os, threading, time
+
+# (name, fn): fn is sync (run in a worker thread) or async
+Step = Tuple[str, Callable[[], Union[None, Awaitable[None]]]]
+
+
+class Startup:
+    """
+    Startup bookkeeping: how long each phase took, and whether the app is ready.
+
+    Heavy dependencies (KB, OCR model weights, Chroma, Groq model list) are lazy
+    singletons, so the app accepts requests as soon as the startup hook is done.
+    The optional warm-up task then builds them in the background, so the first
+    requests need not pay for them. `/ready` answers 200 once startup is done
+    (and, with `require_warm`, once warm-up finished too). Every phase lands in
+    `report()` with its duration in ms.
+    """
+
+    def __init__(self, require_warm: bool = False):
+        self.require_warm = require_warm
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[float] = None
+        self.warmed = False
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    def record(self, name: str, ms: float, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self.phases[name] = {"ms": round(ms, 1), "ok": error is None}
+            if error is not None:
+                self.phases[name]["error"] = f"{type(error).__name__}: {error}"
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.record(name, (time.perf_counter() - t0) * 1000.0, e)
+            raise
+        self.record(name, (time.perf_counter() - t0) * 1000.0)
+
+    def mark_started(self) -> None:
+        self.started_at = time.monotonic()
+        total = sum(p["ms"] for p in self.phases.values())
+        print(f"[STARTUP] Serving after {total:.0f} ms: "
+              + ", ".join(f"{k}={v['ms']:.0f}ms" for k, v in self.phases.items()))
+
+    async def warm_up(self, steps: List[Step]) -> None:
+        """Run the steps one after another; a failing step is recorded, never raised."""
+        for name, fn in steps:
+            t0 = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(fn):
+                    await fn()
+                else:
+                    await asyncio.to_thread(fn)
+                self.record(f"warm.{name}", (time.perf_counter() - t0) * 1000.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[STARTUP] Warm-up step {name} failed: {e}")
+                self.record(f"warm.{name}", (time.perf_counter() - t0) * 1000.0, e)
+        self.warmed = True
+        warm_ms = sum(v["ms"] for k, v in self.phases.items() if k.startswith("warm."))
+        print(f"[STARTUP] Warm-up done in {warm_ms:.0f} ms")
+
+    def start_warm_up(self, steps: List[Step]) -> Optional[asyncio.Task]:
+        if not steps:
+            self.warmed = True
+            return None
+        self._task = asyncio.get_running_loop().create_task(self.warm_up(steps))
+        return self._task
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    @property
+    def ready(self) -> bool:
+        return self.started_at is not None and (self.warmed or not self.require_warm)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = {k: dict(v) for k, v in self.phases.items()}
+        return {
+            "ready": self.ready,
+            "warmed": self.warmed,
+            "startup_ms": round(sum(v["ms"] for k, v in phases.items() if not k.startswith("warm.")), 1),
+            "uptime_sec": None if self.started_at is None else round(time.monotonic() - self.started_at, 1),
+            "phases": phases,
+        }
+
+
+def warm_up_steps() -> List[Step]:
+    """What STARTUP_WARMUP builds in the background; empty when it is "0"."""
+    if os.getenv("STARTUP_WARMUP", "1") == "0":
+        return []
+    from app.kb.compiled import get_kb
+    from app.normalize.name_resolver import get_name_resolver
+    from app.rag.store import get_rag_store
+    from app.ocr.extract import get_easyocr_reader
+    from app.ingest.pool import get_parse_pool
+    from app.summarize.llm import _print_groq_models
+    return [
+        ("kb", get_kb),
+        ("name_resolver", get_name_resolver),
+        ("rag_store", lambda: get_rag_store().warm()),
+        ("ocr_reader", get_easyocr_reader),      # before the pool forks, so workers inherit it
+        ("parse_pool", get_parse_pool().warm),
+        ("llm_models", _print_groq_models),
+    ]
+
+
+_startup: Optional[Startup] = None
+_startup_lock = threading.Lock()
+
+def get_startup() -> Startup:
+    global _startup
+    if _startup is None:
+        with _startup_lock:
+            if _startup is None:
+                _startup = Startup(require_warm=os.getenv("READY_AFTER_WARMUP", "0") == "1")
+    return _startup
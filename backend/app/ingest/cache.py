@@ -0,0 +1,133 @@
+# app/ingest/cache.py
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import hashlib, json, os, sqlite3, threading, time
+
+from app.ingest.parser import PARSER_VERSION
+
+_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "storage", "parse_cache.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parse_cache (
+    key         TEXT PRIMARY KEY,   -- sha256 of the upload bytes + parser/OCR version
+    body        BLOB NOT NULL,      -- compact UTF-8 JSON: rows, ocr_confidence, text
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_parse_cache_accessed ON parse_cache(accessed_at);
+"""
+
+def parse_version() -> str:
+    """PARSER_VERSION plus the OCR settings that change what a scanned page yields."""
+    return "/".join([PARSER_VERSION, os.getenv("OCR_ENGINE", "easyocr").strip().lower(),
+                     os.getenv("OCR_MODE", "roi").strip().lower()])
+
+def parse_key(pdf_bytes: bytes) -> str:
+    """Content address of an upload: same bytes -> same key, whatever the file name, age or sex."""
+    return hashlib.sha256(pdf_bytes).hexdigest() + ":" + parse_version()
+
+
+class ParseCache:
+    """
+    On-disk cache of parse results (extracted rows, OCR confidence, text) by
+    upload content. Age and sex only matter from range evaluation on, so a
+    re-upload of the same PDF skips the parse pool entirely. Least recently
+    used rows are evicted once the table holds more than `max_rows` entries
+    or `max_bytes` of bodies. Only complete parses are stored: callers skip
+    `put` when anything was skipped (deadline, OCR unavailable or failed), so
+    a degraded parse is redone once the engine works. Blocking: call it from
+    a worker thread.
+    """
+
+    def __init__(self, db_path: Optional[str], max_rows: int = 2000, max_bytes: int = 64 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_rows = max(1, max_rows)
+        self.max_bytes = max(1, max_bytes)
+        self._local = threading.local()
+        self.counters = {"hits": 0, "misses": 0, "puts": 0, "evictions": 0}
+        if self.db_path:
+            with self._conn() as conn:
+                conn.executescript(_SCHEMA)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.db_path)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.db_path:
+            return None
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT body FROM parse_cache WHERE key = ?", (key,)).fetchone()
+            if row:
+                with conn:
+                    conn.execute("UPDATE parse_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            print(f"[CACHE] Parse cache read failed: {e}")
+            row = None
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, rows: List[Dict[str, Any]], ocr_confidence: float, text: str = "") -> None:
+        if not self.db_path:
+            return
+        now = time.time()
+        body = json.dumps({"rows": rows, "ocr_confidence": ocr_confidence, "text": text},
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO parse_cache(key, body, size, created_at, accessed_at) "
+                             "VALUES (?, ?, ?, ?, ?)", (key, body, len(body), now, now))
+                self.counters["puts"] += 1
+                self._evict(conn)
+        except sqlite3.Error as e:
+            print(f"[CACHE] Parse cache write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM parse_cache").fetchone()
+        if count <= self.max_rows and total <= self.max_bytes:
+            return
+        drop, freed = 0, 0
+        for (size,) in conn.execute("SELECT size FROM parse_cache ORDER BY accessed_at").fetchall():
+            if count - drop <= self.max_rows and total - freed <= self.max_bytes:
+                break
+            drop, freed = drop + 1, freed + size
+        conn.execute("DELETE FROM parse_cache WHERE key IN "
+                     "(SELECT key FROM parse_cache ORDER BY accessed_at LIMIT ?)", (drop,))
+        self.counters["evictions"] += drop
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {**self.counters, "enabled": self.enabled,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else None}
+
+
+_cache: Optional[ParseCache] = None
+_cache_lock = threading.Lock()
+
+def get_parse_cache() -> ParseCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                db = os.getenv("PARSE_CACHE_DB", _DB_PATH)
+                _cache = ParseCache(
+                    None if db.lower() in ("", "off", "none") else db,
+                    max_rows=int(os.getenv("PARSE_CACHE_MAX_ROWS", "2000")),
+                    max_bytes=int(os.getenv("PARSE_CACHE_MAX_MB", "64")) * 1024 * 1024,
+                )
+    return _cache
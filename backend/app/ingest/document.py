@@ -0,0 +1,125 @@
+# backend/app/ingest/document.py
+from __future__ import annotations
+from typing import List, Dict, Any, Optional, Tuple, Union
+import io
+import pdfplumber
+
+
+class PdfDocument:
+    """
+    One parsed view of an uploaded PDF, shared by every stage of /api/analyze.
+
+    pdfplumber is opened once; page text, tables and rasterized page images
+    are computed lazily on first access and cached per page, so the table
+    parser, the text/OCR extractor and the regex fallback all reuse the same
+    layout analysis instead of re-opening the bytes.
+    """
+
+    def __init__(self, pdf_bytes: bytes):
+        self.pdf_bytes = pdf_bytes
+        self._pdf = None
+        self._opened = False
+        self._text: Dict[int, str] = {}
+        self._tables: Dict[int, List[List[List[Optional[str]]]]] = {}
+        self._images: Dict[Tuple[int, int], Any] = {}
+        self._layout: Dict[int, Dict[str, Any]] = {}
+        self.extracted_text: Optional[str] = None   # set by extract_text_from_pdf (text layer + OCR)
+
+    @classmethod
+    def coerce(cls, src: Union["PdfDocument", bytes]) -> "PdfDocument":
+        """Accept either raw bytes (legacy callers) or an existing document."""
+        return src if isinstance(src, PdfDocument) else cls(src)
+
+    def _open(self):
+        if not self._opened:
+            self._opened = True
+            try:
+                self._pdf = pdfplumber.open(io.BytesIO(self.pdf_bytes))
+            except Exception as e:
+                print(f"[PDF] Could not open document: {e}")
+                self._pdf = None
+        return self._pdf
+
+    @property
+    def pages(self) -> List[Any]:
+        pdf = self._open()
+        return list(pdf.pages) if pdf is not None else []
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def page_text(self, i: int) -> str:
+        if i not in self._text:
+            try:
+                self._text[i] = self.pages[i].extract_text() or ""
+            except Exception:
+                self._text[i] = ""
+        return self._text[i]
+
+    def page_tables(self, i: int) -> List[List[List[Optional[str]]]]:
+        if i not in self._tables:
+            try:
+                self._tables[i] = self.pages[i].extract_tables() or []
+            except Exception:
+                self._tables[i] = []
+        return self._tables[i]
+
+    def page_layout(self, i: int) -> Dict[str, Any]:
+        """
+        How much of page i the text layer covers: {"chars", "image_ratio",
+        "chars_on_images"}. image_ratio is the page area under embedded images
+        (capped at 1); chars_on_images counts characters drawn over them, which is
+        what a searchable scan has and a bare scan lacks.
+        """
+        if i not in self._layout:
+            layout = {"chars": len(self.page_text(i).strip()), "image_ratio": 0.0, "chars_on_images": 0}
+            try:
+                page = self.pages[i]
+                area = float(page.width * page.height) or 1.0
+                boxes = [(float(im["x0"]), float(im["top"]), float(im["x1"]), float(im["bottom"]))
+                         for im in page.images]
+                layout["image_ratio"] = min(1.0, sum(max(0.0, x1 - x0) * max(0.0, b - t) for x0, t, x1, b in boxes) / area)
+                if boxes:
+                    layout["chars_on_images"] = sum(
+                        1 for c in page.chars if c.get("text", "").strip() and any(
+                            x0 <= (c["x0"] + c["x1"]) / 2 <= x1 and t <= (c["top"] + c["bottom"]) / 2 <= b
+                            for x0, t, x1, b in boxes))
+            except Exception:
+                pass
+            self._layout[i] = layout
+        return self._layout[i]
+
+    def page_image(self, i: int, resolution: int = 300):
+        """Rasterized page as a PIL image (cached per resolution)."""
+        key = (i, resolution)
+        if key not in self._images:
+            self._images[key] = self.pages[i].to_image(resolution=resolution).original
+        return self._images[key]
+
+    def region_image(self, i: int, bbox: Tuple[float, float, float, float], resolution: int = 300):
+        """Part of page i (x0, top, x1, bottom in points from the page origin) rasterized alone; not cached."""
+        page = self.pages[i]
+        x0, top, x1, bottom = bbox
+        box = (max(0.0, x0), max(0.0, top), min(float(page.width), x1), min(float(page.height), bottom))
+        return page.crop(box, relative=True).to_image(resolution=resolution).original
+
+    def text(self) -> str:
+        """Native text layer of all pages, joined like the legacy extractors did."""
+        chunks = [self.page_text(i) for i in range(self.page_count)]
+        return "\n".join(t for t in chunks if t.strip()).strip()
+
+    def close(self) -> None:
+        if self._pdf is not None:
+            try:
+                self._pdf.close()
+            except Exception:
+                pass
+        self._pdf = None
+        self._images.clear()
+
+    def __enter__(self) -> "PdfDocument":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,13 +1,17 @@
 # backend/app/ingest/parser.py
 from __future__ import annotations
-from typing import List, Dict, Any, Tuple, Optional
-import io, re
-import pdfplumber
+from typing import List, Dict, Any, Tuple, Optional, Union
+import re
+from app.ingest.document import PdfDocument
 from app.ocr.extract import extract_text_from_pdf
+from app.core.deadline import Deadline
 
 # You already had normalize_test_name somewhere; keep it or import from aliases
 from app.normalize.aliases import normalize_test_name  # re-point to your alias file
 
+# Bump whenever parsing or OCR changes what comes out of an upload: cached parses stop matching.
+PARSER_VERSION = "parse-v1"
+
 Value = Optional[float]
 
 # regexes for generic "name value unit" (expanded for Vitamin D and more)
@@ -31,53 +35,52 @@ def _clean_unit(u: str) -> str:
     u = u.replace("IU/L", "IU/L")
     return u
 
-def _try_table_rows(pdf_bytes: bytes) -> List[Dict[str, Any]]:
+def _try_table_rows(doc: PdfDocument) -> List[Dict[str, Any]]:
     """Try structured extraction with pdfplumber tables first."""
     out: List[Dict[str, Any]] = []
     try:
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables() or []
-                for tb in tables:
-                    # heuristic: search rows that look like [name, value, unit, ...]
-                    for row in tb:
-                        cells = [c.strip() if isinstance(c, str) else "" for c in row if c]
-                        if len(cells) < 2: 
-                            continue
-                        # find first number cell
-                        val_idx = None
-                        for i, c in enumerate(cells):
-                            if re.search(r"-?\d+(\.\d+)?", c or ""):
-                                val_idx = i; break
-                        if val_idx is None: 
-                            continue
-                        name = " ".join(cells[:val_idx]).strip()
-                        val_cell = cells[val_idx]
-                        m = re.search(r"-?\d+(\.\d+)?", val_cell)
-                        if not name or not m:
-                            continue
-                        value = float(m.group(0))
-                        # unit might be same cell or next cell
-                        unit = ""
-                        rest = " ".join(cells[val_idx:]).replace(m.group(0), "").strip()
-                        # quick unit probe
-                        m2 = re.search(r"(%|mg/dl|g/dl|mmol/l|iu/l|iu/ml|µ?iu/ml|ng/ml|nmol/l|pg/ml|u/l|k/µl|m/µl|/µl|fL|fl|pg|g/l)", rest, re.I)
-                        if m2:
-                            unit = _clean_unit(m2.group(0))
-                        # If unit is missing, try to infer for common tests
-                        test_lc = name.strip().lower()
-                        if not unit:
-                            if test_lc in ("hemoglobin", "haemoglobin", "hb", "hgb", "hemoglobin (hgb)"):
-                                unit = "g/dL"
-                            elif test_lc in ("red blood cell", "rbc", "red blood cell (rbc)", "red blood cell count"):
-                                unit = "million/µL"
-                            elif "vitamin d" in test_lc or "25-oh" in test_lc:
-                                # Infer Vitamin D units by value range
-                                if 5 <= value <= 150:
-                                    unit = "ng/mL"
-                                elif 12 <= value <= 375:
-                                    unit = "nmol/L"
-                        out.append({"test": name, "value": value, "unit": unit})
+        for page_no in range(doc.page_count):
+            tables = doc.page_tables(page_no)
+            for tb in tables:
+                # heuristic: search rows that look like [name, value, unit, ...]
+                for row in tb:
+                    cells = [c.strip() if isinstance(c, str) else "" for c in row if c]
+                    if len(cells) < 2: 
+                        continue
+                    # find first number cell
+                    val_idx = None
+                    for i, c in enumerate(cells):
+                        if re.search(r"-?\d+(\.\d+)?", c or ""):
+                            val_idx = i; break
+                    if val_idx is None: 
+                        continue
+                    name = " ".join(cells[:val_idx]).strip()
+                    val_cell = cells[val_idx]
+                    m = re.search(r"-?\d+(\.\d+)?", val_cell)
+                    if not name or not m:
+                        continue
+                    value = float(m.group(0))
+                    # unit might be same cell or next cell
+                    unit = ""
+                    rest = " ".join(cells[val_idx:]).replace(m.group(0), "").strip()
+                    # quick unit probe
+                    m2 = re.search(r"(%|mg/dl|g/dl|mmol/l|iu/l|iu/ml|µ?iu/ml|ng/ml|nmol/l|pg/ml|u/l|k/µl|m/µl|/µl|fL|fl|pg|g/l)", rest, re.I)
+                    if m2:
+                        unit = _clean_unit(m2.group(0))
+                    # If unit is missing, try to infer for common tests
+                    test_lc = name.strip().lower()
+                    if not unit:
+                        if test_lc in ("hemoglobin", "haemoglobin", "hb", "hgb", "hemoglobin (hgb)"):
+                            unit = "g/dL"
+                        elif test_lc in ("red blood cell", "rbc", "red blood cell (rbc)", "red blood cell count"):
+                            unit = "million/µL"
+                        elif "vitamin d" in test_lc or "25-oh" in test_lc:
+                            # Infer Vitamin D units by value range
+                            if 5 <= value <= 150:
+                                unit = "ng/mL"
+                            elif 12 <= value <= 375:
+                                unit = "nmol/L"
+                    out.append({"test": name, "value": value, "unit": unit})
     except Exception:
         pass
     return out
@@ -278,21 +281,91 @@ def _try_line_rows(text: str) -> List[Dict[str, Any]]:
         i += 1
     return rows
 
-def parse_pdf_bytes(pdf_bytes: bytes) -> Tuple[List[Dict[str, Any]], float]:
+# ---------------- Fallback text parsing (when table parser returns 0) --------
+CBC_FALLBACK_PATTERNS = [
+    (r"White\s*Blood\s*Cell\s*\(WBC\)\s*[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "white blood cell (wbc)"),
+    (r"Red\s*Blood\s*Cell\s*\(RBC\)\s*[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "red blood cell (rbc)"),
+    (r"Hemoglobin.*?\(HB\/?Hgb\)?\)?\s*[:\-]?\s*([\d.,]+)\s*(g\/dL)?", "hemoglobin"),
+    (r"Hematocrit.*?\(HCT\).*?[:\-]?\s*([\d.,]+)\s*(%)", "hematocrit"),
+    (r"Mean\s*Cell\s*Volume\s*\(MCV\).*?[:\-]?\s*([\d.,]+)\s*(fL)?", "mean cell volume (mcv)"),
+    (r"Mean\s*Cell\s*Hemoglobin\s*\(MCH\).*?[:\-]?\s*([\d.,]+)\s*(pg)?", "mean cell hemoglobin (mch)"),
+    (r"Mean\s*Cell\s*Hb\s*Conc\s*\(MCHC\).*?[:\-]?\s*([\d.,]+)\s*(g\/dL)?", "mean cell hb conc (mchc)"),
+    (r"Red\s*Cell\s*Dist\s*Width\s*\(RDW\).*?[:\-]?\s*([\d.,]+)\s*(%)", "red cell dist width (rdw)"),
+    (r"Platelet\s*count\s*[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "platelet count"),
+    (r"Mean\s*Platelet\s*Volume.*?[:\-]?\s*([\d.,]+)\s*(fL)?", "mean platelet volume (mpv)"),
+    (r"Neutrophil.*?\(Neut\).*?[:\-]?\s*([\d.,]+)\s*(%)", "neutrophils %"),
+    (r"Lymphocyte.*?\(Lymph\).*?[:\-]?\s*([\d.,]+)\s*(%)", "lymphocytes %"),
+    (r"Monocyte.*?\(Mono\).*?[:\-]?\s*([\d.,]+)\s*(%)", "monocytes %"),
+    (r"Eosinophil.*?\(Eos\).*?[:\-]?\s*([\d.,]+)\s*(%)", "eosinophils %"),
+    (r"Basophil.*?\(Baso\).*?[:\-]?\s*([\d.,]+)\s*(%)", "basophils %"),
+    (r"Neutrophil.*?Absolute.*?[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "absolute neutrophils"),
+    (r"Lymphocyte.*?Absolute.*?[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "absolute lymphocytes"),
+    (r"Monocyte.*?Absolute.*?[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "absolute monocytes"),
+    (r"Eosinophil.*?Absolute.*?[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "absolute eosinophils"),
+    (r"Basophil.*?Absolute.*?[:\-]?\s*([\d.,]+)\s*([A-Za-z/%µμ^0-9]*)", "absolute basophils"),
+]
+
+def extract_rows_text_fallback(pdf: Union[PdfDocument, bytes]) -> List[Dict[str, Any]]:
+    # Reuses the page text already extracted for this upload (no re-open).
+    try:
+        text = PdfDocument.coerce(pdf).text()
+    except Exception:
+        return []
+    rows: List[Dict[str, Any]] = []
+    for pat, kb_like_name in CBC_FALLBACK_PATTERNS:
+        m = re.search(pat, text, flags=re.IGNORECASE | re.DOTALL)
+        if not m: continue
+        raw_val = (m.group(1) or "").replace(",", "")
+        try:
+            val = float(raw_val)
+        except Exception:
+            continue
+        unit = (m.group(2) or "").strip() if m.lastindex and m.lastindex >= 2 else ""
+        # reasonable defaults when unit omitted
+        if kb_like_name in {"white blood cell (wbc)", "platelet count"} and not unit:
+            unit = "K/uL"
+        if kb_like_name == "red blood cell (rbc)" and not unit:
+            unit = "M/uL"
+        if kb_like_name.startswith("absolute ") and not unit:
+            unit = "K/uL"
+        rows.append({"test": kb_like_name, "value": val, "unit": unit})
+    return rows
+
+def parse_pdf_bytes(pdf: Union[PdfDocument, bytes], deadline: Optional[Deadline] = None) -> Tuple[List[Dict[str, Any]], float]:
     """
     Returns (rows, ocr_confidence)
     rows: [{"test": name, "value": float, "unit": str}]
+    Accepts raw bytes or a shared PdfDocument (preferred: opened once per upload).
+    With a deadline, OCR only covers the pages the remaining budget allows.
     """
+    doc = PdfDocument.coerce(pdf)
     # 1) structured tables
-    rows = _try_table_rows(pdf_bytes)
+    rows = _try_table_rows(doc)
     if rows:
         return rows, 0.97
 
     # 2) text + regex lines
-    text = extract_text_from_pdf(pdf_bytes)
+    text = extract_text_from_pdf(doc, deadline)
     rows = _try_line_rows(text)
     if rows:
         return rows, 0.92
 
     # 3) nothing found
     return [], 0.0
+
+def parse_upload(pdf_bytes: bytes, deadline: Optional[Deadline] = None) -> Tuple[List[Dict[str, Any]], float, List[str], str]:
+    """
+    Whole parse stage for one upload: tables -> text/OCR lines -> regex fallback.
+    Top-level and picklable so it can run inside the parse process pool.
+    Returns (rows, ocr_confidence, skipped, text): the deadline is a copy inside a
+    pool worker, so the steps it skipped travel back with the result; text is
+    the text layer + OCR output ("" when the tables alone were enough).
+    """
+    deadline = deadline or Deadline()
+    with PdfDocument(pdf_bytes) as doc:
+        rows, ocr_confidence = parse_pdf_bytes(doc, deadline)
+        if not rows:
+            # OCR/text fallback (very tolerant)
+            rows = extract_rows_text_fallback(doc)
+        text = doc.extracted_text or ""
+    return rows, ocr_confidence, deadline.skipped, text
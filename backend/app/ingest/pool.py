@@ -0,0 +1,147 @@
+# backend/app/ingest/pool.py
+from __future__ import annotations
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio, os, threading
+
+
+class ParsePoolSaturated(Exception):
+    """Raised instead of queueing when the parse pool is at its in-flight limit."""
+
+    def __init__(self, in_flight: int, limit: int, retry_after: int = 2):
+        super().__init__(f"parse pool saturated ({in_flight}/{limit} in flight)")
+        self.in_flight = in_flight
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+class ParsePoolTimeout(TimeoutError):
+    """Raised when a parse job runs longer than the pool's `timeout`."""
+
+    def __init__(self, timeout: float):
+        super().__init__(f"parse job still running after {timeout:g}s")
+        self.timeout = timeout
+
+
+def _noop() -> None:
+    return None
+
+
+class ParsePool:
+    """
+    Bounded executor for the CPU-bound parse/OCR stage.
+
+    Work runs in a process pool so pdfplumber layout analysis and OCR never
+    block the event loop (or each other, via the GIL). At most `max_in_flight`
+    jobs are accepted at once; beyond that `run` raises ParsePoolSaturated so
+    the API can answer 503 immediately instead of stalling. A caller waits at
+    most `timeout` seconds (ParsePoolTimeout); the job keeps its in-flight slot
+    until its worker is actually done, so a stuck parse still counts against
+    the limit. A dead worker (BrokenProcessPool) replaces the executor.
+    workers=0 runs jobs on the loop's default thread executor (dev/tests).
+    """
+
+    def __init__(self, workers: int, max_in_flight: int, retry_after: int = 2, timeout: Optional[float] = None):
+        self.workers = max(0, workers)
+        self.max_in_flight = max(1, max_in_flight)
+        self.retry_after = retry_after
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timeouts = 0
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers == 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _reset_executor(self, broken: Optional[ProcessPoolExecutor] = None) -> None:
+        with self._lock:
+            if broken is not None and self._executor is not broken:
+                return   # another caller of the same dead pool already replaced it
+            ex, self._executor = self._executor, None
+        if ex is not None:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+    def _done(self, fut: "asyncio.Future[Any]") -> None:
+        # runs when the worker is finished, not when the caller stops waiting
+        with self._lock:
+            self._in_flight -= 1
+            if fut.cancelled() or fut.exception() is not None:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                self._rejected += 1
+                raise ParsePoolSaturated(self._in_flight, self.max_in_flight, self.retry_after)
+            self._in_flight += 1
+        ex = None
+        try:
+            ex = self._get_executor()
+            fut = asyncio.get_running_loop().run_in_executor(ex, fn, *args)
+        except BaseException as e:
+            with self._lock:
+                self._in_flight -= 1
+            if isinstance(e, BrokenProcessPool):
+                self._reset_executor(ex)   # broke between jobs: refuse this one, replace the pool
+            raise
+        fut.add_done_callback(self._done)
+        try:
+            # shield: a caller that times out or is cancelled leaves the job (and its slot) to finish
+            return await asyncio.wait_for(asyncio.shield(fut), self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            raise ParsePoolTimeout(self.timeout) from None
+        except BrokenProcessPool:
+            # a worker died (OOM, segfault in a native lib); start fresh next time
+            self._reset_executor(ex)
+            raise
+
+    async def warm(self) -> None:
+        """Start the worker processes now (they fork with whatever the parent has loaded)."""
+        ex = self._get_executor()
+        if ex is not None:
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(ex, _noop) for _ in range(self.workers)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            busy = self._in_flight if self.workers == 0 else min(self._in_flight, self.workers)
+            return {
+                "workers": self.workers,
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self._in_flight,
+                "queue_depth": self._in_flight - busy,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+            }
+
+    def shutdown(self) -> None:
+        self._reset_executor()
+
+
+# convenient singleton
+_parse_pool: Optional[ParsePool] = None
+
+def get_parse_pool() -> ParsePool:
+    global _parse_pool
+    if _parse_pool is None:
+        workers = int(os.getenv("PARSE_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+        max_in_flight = int(os.getenv("PARSE_POOL_MAX_INFLIGHT", str(max(1, workers) * 2)))
+        _parse_pool = ParsePool(workers, max_in_flight, int(os.getenv("PARSE_POOL_RETRY_AFTER", "2")),
+                                timeout=float(os.getenv("PARSE_POOL_TIMEOUT_SEC", "120")))
+    return _parse_pool
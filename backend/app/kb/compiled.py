@@ -0,0 +1,160 @@
+# app/kb/compiled.py
+from __future__ import annotations
+from typing import Dict, Any, Optional, List, Iterator, Mapping
+import hashlib, json, os, pickle, threading
+
+from app.kb.loader import kb_path, build_kb_dict
+from app.normalize.normalized_values import canonical_unit
+from app.core.resolver import RangeIndex
+
+# Bump when the compiled layout changes so stale caches are rebuilt.
+COMPILE_FORMAT = 3
+
+
+class CompiledKB(Mapping):
+    """
+    Read-only, precomputed view of tests_kb_v2.json, built once per process.
+
+    Behaves like the old `load_kb()` dict (every alias/key -> entry), plus:
+      - `aliases`: every lookup key -> canonical key (lower-cased test_name)
+      - `unit_tables`: canonical key -> {canonical unit -> {"unit", "ranges", "index"}}
+      - `version`: short content hash of the KB JSON
+    Entries are shared by every caller; treat them as read-only.
+    """
+
+    def __init__(self, entries: Dict[str, Dict[str, Any]], aliases: Dict[str, str],
+                 unit_tables: Dict[str, Dict[str, Dict[str, Any]]], version: str):
+        self._entries = entries
+        self.aliases = aliases
+        self.unit_tables = unit_tables
+        self.version = version
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        return self._entries[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def canonical_key(self, key: Optional[str]) -> Optional[str]:
+        return self.aliases.get((key or "").strip().lower())
+
+    def units_for(self, key: Optional[str]) -> Dict[str, Dict[str, Any]]:
+        """Range tables for a KB key, keyed by canonical unit (first = KB default)."""
+        ck = self.canonical_key(key)
+        return self.unit_tables.get(ck, {}) if ck else {}
+
+    def entry_for_unit(self, key: Optional[str], unit: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        KB entry flattened to the {"unit", "ranges", ...} shape used by the analyzer.
+
+        Picks the range table written in the report's own unit when the KB has one
+        (`unit_matched` True, value can be compared as-is). Otherwise returns the
+        KB's default table and the caller converts the value into its unit.
+        """
+        ck = self.canonical_key(key)
+        if not ck:
+            return None
+        entry = self._entries[ck]
+        tables = self.unit_tables.get(ck) or {}
+        table = tables.get(canonical_unit(unit)) if unit else None
+        matched = table is not None
+        if table is None:
+            table = next(iter(tables.values()), None) or _table(entry.get("unit") or entry.get("canonical_unit"), [])
+        out = {k: v for k, v in entry.items() if k != "units"}
+        out.update(unit=table["unit"], ranges=table["ranges"], range_index=table["index"], unit_matched=matched)
+        return out
+
+
+def _table(unit: Optional[str], ranges: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"unit": unit, "ranges": ranges, "index": RangeIndex(ranges)}
+
+
+def _unit_tables(entry: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    # multi-unit entries: "units": [{"unit", "ranges"}]; single-unit: canonical_unit + ranges
+    tables: Dict[str, Dict[str, Any]] = {}
+    for u in entry.get("units") or []:
+        if isinstance(u, dict):
+            tables.setdefault(canonical_unit(u.get("unit")), _table(u.get("unit"), list(u.get("ranges") or [])))
+    if entry.get("ranges"):
+        unit = entry.get("unit") or entry.get("canonical_unit")
+        tables.setdefault(canonical_unit(unit), _table(unit, list(entry["ranges"])))
+    return tables
+
+
+def compile_kb(data: Any, version: str) -> CompiledKB:
+    entries = build_kb_dict(data)
+    canonical_by_entry: Dict[int, str] = {}
+    aliases: Dict[str, str] = {}
+    unit_tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for key, entry in entries.items():
+        # first key seen for an entry is its lower-cased test_name (see build_kb_dict)
+        ck = canonical_by_entry.setdefault(id(entry), key)
+        aliases[key] = ck
+        if ck == key:
+            unit_tables[ck] = _unit_tables(entry)
+    return CompiledKB(entries, aliases, unit_tables, version)
+
+
+def _cache_path(path: str) -> str:
+    return os.getenv("KB_CACHE_PATH", path + ".compiled.pkl")
+
+
+def _load_cached(cache_path: str, stat_key: tuple, raw: Optional[bytes]) -> Optional[CompiledKB]:
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+    except Exception:
+        return None
+    if cached.get("format") != COMPILE_FORMAT:
+        return None
+    # fast path: same mtime/size; slow path: content hash unchanged (e.g. touched file)
+    if cached.get("stat") == stat_key or (raw is not None and cached.get("sha") == hashlib.sha256(raw).hexdigest()):
+        return cached.get("kb")
+    return None
+
+
+def build_compiled_kb(path: Optional[str] = None, use_cache: Optional[bool] = None) -> CompiledKB:
+    path = path or kb_path()
+    if use_cache is None:
+        use_cache = os.getenv("KB_CACHE", "1") != "0"
+    st = os.stat(path)
+    stat_key = (st.st_mtime_ns, st.st_size)
+    cache_path = _cache_path(path)
+    if use_cache:
+        kb = _load_cached(cache_path, stat_key, None)
+        if kb is not None:
+            return kb
+    with open(path, "rb") as f:
+        raw = f.read()
+    if use_cache:
+        kb = _load_cached(cache_path, stat_key, raw)
+        if kb is not None:
+            return kb
+    sha = hashlib.sha256(raw).hexdigest()
+    kb = compile_kb(json.loads(raw.decode("utf-8")), version=sha[:12])
+    if use_cache:
+        try:
+            tmp = cache_path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump({"format": COMPILE_FORMAT, "stat": stat_key, "sha": sha, "kb": kb}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_path)
+        except Exception as e:
+            print(f"[KB] Could not write compiled cache: {e}")
+    return kb
+
+
+# shared singleton: routes, summarizer and chatbot all use this one instance
+_kb: Optional[CompiledKB] = None
+_kb_lock = threading.Lock()
+
+def get_kb() -> CompiledKB:
+    global _kb
+    if _kb is None:
+        with _kb_lock:
+            if _kb is None:
+                _kb = build_compiled_kb()
+    return _kb
@@ -3,11 +3,18 @@ from __future__ import annotations
 from typing import Dict, Any, Optional, List
 import json, os
 from app.rag.store import get_rag_store  # <-- uses our tiny RAG store
+from app.core.deadline import Deadline
+
+def kb_path() -> str:
+    return os.getenv("KB_PATH", os.path.join(os.path.dirname(__file__), "tests_kb_v2.json"))
 
 def load_kb() -> Dict[str, Any]:
-    path = os.getenv("KB_PATH", os.path.join(os.path.dirname(__file__), "tests_kb_v2.json"))
-    with open(path, "r", encoding="utf-8") as f:
+    """Parse the KB JSON into a plain dict. App code should use app.kb.compiled.get_kb()."""
+    with open(kb_path(), "r", encoding="utf-8") as f:
         data = json.load(f)
+    return build_kb_dict(data)
+
+def build_kb_dict(data: Any) -> Dict[str, Any]:
     # Support both dict and list KB formats
     if isinstance(data, list):
         kb_dict = {}
@@ -49,10 +56,11 @@ def load_kb() -> Dict[str, Any]:
         out[str((k or "")).strip().lower()] = v
     return out
 
-def get_entry_with_rag(KB: Dict[str, Any], key: str) -> Optional[Dict[str, Any]]:
+def get_entry_with_rag(KB: Dict[str, Any], key: str, deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
     """
     If a key is missing in the static KB, ask the small RAG store for a compatible entry.
     Returns a dict shaped like KB[test_name]: {"unit": "...", "ranges":[...], "advice": {...}} or None.
+    The RAG query is skipped once the deadline has run out.
     """
     name = (key or "").strip().lower()
     if not name:
@@ -63,6 +71,9 @@ def get_entry_with_rag(KB: Dict[str, Any], key: str) -> Optional[Dict[str, Any]]
         return KB[name]
 
     # query rag store
+    if deadline is not None and deadline.expired():
+        deadline.skip(f"rag:{name}")
+        return None
     store = get_rag_store()
     docs = store.query(name, top_k=1)
     if not docs:
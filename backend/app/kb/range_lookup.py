@@ -0,0 +1,207 @@
+# app/kb/range_lookup.py
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+import asyncio, copy, json, os, threading, time
+
+from app.core.resolver import age_bucket, sex_key
+
+Key = Tuple[str, str, str]                                             # (name, age band, sex)
+Fetch = Callable[[str, Any, str, str], Awaitable[Optional[Dict[str, Any]]]]  # (name, age, sex, priority) -> KB-like entry
+Persist = Callable[[str, Dict[str, Any]], None]                        # (name, entry) -> None, runs in a thread
+
+
+def normalize_name(name: Optional[str]) -> str:
+    return " ".join((name or "").strip().lower().split())
+
+def usable(entry: Optional[Dict[str, Any]]) -> bool:
+    """An answer is only worth keeping if at least one range has a numeric bound."""
+    if not isinstance(entry, dict):
+        return False
+    for r in entry.get("ranges") or []:
+        if isinstance(r, dict) and (isinstance(r.get("low"), (int, float)) or isinstance(r.get("high"), (int, float))):
+            return True
+    return False
+
+
+async def groq_fetch(name: str, age: Any, sex: str, priority: str = "background") -> Optional[Dict[str, Any]]:
+    """
+    Ask the LLM for unit/ranges/advice of a test the KB does not know.
+    `priority` is the scheduler class: "summary" when a request waits on the
+    answer, "background" for warm-up or write-through work.
+    """
+    from app.summarize.llm import resolve_model
+    from app.summarize.client import achat
+    from app.summarize.models import get_model_registry
+
+    model_to_use = None
+    try:
+        model_to_use = await resolve_model()
+        prompt = f"For the lab test '{name}', what is the standard unit and reference range for a {age}-year-old {sex}? Provide a JSON with keys: unit, ranges (list of dicts with low/high), and advice (dict with 'low' and 'high')."
+        completion = await achat(
+            model=model_to_use,
+            messages=[
+                {"role": "system", "content": "You are a medical assistant AI."},
+                {"role": "user", "content": prompt},
+                {"role": "system", "content": "Return ONLY valid JSON. No prose."},
+            ],
+            temperature=0.1,
+            max_tokens=400,
+            response_format={"type": "json_object"},
+            priority=priority,
+        )
+        data = json.loads(completion.choices[0].message.content.strip())
+    except Exception as e:
+        get_model_registry().report_failure(model_to_use, e)
+        raise
+    return {
+        "unit": data.get("unit"),
+        "ranges": data.get("ranges", []),
+        "advice": data.get("advice", {}),
+        "source": "groq_llm",
+    }
+
+_rag_lock = threading.Lock()
+
+def save_to_rag(name: str, entry: Dict[str, Any]) -> None:
+    from app.rag.store import get_rag_store, RangeDoc
+    doc = RangeDoc(
+        id=f"groq_{name}",
+        test_name=name,
+        unit=entry.get("unit"),
+        ranges=entry.get("ranges", []),
+        source="groq_llm",
+        notes="Auto-added from Groq LLM",
+    )
+    with _rag_lock:  # RagStore rewrites its JSON file on every add
+        get_rag_store().add_docs([doc])
+
+
+class RangeLookup:
+    """
+    LLM reference-range lookups for tests the KB does not cover.
+
+    Results are cached per (normalized name, age band, sex): answers for
+    `ttl` seconds, tests the LLM could not answer for `negative_ttl`.
+    Identical lookups already in flight share one call, so an unknown
+    analyte costs at most one LLM request per process. New answers are
+    written through to the RAG store in a worker thread (the request does
+    not wait on it), which is what later processes find first.
+    """
+
+    def __init__(self, fetch: Optional[Fetch] = None, persist: Optional[Persist] = save_to_rag,
+                 ttl: float = 7 * 86400, negative_ttl: float = 3600, max_entries: int = 2048):
+        self._fetch = fetch or groq_fetch
+        self._persist = persist
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max(1, max_entries)
+        self._cache: "OrderedDict[Key, tuple]" = OrderedDict()   # key -> (expires_at, entry or None)
+        self._inflight: Dict[Key, asyncio.Future] = {}
+        self._tasks: set = set()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "negative_hits": 0, "coalesced": 0, "llm_calls": 0, "llm_errors": 0,
+                         "rag_writes": 0}
+
+    @staticmethod
+    def key(name: str, age: Any, sex: Optional[str]) -> Key:
+        return normalize_name(name), age_bucket(age), sex_key(sex)
+
+    def _cached(self, key: Key) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None:
+                return False, None
+            if item[0] <= time.monotonic():
+                del self._cache[key]
+                return False, None
+            self._cache.move_to_end(key)
+            self.counters["hits" if item[1] is not None else "negative_hits"] += 1
+            return True, item[1]
+
+    def _remember(self, key: Key, entry: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._cache[key] = (time.monotonic() + (self.ttl if entry is not None else self.negative_ttl), entry)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    async def lookup(self, name: str, age: Any, sex: Optional[str],
+                     priority: str = "background") -> Optional[Dict[str, Any]]:
+        """
+        KB-like entry {unit, ranges, advice, source} or None if the LLM has no
+        usable answer. Callers serving a request pass priority="summary" so the
+        lookup does not queue behind every summary call; a joined in-flight
+        lookup keeps the priority it was started with.
+        """
+        key = self.key(name, age, sex)
+        if not key[0]:
+            return None
+        found, entry = self._cached(key)
+        if not found:
+            fut = self._inflight.get(key)
+            if fut is None:
+                fut = asyncio.ensure_future(self._run(key, age, sex, priority))
+                self._inflight[key] = fut
+                fut.add_done_callback(lambda _f, k=key: self._inflight.pop(k, None))
+            else:
+                self.counters["coalesced"] += 1
+            # shield: a cancelled caller must not cancel the lookup others are waiting on
+            entry = await asyncio.shield(fut)
+        return copy.deepcopy(entry) if entry is not None else None
+
+    async def _run(self, key: Key, age: Any, sex: Optional[str], priority: str) -> Optional[Dict[str, Any]]:
+        from app.summarize.breaker import is_outage
+        name = key[0]
+        self.counters["llm_calls"] += 1
+        try:
+            entry = await self._fetch(name, age, sex, priority)
+        except Exception as e:
+            self.counters["llm_errors"] += 1
+            print(f"[GROQ] Exception getting info for {name}: {e}")
+            if is_outage(e):
+                return None  # rate limit/outage/open circuit: say nothing about the test, let a later request retry
+            entry = None
+        if not usable(entry):
+            entry = None
+        self._remember(key, entry)
+        if entry is not None and self._persist:
+            self._write_through(name, entry)
+        return entry
+
+    def _write_through(self, name: str, entry: Dict[str, Any]) -> None:
+        persist, doc = self._persist, copy.deepcopy(entry)
+
+        async def run():
+            try:
+                await asyncio.to_thread(persist, name, doc)
+                self.counters["rag_writes"] += 1
+            except Exception as e:
+                print(f"[RAG] Could not cache Groq doc: {e}")
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> None:
+        """Wait for pending RAG writes (app shutdown)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "entries": len(self._cache), "inflight": len(self._inflight)}
+
+
+_lookup: Optional[RangeLookup] = None
+_lookup_lock = threading.Lock()
+
+def get_range_lookup() -> RangeLookup:
+    global _lookup
+    if _lookup is None:
+        with _lookup_lock:
+            if _lookup is None:
+                _lookup = RangeLookup(
+                    ttl=float(os.getenv("RANGE_LOOKUP_TTL", str(7 * 86400))),
+                    negative_ttl=float(os.getenv("RANGE_LOOKUP_NEGATIVE_TTL", "3600")),
+                    max_entries=int(os.getenv("RANGE_LOOKUP_MAX_ENTRIES", "2048")),
+                )
+    return _lookup
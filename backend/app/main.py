@@ -1,9 +1,23 @@
+import time
+_IMPORT_T0 = time.perf_counter()
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router as api_router
-from app.api.upload import router as upload_router
+from app.api.upload import router as upload_router, jobs
 # from app.api.report_api import router as report_router  # REMOVE: endpoints moved to routes.py
 from app.api.auth import router as auth_router
+from app.ingest.pool import get_parse_pool
+from app.ocr.pool import get_ocr_pool
+from app.summarize.models import get_model_registry
+from app.summarize.client import get_llm
+from app.summarize.cache import get_summary_cache
+from app.ingest.cache import get_parse_cache
+from app.kb.range_lookup import get_range_lookup
+from app.core.latency import get_latency_tracker
+from app.summarize.breaker import get_breaker
+from app.summarize.scheduler import get_scheduler
+from app.core.startup import get_startup, warm_up_steps
 try:
     from dotenv import load_dotenv
     import os
@@ -12,6 +26,8 @@ try:
 except Exception:
     pass
 
+get_startup().record("import", (time.perf_counter() - _IMPORT_T0) * 1000.0)
+
 app = FastAPI(title="NutriScope v2 API", version="2.0.0")
 app.add_middleware(
     CORSMiddleware,
@@ -23,6 +39,35 @@ app.include_router(upload_router)
 # app.include_router(report_router)  # REMOVE: endpoints moved to routes.py
 app.include_router(auth_router)
 
+@app.on_event("startup")
+async def _start_jobs():
+    startup = get_startup()
+    with startup.phase("llm_client"):
+        await get_llm().start()
+    with startup.phase("jobs"):
+        jobs.start()
+    startup.mark_started()
+    # KB, OCR weights, Chroma, worker processes, model list: built lazily, warmed here in the background
+    startup.start_warm_up(warm_up_steps())
+
+@app.on_event("shutdown")
+async def _shutdown_workers():
+    await get_startup().stop()
+    await jobs.stop()
+    await get_range_lookup().flush()
+    await get_model_registry().stop()
+    await get_llm().close()
+    get_parse_pool().shutdown()
+    get_ocr_pool().shutdown()
+
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {"status": "ok", "parse_pool": get_parse_pool().stats(), "llm_models": get_model_registry().stats(),
+            "summary_cache": get_summary_cache().stats(), "parse_cache": get_parse_cache().stats(), "range_lookup": get_range_lookup().stats(),
+            "latency": get_latency_tracker().stats(), "llm_breaker": get_breaker().stats(),
+            "llm_scheduler": get_scheduler().stats(), "startup": get_startup().report()}
+
+@app.get("/ready")
+async def ready():
+    report = get_startup().report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
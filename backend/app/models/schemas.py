@@ -1,5 +1,5 @@
 # app/models/schemas.py
-from typing import Optional, List, Literal, Dict, Any
+from typing import Optional, List, Literal, Dict, Any, Union
 from pydantic import BaseModel
 
 Sex = Literal["male", "female"]
@@ -26,7 +26,12 @@ class ResultRow(BaseModel):
 class AnalyzeMeta(BaseModel):
     ocr_confidence: float
     analyzer_version: str
-    groq_used: Optional[bool] = None  # ✅ carries the Groq usage flag
+    groq_used: Optional[Union[bool, Literal["cache"]]] = None  # ✅ carries the Groq usage flag ("cache" = summary cache hit)
+    mode: Optional[Literal["fast", "llm", "auto"]] = None      # analyze mode actually used
+    latency_ms: Optional[float] = None
+    deadline_left_ms: Optional[float] = None                   # None = request had no deadline
+    skipped: Optional[List[str]] = None                        # steps left out to meet the deadline
+    parse_cache: Optional[Literal["hit", "miss", "off"]] = None  # hit = same upload bytes parsed before
 
 class AnalyzeResponse(BaseModel):
     context: Dict[str, Any]
@@ -0,0 +1,143 @@
+# app/normalize/name_resolver.py
+from __future__ import annotations
+from typing import Dict, Mapping, Optional, Any
+from collections import OrderedDict
+import os, re, threading
+
+from app.normalize.aliases import ALIASES
+
+_PARENS_RE = re.compile(r"\s*\([^)]*\)\s*")
+_PAREN_GROUP_RE = re.compile(r"\(([^)]+)\)")
+_ABBR_SPLIT_RE = re.compile(r"[\/\s,]+")
+_ALIAS_STRIP_RE = re.compile(r"\([^)]*\)")
+_ALIAS_PUNCT_RE = re.compile(r"[\s\-_/]+")
+
+# Abbreviation inside parentheses -> long form, e.g. "Hemoglobin (Hb)"
+EXPAND: Dict[str, str] = {
+    "hb": "hemoglobin", "hgb": "hemoglobin", "hct": "hematocrit",
+    "wbc": "white blood cell", "rbc": "red blood cell",
+    "mcv": "mean corpuscular volume (mcv)",
+    "mch": "mean corpuscular hemoglobin (mch)",
+    "mchc": "mean corpuscular hemoglobin concentration (mchc)",
+    "rdw": "red cell distribution width (rdw)",
+    "mpv": "mean platelet volume (mpv)",
+    "plt": "platelet count",
+    "vit d": "vitamin d (25-oh)", "vitamin d3": "vitamin d (25-oh)",
+}
+
+# Report spellings -> candidate KB keys, tried in order
+CANON: Dict[str, list] = {
+    "white blood cell (wbc)": ["wbc", "white blood cell"],
+    "red blood cell (rbc)": ["rbc", "red blood cell"],
+    "hemoglobin (hb/hgb)": ["hemoglobin", "hb", "hgb"],
+    "hematocrit (hct)": ["hematocrit", "hct"],
+    "mean cell volume (mcv)": ["mcv", "mean corpuscular volume (mcv)"],
+    "mean cell hemoglobin (mch)": ["mch", "mean corpuscular hemoglobin (mch)"],
+    "mean cell hb conc (mchc)": ["mchc", "mean corpuscular hemoglobin concentration (mchc)"],
+    "red cell dist width (rdw)": ["rdw", "red cell distribution width (rdw)"],
+    "mean platelet volume": ["mpv", "mean platelet volume (mpv)"],
+    "neutrophil (neut)": ["neutrophils %", "neutrophils"],
+    "lymphocyte (lymph)": ["lymphocytes %", "lymphocytes"],
+    "monocyte (mono)": ["monocytes %", "monocytes"],
+    "eosinophil (eos)": ["eosinophils %", "eosinophils"],
+    "basophil (baso)": ["basophils %", "basophils"],
+    "platelet count": ["platelet count", "platelets", "plt"],
+    "vitamin d (25-oh)": ["vit d", "vitamin d", "vitamin d3"],
+}
+
+
+class NameResolver:
+    """
+    Maps a report test name to the KB key it should be evaluated against.
+
+    Everything that does not depend on the input string - KB keys, the
+    EXPAND/CANON variant tables and ALIASES - is flattened into dicts once.
+    Per-name results are kept in a bounded LRU, so a name is only worked
+    out the first time it is seen.
+    """
+
+    def __init__(self, kb: Mapping[str, Any], aliases: Mapping[str, str] = ALIASES,
+                 cache_size: int = 4096):
+        self._keys = {k: k for k in kb}
+        self._expand = {a: lf for a, lf in EXPAND.items() if lf in self._keys}
+        self._variants: Dict[str, str] = {}
+        for k, variants in CANON.items():
+            for name in (k, *variants):
+                if name in self._variants:
+                    continue
+                hit = next((v for v in (name, k, *variants) if v in self._keys), None)
+                if hit:
+                    self._variants[name] = hit
+        # ALIASES are the last resort for spellings nothing above knows about
+        self._aliases: Dict[str, str] = {}
+        for alias, canonical in aliases.items():
+            key = self._lookup(canonical)
+            if key:
+                self._aliases[alias] = key
+        self.cache_size = max(0, cache_size)
+        self._cache: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, n: str) -> Optional[str]:
+        key = self._keys.get(n)
+        if key:
+            return key
+        if n.endswith(" %") and n[:-2].strip() in self._keys:
+            return n[:-2].strip()
+        if "(" in n:
+            no_parens = _PARENS_RE.sub("", n).strip()
+            if no_parens in self._keys:
+                return no_parens
+            m = _PAREN_GROUP_RE.search(n)
+            if m:
+                inner = m.group(1).strip()
+                for a in _ABBR_SPLIT_RE.split(inner):
+                    if not a: continue
+                    if a in self._keys: return a
+                    if f"{a} %" in self._keys: return f"{a} %"
+                lf = self._expand.get(inner)
+                if lf:
+                    return lf
+        return self._variants.get(n) or self._keys.get(" ".join(n.split()))
+
+    def _resolve(self, n: str) -> Optional[str]:
+        key = self._lookup(n)
+        if key:
+            return key
+        s = _ALIAS_PUNCT_RE.sub(" ", _ALIAS_STRIP_RE.sub("", n).replace(")", "").replace("(", "")).strip()
+        return self._aliases.get(s) or self._aliases.get(s.replace(" percentage", "").replace(" percent", ""))
+
+    def resolve(self, name: Optional[str]) -> Optional[str]:
+        if not name: return None
+        n = name.strip().lower()
+        with self._lock:
+            if n in self._cache:
+                self._cache.move_to_end(n)
+                self.hits += 1
+                return self._cache[n]
+        key = self._resolve(n)
+        with self._lock:
+            self.misses += 1
+            if self.cache_size:
+                self._cache[n] = key
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return key
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._cache), "max": self.cache_size, "hits": self.hits, "misses": self.misses}
+
+
+_resolver: Optional[NameResolver] = None
+_resolver_lock = threading.Lock()
+
+def get_name_resolver() -> NameResolver:
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                from app.kb.compiled import get_kb
+                _resolver = NameResolver(get_kb(), cache_size=int(os.getenv("NAME_CACHE_SIZE", "4096")))
+    return _resolver
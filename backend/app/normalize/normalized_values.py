@@ -9,6 +9,8 @@ UNIT_SYNONYMS: Dict[str, str] = {
     # Count
     "k/µl": "K/uL", "k/μl": "K/uL", "k/ul": "K/uL", "x10^3/µl": "K/uL", "10^3/µl": "K/uL", "x10^3/ul": "K/uL", "10^3/ul": "K/uL",
     "m/µl": "M/uL", "m/μl": "M/uL", "m/ul": "M/uL", "x10^6/µl": "M/uL", "10^6/µl": "M/uL", "x10^6/ul": "M/uL", "10^6/ul": "M/uL",
+    # SI counts are the same magnitudes: 10^9/L == 10^3/uL, 10^12/L == 10^6/uL
+    "x10^9/l": "K/uL", "10^9/l": "K/uL", "x10^12/l": "M/uL", "10^12/l": "M/uL",
     # Mass/volume
     "fl": "fL", "femtoliter": "fL", "pg": "pg", "picogram": "pg", "g/dl": "g/dL", "mg/dl": "mg/dL", "g/l": "g/L", "mg/l": "mg/L",
     # Concentration
@@ -34,7 +36,10 @@ def canonical_unit(u: str | None) -> str:
     if not u:
         return ""
     u = u.strip().lower()
-    return UNIT_SYNONYMS.get(u, u)
+    if u in UNIT_SYNONYMS:
+        return UNIT_SYNONYMS[u]
+    # KB tables write "X 10^3/µL"; reports usually print it without spaces
+    return UNIT_SYNONYMS.get(u.replace(" ", ""), u)
 
 # ---- Common per-test families ---------------------------------------------
 CBC_COUNT_KEYS = {
@@ -1,21 +1,54 @@
 # backend/app/ocr/extract.py
 from __future__ import annotations
-from typing import List
-import io, os
+from typing import Any, Dict, List, Optional, Union
+import os, threading
+import importlib.util
 from PIL import Image
-import pdfplumber
+from app.ingest.document import PdfDocument
+from app.core.deadline import Deadline
+from app.ocr import regions
+
+# Expected cost of OCR-ing one page; a page is skipped when less than this is left
+OCR_PAGE_SEC = float(os.getenv("OCR_PAGE_SEC", "2.0"))
+
+# Per-page routing: a page is OCR'd when its text layer has fewer than OCR_MIN_PAGE_CHARS
+# characters, or when images cover at least OCR_MIN_IMAGE_RATIO of it with (almost) no text on top
+OCR_MIN_PAGE_CHARS = int(os.getenv("OCR_MIN_PAGE_CHARS", "50"))
+OCR_MIN_IMAGE_RATIO = float(os.getenv("OCR_MIN_IMAGE_RATIO", "0.25"))
+
+# "roi": find text regions on a cheap low-dpi render, OCR only those crops (needs OpenCV);
+# "full": OCR the whole page at 300 dpi
+OCR_MODE = os.getenv("OCR_MODE", "roi").strip().lower()
 
 # Optional OCR engines
 USE_EASYOCR = os.getenv("OCR_ENGINE", "eas y ocr").lower().startswith("easy")
 USE_TESS = os.getenv("OCR_ENGINE", "easyocr").lower().startswith("tess")
 
 _easyocr_reader = None
-if USE_EASYOCR:
-    try:
-        import easyocr  # type: ignore
-        _easyocr_reader = easyocr.Reader(["en"], gpu=False)
-    except Exception:
-        _easyocr_reader = None
+_easyocr_failed = False
+_easyocr_lock = threading.Lock()
+
+def get_easyocr_reader():
+    """
+    The easyocr Reader, built on first use: loading its model weights takes
+    seconds, so it is not done at import. Startup warm-up builds it before the
+    parse pool forks, so parse and OCR workers inherit the weights instead of
+    loading them again (each still holds its own resident copy once it runs
+    the model; see OcrPool). None if easyocr is off or unavailable.
+    """
+    global _easyocr_reader, _easyocr_failed
+    if not USE_EASYOCR or _easyocr_failed:
+        return None
+    if _easyocr_reader is None:
+        with _easyocr_lock:
+            if _easyocr_reader is None and not _easyocr_failed:
+                try:
+                    import easyocr  # type: ignore
+                    _easyocr_reader = easyocr.Reader(["en"], gpu=False)
+                except Exception as e:
+                    print(f"[OCR] easyocr unavailable: {e}")
+                    _easyocr_failed = True
+    return _easyocr_reader
 
 if USE_TESS:
     try:
@@ -23,38 +56,92 @@ if USE_TESS:
     except Exception:
         pytesseract = None  # type: ignore
 
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
-    """1) try pdf text  2) fallback OCR per page (Fast + Good)."""
-    # (1) pdf text
-    text_chunks: List[str] = []
-    try:
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            for p in pdf.pages:
-                t = p.extract_text() or ""
-                if t.strip():
-                    text_chunks.append(t)
-    except Exception:
-        pass
+def ocr_available() -> bool:
+    """Whether an OCR engine can run at all; without one, pages are not even rasterized."""
+    if USE_EASYOCR and not _easyocr_failed and importlib.util.find_spec("easyocr") is not None:
+        return True
+    return bool(USE_TESS and pytesseract)
 
-    base_text = "\n".join(text_chunks).strip()
-    if len(base_text) > 50:
-        return base_text
+def ocr_image(im) -> Optional[str]:
+    """Text of one rasterized page with the configured engine (None if there is none)."""
+    reader = get_easyocr_reader()
+    if reader is not None:
+        res = reader.readtext(im, detail=0, paragraph=True)
+        return "\n".join(res)
+    if USE_TESS and pytesseract:
+        return pytesseract.image_to_string(Image.fromarray(im))
+    return None
 
-    # (2) OCR images per page
-    try:
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            ocr_chunks: List[str] = []
-            for p in pdf.pages:
-                im = p.to_image(resolution=300).original
-                if USE_EASYOCR and _easyocr_reader:
-                    res = _easyocr_reader.readtext(im, detail=0, paragraph=True)
-                    ocr_chunks.append("\n".join(res))
-                elif USE_TESS and pytesseract:
-                    txt = pytesseract.image_to_string(Image.fromarray(im))
-                    ocr_chunks.append(txt)
-                else:
-                    # as last resort, try pdf text again at high res (already tried)
-                    pass
-        return "\n".join(ocr_chunks).strip()
-    except Exception:
-        return base_text or ""
+def ocr_page(doc: PdfDocument, i: int, resolution: int = 300) -> Optional[str]:
+    """
+    OCR one page. In roi mode the page is first rendered at ROI_DETECT_DPI to find
+    text bands; only those are rendered again, at the dpi their glyph height
+    needs, and fed to the engine. Pages where the bands cover most of the page,
+    or where nothing was detected, are OCR'd whole (at the adaptive dpi if known).
+    """
+    if OCR_MODE == "roi" and regions.CV_OK:
+        small = doc.page_image(i, resolution=regions.ROI_DETECT_DPI)
+        boxes, glyph_px = regions.find_regions(small)
+        if glyph_px:
+            resolution = min(resolution, regions.ocr_resolution(glyph_px))
+        if boxes and regions.coverage(boxes, small.size) <= regions.ROI_MAX_COVERAGE:
+            to_pt = 72.0 / regions.ROI_DETECT_DPI
+            texts, pixels = [], 0
+            for x0, top, x1, bottom in boxes:
+                crop = doc.region_image(i, (x0 * to_pt, top * to_pt, x1 * to_pt, bottom * to_pt), resolution)
+                pixels += crop.size[0] * crop.size[1]
+                txt = ocr_image(crop)
+                if txt is None:
+                    return None
+                if txt.strip():
+                    texts.append(txt)
+            full = (small.size[0] * 300 / regions.ROI_DETECT_DPI) * (small.size[1] * 300 / regions.ROI_DETECT_DPI)
+            print(f"[OCR] Page {i + 1}: {len(boxes)} region(s) at {resolution} dpi, "
+                  f"{pixels / 1e6:.2f} MP vs {full / 1e6:.2f} MP full page")
+            return "\n".join(texts)
+    return ocr_image(doc.page_image(i, resolution=resolution))
+
+def needs_ocr(layout: Dict[str, Any]) -> bool:
+    if layout.get("chars", 0) < OCR_MIN_PAGE_CHARS:
+        return True
+    return layout.get("image_ratio", 0.0) >= OCR_MIN_IMAGE_RATIO and layout.get("chars_on_images", 0) < OCR_MIN_PAGE_CHARS
+
+def extract_text_from_pdf(pdf: Union[PdfDocument, bytes], deadline: Optional[Deadline] = None) -> str:
+    """
+    Page by page: native text where the text layer covers the page, OCR where it
+    does not (scanned pages, pages that are mostly an image), as far as the deadline allows.
+    When pages needed OCR but did not get it (no engine, engine or worker failure),
+    "ocr" is added to deadline.skipped: the text is incomplete and must not be cached.
+    """
+    doc = PdfDocument.coerce(pdf)
+    chunks = [doc.page_text(i) for i in range(doc.page_count)]
+    pages = [i for i in range(doc.page_count) if needs_ocr(doc.page_layout(i))]
+    ocr_missing = bool(pages)
+    if pages and ocr_available():
+        print(f"[OCR] {len(pages)}/{doc.page_count} page(s) need OCR: {[i + 1 for i in pages]}")
+        # OCR only those pages: spread over the OCR pool, or one by one without it
+        try:
+            from app.ocr.pool import get_ocr_pool
+            pool = get_ocr_pool()
+            if pool.workers:
+                ocr_chunks = pool.ocr_pages(doc.pdf_bytes, pages, deadline)
+            else:
+                ocr_chunks = []
+                for i in pages:
+                    if deadline is not None and not deadline.allows(OCR_PAGE_SEC):
+                        deadline.skip(f"ocr_page_{i + 1}")
+                        ocr_chunks.append(None)
+                        continue
+                    ocr_chunks.append(ocr_page(doc, i))
+            for i, txt in zip(pages, ocr_chunks):
+                if txt and txt.strip():
+                    chunks[i] = txt   # no OCR text: keep whatever the text layer had
+            ocr_missing = any(txt is None for txt in ocr_chunks)
+        except Exception as e:
+            print(f"[OCR] Failed, using the text layer only: {e}")
+    elif pages:
+        print(f"[OCR] {len(pages)} page(s) need OCR but no engine is available")
+    if ocr_missing and deadline is not None:
+        deadline.skip("ocr")
+    doc.extracted_text = "\n".join(t for t in chunks if t.strip()).strip()
+    return doc.extracted_text
@@ -0,0 +1,124 @@
+# backend/app/ocr/pool.py
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import os, threading
+
+from app.ingest.document import PdfDocument
+from app.core.deadline import Deadline
+from app.ocr.extract import OCR_PAGE_SEC, get_easyocr_reader, ocr_page
+
+
+def _init_worker() -> None:
+    # once per worker, not per page; a no-op when the reader was inherited through fork
+    get_easyocr_reader()
+
+def _ocr_page(pdf_bytes: bytes, i: int, resolution: int) -> Optional[str]:
+    """Rasterize and OCR one page inside a worker (the PDF bytes travel, not the 300 dpi bitmap)."""
+    with PdfDocument(pdf_bytes) as doc:
+        return ocr_page(doc, i, resolution)
+
+
+class OcrPool:
+    """
+    Worker processes for page OCR, each holding its own loaded engine.
+
+    `ocr_pages` hands every page of a scanned upload to the pool at once, so a
+    6-page report uses up to `workers` cores instead of one, and puts the text
+    back in page order. Each page gets `page_timeout` seconds (per round of
+    `workers` pages), bounded by the request deadline; pages that miss it are
+    left out and listed as skipped "ocr_page_N". workers=0 keeps the
+    one-page-at-a-time path in the calling process.
+
+    The pool is per process: in production every parse-pool worker starts its
+    own, so up to PARSE_POOL_WORKERS x OCR_POOL_WORKERS OCR processes exist,
+    each with an engine in memory (easyocr: a few hundred MB resident once it
+    has run, even when the weights were inherited through fork). get_ocr_pool
+    therefore splits the cores between parse workers and only starts a pool
+    when a parse worker gets at least two of them.
+    """
+
+    def __init__(self, workers: int, page_timeout: float = 20.0, resolution: int = 300):
+        self.workers = max(0, workers)
+        self.page_timeout = page_timeout
+        self.resolution = resolution
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.counters = {"pages": 0, "timeouts": 0, "failed": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            return self._executor
+
+    def _reset_executor(self) -> None:
+        with self._lock:
+            ex, self._executor = self._executor, None
+        if ex is not None:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+    def ocr_pages(self, pdf_bytes: bytes, pages: List[int], deadline: Optional[Deadline] = None) -> List[Optional[str]]:
+        """Text per requested page, in order; None for pages skipped, timed out or failed."""
+        out: List[Optional[str]] = [None] * len(pages)
+        if not pages:
+            return out
+        if deadline is not None and not deadline.allows(OCR_PAGE_SEC):
+            for i in pages:
+                deadline.skip(f"ocr_page_{i + 1}")
+            return out
+        ex = self._get_executor()
+        futures = {ex.submit(_ocr_page, pdf_bytes, i, self.resolution): n for n, i in enumerate(pages)}
+        budget = self.page_timeout * -(-len(pages) // self.workers)
+        if deadline is not None and deadline.bounded:
+            budget = min(budget, deadline.remaining())
+        done, pending = wait(futures, timeout=budget)
+        broken = False
+        for f in sorted(pending, key=futures.get):   # skipped pages listed in page order
+            f.cancel()   # a page already running finishes in its worker; its text is dropped
+            self.counters["timeouts"] += 1
+            if deadline is not None:
+                deadline.skip(f"ocr_page_{pages[futures[f]] + 1}")
+        for f in done:
+            try:
+                out[futures[f]] = f.result()
+                self.counters["pages"] += 1
+            except BrokenProcessPool:
+                broken = True
+                self.counters["failed"] += 1
+            except Exception as e:
+                print(f"[OCR] Page {pages[futures[f]] + 1} failed: {e}")
+                self.counters["failed"] += 1
+        if broken:
+            # a worker died (OOM in the engine); start fresh next time
+            self._reset_executor()
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "page_timeout_sec": self.page_timeout, **self.counters}
+
+    def shutdown(self) -> None:
+        self._reset_executor()
+
+
+# convenient singleton (one per process)
+_ocr_pool: Optional[OcrPool] = None
+_ocr_pool_lock = threading.Lock()
+
+def get_ocr_pool() -> OcrPool:
+    global _ocr_pool
+    if _ocr_pool is None:
+        with _ocr_pool_lock:
+            if _ocr_pool is None:
+                # every parse worker gets its own pool: split the cores between them by default,
+                # and with one core per parse worker OCR in the worker itself (no extra engine copies)
+                cpus = os.cpu_count() or 1
+                parse_workers = max(1, int(os.getenv("PARSE_POOL_WORKERS", str(min(4, cpus)))))
+                share = cpus // parse_workers
+                _ocr_pool = OcrPool(
+                    workers=int(os.getenv("OCR_POOL_WORKERS", str(share if share >= 2 else 0))),
+                    page_timeout=float(os.getenv("OCR_PAGE_TIMEOUT_SEC", "20")),
+                    resolution=int(os.getenv("OCR_RESOLUTION", "300")),
+                )
+    return _ocr_pool
@@ -0,0 +1,84 @@
+# backend/app/ocr/regions.py
+from __future__ import annotations
+from typing import List, Optional, Tuple
+import os
+
+# Optional: OpenCV + NumPy for region detection; without them OCR reads the full page
+try:
+    import cv2  # type: ignore
+    import numpy as np  # type: ignore
+    CV_OK = True
+except Exception:
+    cv2 = None  # type: ignore
+    np = None  # type: ignore
+    CV_OK = False
+
+Box = Tuple[int, int, int, int]   # x0, top, x1, bottom in detection pixels
+
+# Resolution of the cheap first pass that only looks for text
+ROI_DETECT_DPI = int(os.getenv("OCR_ROI_DETECT_DPI", "72"))
+# Glyph height (px) the OCR engines read best at; the second pass renders just enough dpi for it
+ROI_TARGET_GLYPH_PX = float(os.getenv("OCR_ROI_TARGET_GLYPH_PX", "28"))
+ROI_MIN_DPI = int(os.getenv("OCR_ROI_MIN_DPI", "100"))
+ROI_MAX_DPI = int(os.getenv("OCR_ROI_MAX_DPI", "300"))
+# Above this share of the page, cropping saves nothing: OCR the page as a whole
+ROI_MAX_COVERAGE = float(os.getenv("OCR_ROI_MAX_COVERAGE", "0.8"))
+
+
+def ocr_resolution(glyph_px: Optional[float], detect_dpi: int = ROI_DETECT_DPI) -> int:
+    """dpi at which glyphs measured `glyph_px` tall at `detect_dpi` come out ROI_TARGET_GLYPH_PX tall."""
+    if not glyph_px or glyph_px <= 0:
+        return ROI_MAX_DPI
+    dpi = detect_dpi * ROI_TARGET_GLYPH_PX / glyph_px
+    return int(max(ROI_MIN_DPI, min(ROI_MAX_DPI, round(dpi))))
+
+def _bands(boxes: List[Box], gap: float) -> List[Box]:
+    """Merge boxes whose vertical extents overlap (or nearly touch) into full-width-of-members bands, top to bottom."""
+    out: List[list] = []
+    for x0, t, x1, b in sorted(boxes, key=lambda bx: bx[1]):
+        if out and t <= out[-1][3] + gap:
+            band = out[-1]
+            band[0], band[2], band[3] = min(band[0], x0), max(band[2], x1), max(band[3], b)
+        else:
+            out.append([x0, t, x1, b])
+    return [tuple(b) for b in out]  # type: ignore[misc]
+
+def find_regions(image) -> Tuple[List[Box], Optional[float]]:
+    """
+    Text regions of a low-resolution page render, plus the median glyph height (px).
+
+    Otsu binarization over the whole page, connected components for the glyphs
+    (their median height sizes the second pass), then a wide, flat dilation
+    merges glyphs into words and lines. Components that are nearly solid ink
+    (logos, photos, rules) or too small to be text are dropped; the rest are
+    merged into horizontal bands in reading order. ([], None) without OpenCV.
+    """
+    if not CV_OK:
+        return [], None
+    gray = np.asarray(image.convert("L"))
+    h_img, w_img = gray.shape
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    glyphs = heights[(heights >= 2) & (heights <= max(3, h_img * 0.05))]
+    if not glyphs.size:
+        return [], None
+    glyph_px = float(np.median(glyphs))
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, int(glyph_px * 1.5)), max(1, int(glyph_px * 0.4))))
+    merged = cv2.dilate(binary, kernel)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(merged, connectivity=8)
+    x, y, w, h = (stats[1:, k] for k in (cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP, cv2.CC_STAT_WIDTH, cv2.CC_STAT_HEIGHT))
+    # ink share of each candidate in the original binary image: text sits around 10-40%, logos near 100%
+    integral = cv2.integral(binary // 255)
+    ink = (integral[y + h, x + w] - integral[y, x + w] - integral[y + h, x] + integral[y, x]) / np.maximum(w * h, 1)
+    keep = (h >= glyph_px * 0.6) & (w >= glyph_px) & (ink < 0.6)
+    pad = int(round(glyph_px * 0.5))
+    boxes = [(max(0, int(a) - pad), max(0, int(b) - pad), min(w_img, int(a + c) + pad), min(h_img, int(b + d) + pad))
+             for a, b, c, d in zip(x[keep], y[keep], w[keep], h[keep])]
+    return _bands(boxes, gap=glyph_px * 0.5), glyph_px
+
+def coverage(boxes: List[Box], size: Tuple[int, int]) -> float:
+    w_img, h_img = size
+    return sum((x1 - x0) * (b - t) for x0, t, x1, b in boxes) / float(max(1, w_img * h_img))
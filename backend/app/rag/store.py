@@ -1,16 +1,13 @@
 # backend/app/rag/store.py
 from __future__ import annotations
 from typing import List, Dict, Any, Optional, Tuple
-import os, json
+import os, json, threading
+import importlib.util
 from dataclasses import dataclass, asdict
 
-# Optional: Chroma or FAISS; we’ll gracefully degrade to a simple keyword search
-try:
-    import chromadb  # type: ignore
-    from chromadb.config import Settings  # type: ignore
-    CHROMA_OK = True
-except Exception:
-    CHROMA_OK = False
+# Optional: Chroma or FAISS; we’ll gracefully degrade to a simple keyword search.
+# chromadb is only imported when the store first needs it (the import alone is slow).
+CHROMA_OK = importlib.util.find_spec("chromadb") is not None
 
 @dataclass
 class RangeDoc:
@@ -43,22 +40,37 @@ class RagStore:
             except Exception:
                 pass
 
-        # Optional vector DB
+        # Optional vector DB, opened on first query/add
         self._client = None
         self._col = None
-        if CHROMA_OK:
-            try:
-                self._client = chromadb.Client(Settings(
-                    is_persistent=True,
-                    persist_directory=self.persist_dir,
-                ))
-                self._col = self._client.get_or_create_collection("lab_ranges")
-                # sync vector store from json if empty
-                if not self._col.count():
-                    self._bulk_index()
-            except Exception:
-                self._client = None
-                self._col = None
+        self._col_ready = not CHROMA_OK
+        self._col_lock = threading.Lock()
+
+    def _collection(self):
+        if self._col_ready:
+            return self._col
+        with self._col_lock:
+            if not self._col_ready:
+                try:
+                    import chromadb  # type: ignore
+                    from chromadb.config import Settings  # type: ignore
+                    self._client = chromadb.Client(Settings(
+                        is_persistent=True,
+                        persist_directory=self.persist_dir,
+                    ))
+                    self._col = self._client.get_or_create_collection("lab_ranges")
+                    # sync vector store from json if empty
+                    if not self._col.count():
+                        self._bulk_index()
+                except Exception:
+                    self._client = None
+                    self._col = None
+                self._col_ready = True
+        return self._col
+
+    def warm(self) -> None:
+        """Open the vector store now instead of on the first query (startup warm-up)."""
+        self._collection()
 
     def _bulk_index(self):
         if not self._col: return
@@ -85,7 +97,7 @@ class RagStore:
         for d in docs:
             self._docs[d.id] = d
         self._save_json()
-        if self._col:
+        if self._collection():
             self._bulk_index()
 
     def query(self, test_name: str, top_k: int = 3) -> List[RangeDoc]:
@@ -93,9 +105,10 @@ class RagStore:
         name = (test_name or "").strip().lower()
         out: List[RangeDoc] = []
 
-        if self._col:
+        col = self._collection()
+        if col:
             try:
-                res = self._col.query(query_texts=[name], n_results=top_k)
+                res = col.query(query_texts=[name], n_results=top_k)
                 ids = res.get("ids", [[]])[0]
                 for _id in ids:
                     if _id in self._docs:
@@ -118,9 +131,12 @@ class RagStore:
 
 # convenient singleton
 _rag_store: Optional[RagStore] = None
+_rag_store_lock = threading.Lock()
 
 def get_rag_store() -> RagStore:
     global _rag_store
     if _rag_store is None:
-        _rag_store = RagStore(persist_dir=os.getenv("RAG_DIR", ".rag_data"))
+        with _rag_store_lock:
+            if _rag_store is None:
+                _rag_store = RagStore(persist_dir=os.getenv("RAG_DIR", ".rag_data"))
     return _rag_store
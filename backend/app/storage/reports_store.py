@@ -1,86 +1,358 @@
+import os, re, json, sqlite3, threading, base64
+from dataclasses import dataclass
+from datetime import datetime, date, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple, Set
 
-import os, json
-from typing import Dict, Any, List
-from threading import RLock
-
+# Legacy whole-file store; imported once into SQLite on first start.
 _REPORTS_PATH = os.path.join(os.path.dirname(__file__), "reports.json")
+_DB_PATH = os.path.join(os.path.dirname(__file__), "reports.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,  -- insertion order (newest = highest)
+    id          TEXT NOT NULL UNIQUE,
+    created_at  TEXT NOT NULL,
+    report_name TEXT,
+    age         INTEGER,
+    sex         TEXT,
+    filename    TEXT,
+    status      TEXT,
+    body        BLOB NOT NULL                       -- compact UTF-8 JSON of the full report
+);
+CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports(created_at);
+CREATE INDEX IF NOT EXISTS idx_reports_report_name ON reports(report_name);
+CREATE INDEX IF NOT EXISTS idx_reports_age ON reports(age);
+CREATE INDEX IF NOT EXISTS idx_reports_sex ON reports(sex);
+CREATE INDEX IF NOT EXISTS idx_reports_sex_nocase ON reports(sex COLLATE NOCASE);
+-- inverted indexes maintained by add/delete, keyed by reports.seq
+CREATE TABLE IF NOT EXISTS report_terms (        -- tokens of report_name + test names
+    term TEXT NOT NULL,
+    seq  INTEGER NOT NULL,
+    PRIMARY KEY (term, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS report_flag_terms (   -- tokens of flagged (non-normal) test names
+    term TEXT NOT NULL,
+    seq  INTEGER NOT NULL,
+    PRIMARY KEY (term, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_report_terms_seq ON report_terms(seq);
+CREATE INDEX IF NOT EXISTS idx_report_flag_terms_seq ON report_flag_terms(seq);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+def _field(doc: Dict[str, Any], key: str):
+    # Try top-level, then context dict (same lookup list_reports uses)
+    return doc.get(key) or (doc.get("context") or {}).get(key)
 
-def _load_reports():
-    if not os.path.exists(_REPORTS_PATH):
-        return {}, []
+def _record_time(doc: Dict[str, Any]) -> Optional[str]:
+    """A legacy record's own created_at/date (top-level or context) as UTC ISO, or None."""
+    for key in ("created_at", "date"):
+        v = _field(doc, key)
+        try:
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                return datetime.utcfromtimestamp(v).isoformat() + "Z"
+            if isinstance(v, str) and v.strip():
+                dt = datetime.fromisoformat(v.strip().replace("Z", "+00:00"))
+                if dt.tzinfo is not None:
+                    dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+                return dt.isoformat() + "Z"
+        except (ValueError, OverflowError, OSError):
+            continue
+    return None
+
+def _to_int(v) -> Optional[int]:
     try:
-        with open(_REPORTS_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data.get("store", {}), data.get("order", [])
-    except Exception:
-        return {}, []
+        return int(v) if v is not None and v != "" else None
+    except (TypeError, ValueError):
+        return None
+
+def _encode(doc: Dict[str, Any]) -> bytes:
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _decode(blob: bytes) -> Dict[str, Any]:
+    return json.loads(blob)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_NOT_FLAGGED = ("normal", "missing", "needs_review")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+def _index_terms(doc: Dict[str, Any]) -> Tuple[Set[str], Set[str]]:
+    """(search terms, flagged-test terms) for one report document."""
+    terms: Set[str] = set(tokenize(_field(doc, "report_name")))
+    flagged: Set[str] = set()
+    for r in (doc.get("results") or []) + (doc.get("per_test") or []):
+        if not isinstance(r, dict):
+            continue
+        toks = tokenize(r.get("test"))
+        terms.update(toks)
+        if str(r.get("status") or "").lower().replace(" ", "_") not in _NOT_FLAGGED:
+            flagged.update(toks)
+    return terms, flagged
+
+@dataclass
+class ReportQuery:
+    """Server-side filters for list_summaries(); every field is optional."""
+    q: Optional[str] = None              # prefix match on report_name / test-name tokens (all must match)
+    sex: Optional[str] = None
+    age_min: Optional[int] = None
+    age_max: Optional[int] = None
+    status: Optional[str] = None
+    flagged_test: Optional[str] = None   # report has this test flagged (token match)
+    date_from: Optional[date] = None     # created_at, inclusive
+    date_to: Optional[date] = None       # created_at, inclusive
+
+    def where(self) -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        for table, text in (("report_terms", self.q), ("report_flag_terms", self.flagged_test)):
+            for tok in tokenize(text):
+                # prefix range scan on the (term, seq) primary key
+                clauses.append(f"seq IN (SELECT seq FROM {table} WHERE term >= ? AND term < ?)")
+                params += [tok, tok + "\uffff"]
+        if self.sex and self.sex.lower() not in ("all", "any"):
+            clauses.append("sex = ? COLLATE NOCASE"); params.append(self.sex)
+        if self.age_min is not None:
+            clauses.append("age >= ?"); params.append(self.age_min)
+        if self.age_max is not None:
+            clauses.append("age <= ?"); params.append(self.age_max)
+        if self.status:
+            clauses.append("status = ?"); params.append(self.status)
+        if self.date_from:
+            clauses.append("created_at >= ?"); params.append(self.date_from.isoformat())
+        if self.date_to:
+            clauses.append("created_at < ?"); params.append((self.date_to + timedelta(days=1)).isoformat())
+        return (" AND ".join(clauses) or "1"), params
 
-def _save_reports():
+# Columns served by list_summaries(); listing never materializes report bodies.
+SUMMARY_COLUMNS = ("id", "report_name", "age", "sex", "filename", "status", "created_at")
+
+def _summary_values(doc: Dict[str, Any]) -> Tuple[Any, ...]:
+    name = _field(doc, "report_name")
+    return (name, _to_int(_field(doc, "age")), _field(doc, "sex") or None,
+            doc.get("filename") or name, doc.get("status"))
+
+def encode_cursor(seq: int) -> str:
+    return base64.urlsafe_b64encode(f"s:{seq}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """Inverse of encode_cursor; raises ValueError on anything it did not produce."""
     try:
-        with open(_REPORTS_PATH, "w", encoding="utf-8") as f:
-            json.dump({"store": _store, "order": _order}, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"[reports_store] Failed to save reports: {e}")
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        tag, seq = raw.split(":", 1)
+        if tag != "s":
+            raise ValueError
+        return int(seq)
+    except Exception:
+        raise ValueError(f"invalid cursor: {cursor!r}")
+
+
+class ReportsStore:
+    """
+    SQLite (WAL) report store. Each upload is a single-row insert instead of a
+    rewrite of every stored report, and nothing is held in memory between calls.
+    Report bodies are JSON blobs; id, created_at, report_name, age and sex are
+    indexed columns.
+    """
+
+    def __init__(self, db_path: str, legacy_json_path: Optional[str] = None):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+        self._migrate_columns()
+        if legacy_json_path:
+            self._migrate_json(legacy_json_path)
+        self._backfill_terms()
+
+    def _conn(self) -> sqlite3.Connection:
+        # one connection per thread; FastAPI runs sync endpoints in a threadpool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate_columns(self) -> None:
+        """Add summary columns to databases created before they existed, backfilled once."""
+        conn = self._conn()
+        have = {r[1] for r in conn.execute("PRAGMA table_info(reports)")}
+        missing = [c for c in ("filename", "status") if c not in have]
+        if not missing:
+            return
+        with conn:
+            for col in missing:
+                conn.execute(f"ALTER TABLE reports ADD COLUMN {col} TEXT")
+            for rid, body in conn.execute("SELECT id, body FROM reports").fetchall():
+                doc = _decode(body)
+                conn.execute("UPDATE reports SET filename = ?, status = ? WHERE id = ?",
+                             (doc.get("filename") or _field(doc, "report_name"), doc.get("status"), rid))
+
+    def _backfill_terms(self) -> None:
+        """Build the search index once for reports stored before it existed."""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM store_meta WHERE key = 'indexed_terms'").fetchone():
+            return
+        with conn:
+            for seq, body in conn.execute("SELECT seq, body FROM reports").fetchall():
+                self._index(conn, seq, _decode(body))
+            conn.execute("INSERT OR REPLACE INTO store_meta(key, value) VALUES ('indexed_terms', ?)", (_now(),))
 
-_store, _order = _load_reports()
-_lock = RLock()
+    def _index(self, conn: sqlite3.Connection, seq: int, doc: Dict[str, Any]) -> None:
+        terms, flagged = _index_terms(doc)
+        conn.executemany("INSERT OR IGNORE INTO report_terms(term, seq) VALUES (?, ?)", [(t, seq) for t in terms])
+        conn.executemany("INSERT OR IGNORE INTO report_flag_terms(term, seq) VALUES (?, ?)", [(t, seq) for t in flagged])
+
+    def _unindex(self, conn: sqlite3.Connection, rid: str) -> bool:
+        row = conn.execute("SELECT seq FROM reports WHERE id = ?", (rid,)).fetchone()
+        if not row:
+            return False
+        conn.execute("DELETE FROM report_terms WHERE seq = ?", (row[0],))
+        conn.execute("DELETE FROM report_flag_terms WHERE seq = ?", (row[0],))
+        conn.execute("DELETE FROM reports WHERE seq = ?", (row[0],))
+        return True
+
+    def _migrate_json(self, path: str) -> None:
+        """
+        One-time import of the legacy reports.json (keeps its newest-last order).
+        Each report keeps its own created_at/date; the file's mtime only stands in
+        for records that carry neither.
+        """
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM store_meta WHERE key = 'migrated_json'").fetchone():
+            return
+        store, order = {}, []
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                store, order = data.get("store", {}), data.get("order", [])
+            except Exception as e:
+                print(f"[reports_store] Could not read legacy {path}: {e}")
+        ts = datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat() + "Z" if store else _now()
+        with conn:
+            for rid in order:
+                if rid in store:
+                    self._insert(conn, rid, store[rid], _record_time(store[rid]) or ts)
+            conn.execute("INSERT OR REPLACE INTO store_meta(key, value) VALUES ('migrated_json', ?)", (_now(),))
+        if store:
+            print(f"[reports_store] Migrated {len(order)} report(s) from {path}")
+
+    def _insert(self, conn: sqlite3.Connection, rid: str, doc: Dict[str, Any], created_at: str) -> None:
+        # delete + insert so a re-added id moves to the newest position (as before)
+        self._unindex(conn, rid)
+        cur = conn.execute(
+            "INSERT INTO reports(id, created_at, report_name, age, sex, filename, status, body) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (rid, created_at, *_summary_values(doc), _encode(doc)),
+        )
+        self._index(conn, cur.lastrowid, doc)
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        rid = doc.get("id") or doc.get("report_id")
+        if not rid:
+            return
+        conn = self._conn()
+        with conn:
+            self._insert(conn, rid, doc, doc.get("created_at") or _now())
+
+    def get(self, rid: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT body FROM reports WHERE id = ?", (rid,)).fetchone()
+        return _decode(row[0]) if row else None
+
+    def delete(self, rid: str) -> bool:
+        conn = self._conn()
+        with conn:
+            return self._unindex(conn, rid)
+
+    def count(self, query: Optional[ReportQuery] = None) -> int:
+        where, params = (query or ReportQuery()).where()
+        return self._conn().execute(f"SELECT COUNT(*) FROM reports WHERE {where}", params).fetchone()[0]
+
+    def list_paginated(self, page: int = 1, page_size: int = 20) -> Tuple[int, List[Dict[str, Any]]]:
+        if page < 1:
+            page = 1
+        if page_size < 1:
+            page_size = 20
+        rows = self._conn().execute(
+            "SELECT body FROM reports ORDER BY seq DESC LIMIT ? OFFSET ?",
+            (page_size, (page - 1) * page_size),
+        ).fetchall()
+        return self.count(), [_decode(r[0]) for r in rows]
+
+    def list_summaries(self, cursor: Optional[str] = None, limit: int = 20, offset: int = 0,
+                       query: Optional[ReportQuery] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Newest-first summary rows (SUMMARY_COLUMNS) plus an opaque cursor for the
+        next page, or None at the end. With a cursor this is a keyset seek on the
+        primary key, so the cost does not grow with how deep the caller pages.
+        `offset` only serves legacy page-number callers and is ignored with a cursor.
+        `query` filters through the term and column indexes.
+        """
+        limit = max(1, limit)
+        cols = ", ".join(SUMMARY_COLUMNS)
+        where, params = (query or ReportQuery()).where()
+        if cursor:
+            rows = self._conn().execute(
+                f"SELECT seq, {cols} FROM reports WHERE seq < ? AND {where} ORDER BY seq DESC LIMIT ?",
+                (decode_cursor(cursor), *params, limit + 1),
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                f"SELECT seq, {cols} FROM reports WHERE {where} ORDER BY seq DESC LIMIT ? OFFSET ?",
+                (*params, limit + 1, max(0, offset)),
+            ).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        items = [dict(zip(SUMMARY_COLUMNS, r[1:])) for r in rows]
+        return items, (encode_cursor(rows[-1][0]) if more and rows else None)
+
+
+# convenient singleton (opened lazily, not at import)
+_store: Optional[ReportsStore] = None
+_store_lock = threading.Lock()
+
+def get_store() -> ReportsStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ReportsStore(os.getenv("REPORTS_DB", _DB_PATH), legacy_json_path=_REPORTS_PATH)
+    return _store
 
 def delete(rid: str) -> bool:
     """Delete a report by ID. Returns True if deleted, False if not found."""
-    with _lock:
-        if rid in _store:
-            del _store[rid]
-            if rid in _order:
-                _order.remove(rid)
-            _save_reports()
-            return True
-        return False
+    return get_store().delete(rid)
 
 def list_paginated(page: int = 1, page_size: int = 20):
     """
     Returns (total_count, items) for the given page and page_size.
     Items are sorted newest first.
     """
-    with _lock:
-        total = len(_order)
-        if page < 1:
-            page = 1
-        if page_size < 1:
-            page_size = 20
-        ids_desc = list(reversed(_order))
-        start = (page - 1) * page_size
-        end = start + page_size
-        page_ids = ids_desc[start:end]
-        items = [_store[i] for i in page_ids]
-        return total, items
+    return get_store().list_paginated(page, page_size)
+
+def list_summaries(cursor: Optional[str] = None, limit: int = 20, offset: int = 0,
+                   query: Optional[ReportQuery] = None):
+    """Returns (items, next_cursor) of lightweight summary rows, newest first."""
+    return get_store().list_summaries(cursor, limit, offset, query)
 
 def add(doc: Dict[str, Any]) -> None:
-    rid = doc.get("id") or doc.get("report_id")
-    if not rid:
-        return
-    with _lock:
-        _store[rid] = doc
-        if rid in _order:
-            _order.remove(rid)
-        _order.append(rid)
-        _save_reports()
+    get_store().add(doc)
 
 def get(rid: str) -> Dict[str, Any] | None:
-    with _lock:
-        return _store.get(rid)
+    return get_store().get(rid)
 
-def count() -> int:
-    with _lock:
-        return len(_order)
+def count(query: Optional[ReportQuery] = None) -> int:
+    return get_store().count(query)
 
 def list_reports(page: int = 1, page_size: int = 20) -> List[Dict[str, Any]]:
-    with _lock:
-        if page < 1:
-            page = 1
-        if page_size < 1:
-            page_size = 20
-        ids_desc = list(reversed(_order))     # newest first using the BUILT-IN list()
-        start = (page - 1) * page_size
-        end = start + page_size
-        page_ids = ids_desc[start:end]
-        return [ _store[i] for i in page_ids ]
+    return get_store().list_paginated(page, page_size)[1]
@@ -0,0 +1,170 @@
+# app/summarize/breaker.py
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Optional
+from collections import deque
+import os, random, threading, time
+
+from app.summarize.models import is_transient
+from app.summarize.scheduler import SchedulerBusy
+
+ENDPOINT = "*"   # breaker key for "the Groq endpoint itself is unreachable"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling Groq while the breaker for a model (or the endpoint) is open."""
+
+    def __init__(self, key: str, retry_in: float):
+        super().__init__(f"circuit open for {key} (retry in {retry_in:.1f}s)")
+        self.key = key
+        self.retry_in = retry_in
+
+
+def retry_after(err: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After / retry-after-ms headers), if any."""
+    headers = getattr(getattr(err, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass  # HTTP-date form: fall back to our own backoff
+    return None
+
+def backoff_delay(err: Exception, attempt: int, base: float = 0.5, cap: float = 8.0) -> Optional[float]:
+    """
+    How long to wait before retry number `attempt + 1`, or None if the error is
+    not worth retrying. Retry-After wins when present (None if it is longer than
+    `cap`: better to fail over to the KB than to hold the request); otherwise
+    exponential backoff with jitter (half fixed, half random).
+    """
+    if not is_transient(err):
+        return None
+    ra = retry_after(err)
+    if ra is not None:
+        return ra if ra <= cap else None
+    d = min(cap, base * (2 ** attempt))
+    return d / 2 + random.uniform(0, d / 2)
+
+def scope(err: Exception, model: str) -> str:
+    # no HTTP status = we never reached Groq: that says nothing about the model
+    return ENDPOINT if getattr(err, "status_code", None) is None else model
+
+def is_outage(err: BaseException) -> bool:
+    """Errors that mean "Groq is unavailable right now", not "this question has no answer"."""
+    return (isinstance(err, (CircuitOpen, SchedulerBusy)) or is_transient(err)
+            or isinstance(err.__cause__, LookupError))   # resolve_model: no working model
+
+
+class _Circuit:
+    __slots__ = ("state", "failures", "open_until", "trial", "opens")
+
+    def __init__(self):
+        self.state = "closed"
+        self.failures: deque = deque()
+        self.open_until = 0.0
+        self.trial = False
+        self.opens = 0
+
+
+class CircuitBreaker:
+    """
+    Per-key (model, plus ENDPOINT for connection failures) circuit breaker
+    shared by every Groq call.
+
+    `failures` transient errors within `window` seconds open a circuit: calls
+    fail immediately with CircuitOpen for `open_sec` (or longer if the
+    provider sent Retry-After), so callers drop to their KB/fallback paths
+    at once. After that the circuit is half-open: one trial call goes
+    through; success closes it, failure opens it again.
+    """
+
+    def __init__(self, failures: int = 5, window: float = 60.0, open_sec: float = 30.0):
+        self.threshold = max(1, failures)
+        self.window = window
+        self.open_sec = open_sec
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+        self.short_circuited = 0
+
+    def check(self, *keys: str) -> None:
+        """Raise CircuitOpen if any key is open; claim the trial slot of half-open ones."""
+        now = time.monotonic()
+        with self._lock:
+            claim = []
+            for key in keys:
+                c = self._circuits.get(key)
+                if c is None or c.state == "closed":
+                    continue
+                if c.state == "open" and now < c.open_until:
+                    self.short_circuited += 1
+                    raise CircuitOpen(key, c.open_until - now)
+                if c.trial:   # half-open and its one trial call is already out
+                    self.short_circuited += 1
+                    raise CircuitOpen(key, 0.0)
+                claim.append(c)
+            for c in claim:
+                c.state, c.trial = "half_open", True
+
+    def record(self, keys: Iterable[str], err: Optional[Exception] = None) -> None:
+        """Outcome of a call admitted by check(*keys). Non-transient errors count as the endpoint answering."""
+        failed = scope(err, list(keys)[-1]) if err is not None and is_transient(err) else None
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                c = self._circuits.get(key)
+                if key != failed:
+                    if c is not None and c.trial:   # the half-open trial went through
+                        print(f"[GROQ] Circuit for {key} closed")
+                        c.state, c.trial = "closed", False
+                        c.failures.clear()
+                    continue
+                if c is None:
+                    c = self._circuits[key] = _Circuit()
+                if c.state == "open" and not c.trial:
+                    continue   # admitted before it opened; already counted
+                c.failures.append(now)
+                while c.failures and c.failures[0] <= now - self.window:
+                    c.failures.popleft()
+                if c.state == "half_open" or len(c.failures) >= self.threshold:
+                    c.state, c.trial = "open", False
+                    c.open_until = now + max(self.open_sec, retry_after(err) or 0.0)
+                    c.failures.clear()
+                    c.opens += 1
+                    print(f"[GROQ] Circuit for {key} opened for {c.open_until - now:.0f}s: {err}")
+
+    def release(self, *keys: str) -> None:
+        """The admitted call ended without an outcome (cancelled): free half-open trial slots."""
+        with self._lock:
+            for key in keys:
+                c = self._circuits.get(key)
+                if c is not None:
+                    c.trial = False
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "short_circuited": self.short_circuited,
+                "circuits": {k: {"state": "open" if c.state == "open" and now < c.open_until
+                                 else ("half_open" if c.state != "closed" else "closed"),
+                                 "recent_failures": len(c.failures), "opens": c.opens,
+                                 "open_for_sec": round(max(0.0, c.open_until - now), 1) if c.state == "open" else 0.0}
+                             for k, c in self._circuits.items()},
+            }
+
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+def get_breaker() -> CircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    failures=int(os.getenv("GROQ_BREAKER_FAILURES", "5")),
+                    window=float(os.getenv("GROQ_BREAKER_WINDOW", "60")),
+                    open_sec=float(os.getenv("GROQ_BREAKER_OPEN_SEC", "30")),
+                )
+    return _breaker
@@ -0,0 +1,157 @@
+# app/summarize/cache.py
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+import hashlib, json, os, sqlite3, threading, time
+
+from app.core.resolver import age_bucket, sex_key
+
+# Bump whenever the structured-summary prompt/schema changes: old entries stop matching.
+PROMPT_VERSION = "structured-v1"
+
+_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "storage", "summary_cache.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summary_cache (
+    key         TEXT PRIMARY KEY,   -- sha256 of (model, prompt version, tests, age bucket, sex)
+    model       TEXT,
+    body        BLOB NOT NULL,      -- compact UTF-8 JSON: per_test, diet_plan, overall_message
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_summary_cache_accessed ON summary_cache(accessed_at);
+CREATE INDEX IF NOT EXISTS idx_summary_cache_created ON summary_cache(created_at);
+"""
+
+def summary_key(model: str, results: List[Dict[str, Any]], context: Dict[str, Any]) -> str:
+    """Content address of a structured summary: same abnormality pattern -> same key."""
+    pattern = sorted({(str(r.get("test", "")).strip().lower(), str(r.get("status", "")).lower()) for r in results})
+    raw = json.dumps([model, PROMPT_VERSION, pattern, age_bucket(context.get("age")), sex_key(context.get("sex"))],
+                     separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Two-tier cache of LLM-generated summary parts (per_test explanations,
+    diet plan). An in-memory LRU sits in front of a SQLite table; both expire
+    entries after `ttl` seconds and evict least-recently-used ones past their
+    size limits. Values are stored as JSON, so callers always get a fresh copy.
+    The row count is tracked in memory (counted once at open), so a write never
+    scans the table. Blocking on a memory miss: call it from a worker thread.
+    """
+
+    def __init__(self, db_path: Optional[str], ttl: float = 7 * 86400, max_memory: int = 256, max_rows: int = 5000):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_memory = max(0, max_memory)
+        self.max_rows = max(1, max_rows)
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()   # key -> (expires_at, body)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()   # serializes disk writes with the row counter
+        self._local = threading.local()
+        self.counters = {"hits_memory": 0, "hits_disk": 0, "misses": 0, "puts": 0, "evictions": 0}
+        self._rows = 0
+        if self.db_path:
+            with self._conn() as conn:
+                conn.executescript(_SCHEMA)
+                self._rows = conn.execute("SELECT COUNT(*) FROM summary_cache").fetchone()[0]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, expires_at: float, body: bytes) -> None:
+        if not self.max_memory:
+            return
+        with self._lock:
+            self._mem[key] = (expires_at, body)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_memory:
+                self._mem.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            item = self._mem.get(key)
+            if item is not None:
+                if item[0] > now:
+                    self._mem.move_to_end(key)
+                    self.counters["hits_memory"] += 1
+                    return json.loads(item[1])
+                del self._mem[key]
+        row = None
+        if self.db_path:
+            try:
+                conn = self._conn()
+                row = conn.execute("SELECT body, created_at FROM summary_cache WHERE key = ?", (key,)).fetchone()
+                if row and row[1] + self.ttl <= now:
+                    with self._write_lock, conn:
+                        self._rows -= conn.execute("DELETE FROM summary_cache WHERE key = ?", (key,)).rowcount
+                    row = None
+                elif row:
+                    with conn:
+                        conn.execute("UPDATE summary_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            except sqlite3.Error as e:
+                print(f"[CACHE] Summary cache read failed: {e}")
+                row = None
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits_disk"] += 1
+        self._remember(key, row[1] + self.ttl, row[0])
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any], model: Optional[str] = None) -> None:
+        now = time.time()
+        body = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._remember(key, now + self.ttl, body)
+        self.counters["puts"] += 1
+        if not self.db_path:
+            return
+        try:
+            conn = self._conn()
+            with self._write_lock, conn:
+                known = conn.execute("SELECT 1 FROM summary_cache WHERE key = ?", (key,)).fetchone()
+                conn.execute("INSERT OR REPLACE INTO summary_cache(key, model, body, created_at, accessed_at) "
+                             "VALUES (?, ?, ?, ?, ?)", (key, model, body, now, now))
+                rows = self._rows + (0 if known else 1)
+                rows -= conn.execute("DELETE FROM summary_cache WHERE created_at <= ?", (now - self.ttl,)).rowcount
+                over = rows - self.max_rows
+                if over > 0:
+                    over = conn.execute("DELETE FROM summary_cache WHERE key IN "
+                                        "(SELECT key FROM summary_cache ORDER BY accessed_at LIMIT ?)", (over,)).rowcount
+                    rows -= over
+                    self.counters["evictions"] += over
+                self._rows = max(0, rows)
+        except sqlite3.Error as e:
+            print(f"[CACHE] Summary cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits_memory"] + self.counters["hits_disk"] + self.counters["misses"]
+        hits = lookups - self.counters["misses"]
+        return {**self.counters, "memory_entries": len(self._mem),
+                "hit_rate": round(hits / lookups, 3) if lookups else None}
+
+
+_cache: Optional[SummaryCache] = None
+_cache_lock = threading.Lock()
+
+def get_summary_cache() -> SummaryCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                db = os.getenv("SUMMARY_CACHE_DB", _DB_PATH)
+                _cache = SummaryCache(
+                    None if db.lower() in ("", "off", "none") else db,
+                    ttl=float(os.getenv("SUMMARY_CACHE_TTL", str(7 * 86400))),
+                    max_memory=int(os.getenv("SUMMARY_CACHE_MEMORY", "256")),
+                    max_rows=int(os.getenv("SUMMARY_CACHE_MAX_ROWS", "5000")),
+                )
+    return _cache
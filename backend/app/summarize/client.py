@@ -0,0 +1,168 @@
+# app/summarize/client.py
+from __future__ import annotations
+from typing import Any, AsyncIterator, Optional
+import asyncio, os
+
+import httpx
+from groq import AsyncGroq
+
+from app.summarize.breaker import ENDPOINT, backoff_delay, get_breaker
+from app.summarize.scheduler import estimate_tokens, get_scheduler
+
+
+def _key() -> str:
+    return os.getenv("GROQ_API_KEY", "").strip()
+
+def _http_client() -> httpx.AsyncClient:
+    timeout = httpx.Timeout(
+        float(os.getenv("GROQ_TIMEOUT", "30")),
+        connect=float(os.getenv("GROQ_CONNECT_TIMEOUT", "5")),
+    )
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("GROQ_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv("GROQ_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "30")),
+    )
+    return httpx.AsyncClient(timeout=timeout, limits=limits)
+
+
+class LLMClient:
+    """
+    The one Groq client for the process: an AsyncGroq on a pooled, keep-alive
+    httpx.AsyncClient. Created on app startup and closed on shutdown; every LLM
+    call site awaits `achat(...)` instead of building its own sync `Groq(...)`,
+    so concurrent analyses overlap their waits instead of blocking the loop.
+
+    Every completion first passes the shared circuit breaker, then waits for a
+    slot from the rpm/tpm scheduler (by `priority`), and is retried here (not
+    inside the SDK) on 429/5xx/connection errors, with jittered exponential
+    backoff or the provider's Retry-After.
+    """
+
+    def __init__(self):
+        self._client: Optional[AsyncGroq] = None
+        self.max_retries = int(os.getenv("GROQ_MAX_RETRIES", "2"))
+        self.retry_base = float(os.getenv("GROQ_RETRY_BASE_SEC", "0.5"))
+        self.retry_cap = float(os.getenv("GROQ_RETRY_MAX_WAIT_SEC", "8"))
+
+    @property
+    def configured(self) -> bool:
+        return bool(_key())
+
+    def get(self) -> Optional[AsyncGroq]:
+        key = _key()
+        if not key:
+            return None
+        if self._client is None:
+            # also the lazy path for scripts/tests that never ran startup
+            self._client = AsyncGroq(api_key=key, http_client=_http_client(), max_retries=0)
+        return self._client
+
+    async def start(self) -> None:
+        if self.get() is None:
+            print("[GROQ] No API key set; LLM features disabled.")
+
+    async def close(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            try:
+                await client.close()
+            except Exception as e:
+                print(f"[GROQ] Client close failed: {e}")
+
+    @staticmethod
+    async def _admit(breaker: Any, keys: tuple, priority: str, tokens: int) -> None:
+        """Breaker check, then a scheduler slot; a call that never gets its slot gives back the half-open trial."""
+        breaker.check(*keys)   # before queueing: no point waiting for a slot we cannot use
+        try:
+            await get_scheduler().acquire(priority, tokens)
+        except BaseException:
+            breaker.release(*keys)
+            raise
+
+    async def achat(self, model: str, messages: list, *, retries: Optional[int] = None,
+                    priority: str = "summary", **kwargs: Any) -> Any:
+        """
+        Chat completion. `priority` is "interactive", "summary" or "background".
+        Raises SchedulerBusy when no slot frees up in time and CircuitOpen
+        without calling Groq while the breaker is open.
+        """
+        client = self.get()
+        if client is None:
+            raise RuntimeError("GROQ_API_KEY is not set")
+        breaker, keys = get_breaker(), (ENDPOINT, model)
+        scheduler, tokens = get_scheduler(), estimate_tokens(messages, kwargs.get("max_tokens"))
+        retries = self.max_retries if retries is None else retries
+        attempt = 0
+        while True:
+            await self._admit(breaker, keys, priority, tokens)
+            try:
+                resp = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+            except asyncio.CancelledError:
+                breaker.release(*keys)
+                raise
+            except Exception as e:
+                breaker.record(keys, e)
+                delay = backoff_delay(e, attempt, self.retry_base, self.retry_cap) if attempt < retries else None
+                if delay is None:
+                    raise
+                attempt += 1
+                print(f"[GROQ] {model}: {type(e).__name__}, retry {attempt}/{retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            breaker.record(keys)
+            scheduler.settle(tokens, getattr(getattr(resp, "usage", None), "total_tokens", None))
+            return resp
+
+    async def astream(self, model: str, messages: list, *, priority: str = "summary",
+                      **kwargs: Any) -> AsyncIterator[str]:
+        """
+        Streamed chat completion, yielding the content deltas. Admitted like
+        achat (breaker, scheduler) but never retried: part of the answer may
+        already have reached the caller. The final chunk's usage settles the
+        tpm charge, as achat does with the response's.
+        """
+        client = self.get()
+        if client is None:
+            raise RuntimeError("GROQ_API_KEY is not set")
+        breaker, keys = get_breaker(), (ENDPOINT, model)
+        scheduler, tokens = get_scheduler(), estimate_tokens(messages, kwargs.get("max_tokens"))
+        await self._admit(breaker, keys, priority, tokens)
+        # stream_options is not a named SDK parameter: send it in the body
+        kwargs["extra_body"] = {**(kwargs.get("extra_body") or {}), "stream_options": {"include_usage": True}}
+        try:
+            stream = await client.chat.completions.create(model=model, messages=messages, stream=True, **kwargs)
+            settled = False
+            async with stream:
+                async for chunk in stream:
+                    # usage arrives at the end: top-level with include_usage, under x_groq as well
+                    usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                    if usage is not None and not settled:
+                        scheduler.settle(tokens, getattr(usage, "total_tokens", None))
+                        settled = True
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yield delta
+        except (asyncio.CancelledError, GeneratorExit):
+            breaker.release(*keys)
+            raise
+        except Exception as e:
+            breaker.record(keys, e)
+            raise
+        breaker.record(keys)
+
+    async def list_models(self) -> list:
+        client = self.get()
+        if client is None:
+            return []
+        resp = await client.models.list()
+        return [m.id for m in getattr(resp, "data", []) if getattr(m, "id", None)]
+
+
+_llm = LLMClient()
+
+def get_llm() -> LLMClient:
+    return _llm
+
+async def achat(model: str, messages: list, **kwargs: Any) -> Any:
+    return await _llm.achat(model, messages, **kwargs)
@@ -13,14 +13,10 @@ from fastapi import APIRouter
 plain_prompt_router = APIRouter()
 
 @plain_prompt_router.post('/api/llm_plain_mealplan')
-def llm_plain_mealplan():
+async def llm_plain_mealplan():
     key = _get_groq_key() if "_get_groq_key" in globals() else os.getenv("GROQ_API_KEY", "").strip()
     if not key:
         return {"error": "No GROQ_API_KEY set"}
-    try:
-        client = Groq(api_key=key)
-    except Exception as e:
-        return {"error": f"Groq client error: {e}"}
     prompt = (
         "Given these flagged lab results: "
         "Red Blood Cell (RBC): 1.8 million/μl (low), Hemoglobin: 6.5 g/dL (low), Hematocrit: 19.5% (low). "
@@ -31,7 +27,7 @@ def llm_plain_mealplan():
     models = []
     try:
         if "_discover_models" in globals():
-            models = _discover_models(client)
+            models = await _discover_models()
         if not models:
             models = [os.getenv("GROQ_MODEL", "").strip()] if os.getenv("GROQ_MODEL", "").strip() else []
         if not models:
@@ -44,7 +40,7 @@ def llm_plain_mealplan():
         if not model:
             continue
         try:
-            completion = client.chat.completions.create(
+            completion = await achat(
                 model=model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.3,
@@ -52,43 +48,45 @@ def llm_plain_mealplan():
             )
             content = completion.choices[0].message.content.strip()
             print(f"[GROQ][PLAIN PROMPT TEST][{model}]", content)
+            get_model_registry().report_success(model)
             return {"result": content, "model": model}
         except Exception as e:
             print(f"[GROQ][PLAIN PROMPT TEST][{model}] failed: {e}")
+            get_model_registry().report_failure(model, e)
             continue
     return {"error": "All models failed"}
 # app/summarize/llm.py
 
-import os, json, time
-from typing import List, Dict, Any, Tuple, Optional
-from groq import Groq
+import os, json, time, asyncio, contextlib
+from typing import List, Dict, Any, Tuple, Optional, Callable, Awaitable, AsyncIterator
 from groq import GroqError, BadRequestError
 
 
-# Candidate chat models to try (order = preference). You can override with GROQ_MODEL.
-CANDIDATES: List[str] = [
-    "llama3-70b-8192",
-    "llama3-8b-8192",
-    "mixtral-8x7b-32768",
-    "gemma2-9b-it",
-    # Add more as needed
-]
+from app.summarize.models import CANDIDATES, get_model_registry
+from app.summarize.client import achat, get_llm
+from app.summarize.breaker import CircuitOpen
+from app.summarize.scheduler import SchedulerBusy
+from app.summarize.cache import get_summary_cache, summary_key
+from app.core.deadline import Deadline
+from app.summarize.stream_json import StreamingJSONParser
 
-DISCOVERY_TTL_SEC = 3600  # re-discover available models every hour
-_discovered: Dict[str, Any] = {"ts": 0, "models": []}
-def _try_completion(client: Groq, model: str) -> bool:
+async def _try_completion(model: str) -> Optional[bool]:
     """
     Probe the model with a tiny request; return True if it succeeds.
-    Keeps it minimal to avoid usage cost.
+    Keeps it minimal to avoid usage cost. None if the circuit breaker or
+    the scheduler did not let the probe through.
     """
     try:
-        client.chat.completions.create(
+        await achat(
             model=model,
             messages=[{"role": "user", "content": "ping"}],
             max_tokens=1,
             temperature=0.0,
+            retries=0,   # a probe answers "usable right now?"; the registry moves on instead
         )
         return True
+    except (CircuitOpen, SchedulerBusy):
+        return None
     except BadRequestError as e:
         if "model_decommissioned" in str(e) or "not_found" in str(e):
             return False
@@ -96,115 +94,76 @@ def _try_completion(client: Groq, model: str) -> bool:
     except Exception:
         return False
 
-def resolve_model(client: Groq) -> str:
+async def resolve_model() -> str:
     """
-    Choose a working model:
-    1) Use GROQ_MODEL if provided and probe it.
-    2) Otherwise probe candidates until one works.
+    Choose a working model via the shared ModelRegistry:
+    GROQ_MODEL first, then CANDIDATES, then discovered models. The answer is
+    cached process-wide; a probe only happens when nothing healthy is cached.
     Raises a helpful error if none are usable.
     """
-    env_model = os.getenv("GROQ_MODEL")
-    if env_model:
-        if _try_completion(client, env_model):
-            return env_model
-    for m in CANDIDATES:
-        if _try_completion(client, m):
-            return m
-    raise GroqError(
-        "No working Groq chat model found. "
-        "Set GROQ_MODEL to a supported model shown in your Groq console."
-    )
+    try:
+        return await get_model_registry().resolve(_try_completion)
+    except LookupError as e:
+        raise GroqError(str(e)) from e
 
 def _get_groq_key() -> str:
     return os.getenv("GROQ_API_KEY", "").strip()
 
-def _discover_models(client: Groq) -> List[str]:
-    """Ask Groq for current models and return a ranked list of viable chat-completions models."""
-    now = time.time()
-    if _discovered["models"] and (now - _discovered["ts"] < DISCOVERY_TTL_SEC):
-        return _discovered["models"]
+async def _discover_models() -> List[str]:
+    """Ranked list of viable chat-completions models (cached in the ModelRegistry)."""
+    return await get_model_registry().discover(get_llm().list_models)
 
-    try:
-        resp = client.models.list()
-        ids: List[str] = [m.id for m in getattr(resp, "data", []) if getattr(m, "id", None)]
-    except Exception as e:
-        print(f"[GROQ] Model discovery failed: {e}")
-        return _discovered["models"] or []
-
-    # Heuristics: prefer models that look like chat-capable LLMs (exclude audio/vision/embeddings/tools)
-    def is_chat_candidate(mid: str) -> bool:
-        s = mid.lower()
-        # Keep llama/gemma/mixtral style text/chat models. Exclude embeddings/audio/whisper/tokenizers.
-        bad = ("embed", "whisper", "audio", "tts", "stt", "vision", "token", "tool", "rerank")
-        return any(x in s for x in ("llama", "gemma", "mixtral")) and not any(b in s for b in bad)
-
-    candidates = [m for m in ids if is_chat_candidate(m)]
-
-    # Rank: bigger and newer-looking first
-    def score(mid: str) -> Tuple[int, int, int, int]:
-        s = mid.lower()
-        # crude size hints
-        size = 0
-        if "405b" in s or "400b" in s or "340b" in s: size = 405
-        elif "200b" in s: size = 200
-        elif "90b" in s: size = 90
-        elif "70b" in s: size = 70
-        elif "40b" in s: size = 40
-        elif "30b" in s: size = 30
-        elif "11b" in s: size = 11
-        elif "8b" in s: size = 8
-        elif "3b" in s or "1b" in s: size = 3
-
-        # favor text/chat over instruct if both exist, but both are fine
-        is_text = 1 if "text" in s or "chat" in s else 0
-        is_llama = 1 if "llama" in s else 0
-        is_preview = 1 if "preview" in s else 0  # sometimes previews are newer/better
-        return (is_llama, size, is_text, is_preview)
-
-    ranked = sorted(candidates, key=score, reverse=True)
-
-    # Allow explicit override/priority via env GROQ_MODELS (comma-separated)
-    env_val = os.getenv("GROQ_MODELS", "").strip()
-    if env_val:
-        preferred = [m.strip() for m in env_val.split(",") if m.strip()]
-        # keep only those that exist; then append the rest
-        preferred_existing = [m for m in preferred if m in ranked]
-        ranked = preferred_existing + [m for m in ranked if m not in preferred_existing]
-
-    # Cache
-    _discovered["ts"] = now
-    _discovered["models"] = ranked
-    if os.getenv("GROQ_VERBOSE", "0") == "1":
-        print(f"[GROQ] Discovered models (top 10): {ranked[:10]}")
-    return ranked
-
-
-# --- Load KB so we can enrich prompts with importance/causes/advice
-try:
-    from app.kb.loader import load_kb
-    KB = load_kb()  # dict keyed by test_name.lower()
-except Exception:
-    KB = {}
+# KB entries enrich prompts with importance/causes/advice (shared compiled KB, built on first use)
+from app.kb.compiled import get_kb
 
-# Print available Groq models at startup for user convenience
-def _print_groq_models():
+# Print available Groq models for user convenience (startup warm-up, not at import)
+async def _print_groq_models() -> None:
+    if not _get_groq_key():
+        print("[GROQ] No API key set, cannot list models.")
+        return
     try:
-        from groq import Groq
-        key = os.getenv("GROQ_API_KEY", "").strip()
-        if not key:
-            print("[GROQ] No API key set, cannot list models.")
-            return
-        client = Groq(api_key=key)
-        resp = client.models.list()
-        ids = [m.id for m in getattr(resp, "data", []) if getattr(m, "id", None)]
-        print(f"[GROQ] Available models: {ids}")
+        print(f"[GROQ] Available models: {await _discover_models()}")
     except Exception as e:
         print(f"[GROQ] Could not list models: {e}")
 
-_print_groq_models()
+# Per-test LLM fan-out: at most LLM_FANOUT calls in flight, and whatever has not
+# finished after LLM_FANOUT_DEADLINE_SEC is dropped (callers fill placeholders).
+LLM_FANOUT = int(os.getenv("LLM_FANOUT", "4"))
+LLM_FANOUT_DEADLINE_SEC = float(os.getenv("LLM_FANOUT_DEADLINE_SEC", "20"))
+
+async def _bounded_gather(factories: List[Callable[[], Awaitable[Any]]],
+                          limit: Optional[int] = None, deadline: Optional[float] = None) -> List[Any]:
+    """
+    Run coroutine factories concurrently under a semaphore with one overall deadline.
+    Each slot holds the result, the exception raised, or None if it did not finish in time.
+    """
+    if not factories:
+        return []
+    sem = asyncio.Semaphore(max(1, limit or LLM_FANOUT))
+
+    async def run(factory):
+        async with sem:
+            return await factory()
+
+    tasks = [asyncio.ensure_future(run(f)) for f in factories]
+    _, pending = await asyncio.wait(tasks, timeout=LLM_FANOUT_DEADLINE_SEC if deadline is None else deadline)
+    for t in pending:
+        t.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    return [None if t in pending or t.cancelled() else (t.exception() or t.result()) for t in tasks]
+
+def _range_text(rng: Dict[str, Any]) -> str:
+    if rng.get("low") is not None and rng.get("high") is not None:
+        return f"{rng['low']}–{rng['high']} ({rng.get('source', 'KB')})"
+    if rng.get("low") is not None:
+        return f"≥{rng['low']} ({rng.get('source', 'KB')})"
+    if rng.get("high") is not None:
+        return f"≤{rng['high']} ({rng.get('source', 'KB')})"
+    return "not available"
 
 def _kb_snippet(test_name: str) -> Dict[str, Any]:
-    entry = KB.get(test_name.lower(), {}) if test_name else {}
+    entry = get_kb().get(test_name.lower(), {}) if test_name else {}
     if not entry:
         return {}
     return {
@@ -213,7 +172,7 @@ def _kb_snippet(test_name: str) -> Dict[str, Any]:
         "advice": entry.get("advice", {}) or {},
     }
 
-def _fallback_summary(context: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+async def _fallback_summary(context: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
     """Local deterministic summary + diet plan (guarantees non-empty response)."""
     # Only flag truly abnormal (high/low), not borderline or needs_review
     normals = [r for r in results if r["status"] == "normal"]
@@ -254,66 +213,54 @@ def _fallback_summary(context: Dict[str, Any], results: List[Dict[str, Any]]) ->
         if not name or name.lower() == "undefined":
             return None
         return f"https://www.doordash.com/search/store/{quote_plus(name)}"
-    # Always call LLM for every test to generate all fields
+    # Always call LLM for every test to generate all fields (concurrently, bounded)
     try:
-        key = _get_groq_key() if "_get_groq_key" in globals() else os.getenv("GROQ_API_KEY", "").strip()
-        client = Groq(api_key=key)
-        model = resolve_model(client)
-        for r in flagged:
-            test = r["test"]
-            status_text = r["status"].replace("_", " ")
-            rng = r.get("applied_range", {})
-            if rng.get("low") is not None and rng.get("high") is not None:
-                rng_text = f"{rng['low']}–{rng['high']} ({rng.get('source', 'KB')})"
-            elif rng.get("low") is not None:
-                rng_text = f"≥{rng['low']} ({rng.get('source', 'KB')})"
-            elif rng.get("high") is not None:
-                rng_text = f"≤{rng['high']} ({rng.get('source', 'KB')})"
-            else:
-                rng_text = "not available"
+        model = await resolve_model()
+
+        async def _explain(r: Dict[str, Any]) -> Dict[str, Any]:
             prompt = (
-                f"Lab test: {test} ({r.get('value','')} {r.get('unit','')}), status: {status_text}.\n"
+                f"Lab test: {r['test']} ({r.get('value','')} {r.get('unit','')}), status: {r['status'].replace('_', ' ')}.\n"
                 "Please provide the following as clear, readable English sentences: "
                 f"1) Why Important: What is the importance of this test?\n"
                 f"2) Reason for High/Low: What are the common reasons for abnormal results?\n"
                 f"3) Risks: What are the risks if the result is abnormal?\n"
                 "Return a JSON object with keys: importance, reason, risks."
             )
-            try:
-                completion = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": "You are a medical AI assistant. Return ONLY valid JSON with keys: importance, reason, risks. No prose."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.2,
-                    max_tokens=300,
-                    response_format={"type": "json_object"},
-                )
-                content = completion.choices[0].message.content.strip()
-                ai_data = json.loads(content)
-                per.append({
-                    "test": test,
-                    "value": r.get("value"),
-                    "unit": r.get("unit"),
-                    "status": status_text,
-                    "range": rng_text,
-                    "importance": ai_data.get("importance", ""),
-                    "reason": ai_data.get("reason", ""),
-                    "risks": ai_data.get("risks", ""),
-                })
-            except Exception as e:
-                print(f"[GROQ][per_test fallback] Exception for {test}: {e}")
-                per.append({
-                    "test": test,
-                    "value": r.get("value"),
-                    "unit": r.get("unit"),
-                    "status": status_text,
-                    "range": rng_text,
-                    "importance": f"No AI explanation available for {test}.",
-                    "reason": f"No AI reason available for {test}.",
-                    "risks": f"No AI risks available for {test}.",
-                })
+            completion = await achat(
+                model=model,
+                messages=[
+                    {"role": "system", "content": "You are a medical AI assistant. Return ONLY valid JSON with keys: importance, reason, risks. No prose."},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0.2,
+                max_tokens=300,
+                response_format={"type": "json_object"},
+            )
+            return json.loads(completion.choices[0].message.content.strip())
+
+        answers = await _bounded_gather([lambda r=r: _explain(r) for r in flagged])
+        for r, ai_data in zip(flagged, answers):
+            test = r["test"]
+            entry = {
+                "test": test,
+                "value": r.get("value"),
+                "unit": r.get("unit"),
+                "status": r["status"].replace("_", " "),
+                "range": _range_text(r.get("applied_range", {})),
+            }
+            if isinstance(ai_data, dict):
+                entry.update(importance=ai_data.get("importance", ""), reason=ai_data.get("reason", ""),
+                             risks=ai_data.get("risks", ""))
+            else:
+                if isinstance(ai_data, Exception):
+                    print(f"[GROQ][per_test fallback] Exception for {test}: {ai_data}")
+                    get_model_registry().report_failure(model, ai_data)
+                else:
+                    print(f"[GROQ][per_test fallback] Deadline passed for {test}")
+                entry.update(importance=f"No AI explanation available for {test}.",
+                             reason=f"No AI reason available for {test}.",
+                             risks=f"No AI risks available for {test}.")
+            per.append(entry)
     except Exception as e:
         print(f"[GROQ][per_test fallback] LLM client error: {e}")
 
@@ -395,11 +342,12 @@ def _fallback_summary(context: Dict[str, Any], results: List[Dict[str, Any]]) ->
         "_debug": {"groq_used": False, "path": "fallback", "reason": "groq_not_used_or_failed"}
     }
 
-def _groq_structured_summary(context: Dict[str, Any], results: List[Dict[str, Any]]) -> Tuple[bool, Dict[str, Any]]:
+def _structured_request(context: Dict[str, Any], results: List[Dict[str, Any]]) -> Optional[Tuple[List[Dict[str, str]], str, int]]:
+    """(messages, mode, n_items) for the structured-summary call, or None when there is nothing to ask."""
     key = _get_groq_key() if "_get_groq_key" in globals() else os.getenv("GROQ_API_KEY", "").strip()
     if not key:
         print("[GROQ] Missing GROQ_API_KEY (call-time)")
-        return False, {}
+        return None
 
     # Partition results
     flagged = [r for r in results if r["status"] in ("high", "low")]
@@ -407,7 +355,7 @@ def _groq_structured_summary(context: Dict[str, Any], results: List[Dict[str, An
 
     if not results:
         print("[GROQ] No results -> skip Groq")
-        return False, {}
+        return None
 
     # Build payload
     payload_flagged = []
@@ -441,7 +389,7 @@ def _groq_structured_summary(context: Dict[str, Any], results: List[Dict[str, An
 
     if not payload:
         print("[GROQ] Results exist but empty payload after filtering -> skip Groq")
-        return False, {}
+        return None
 
     sys_text = (
         "IMPORTANT: Return ONLY a JSON object with a 'diet_plan' key containing a 'meals' list (at least 3 meal ideas, never empty), and a 'per_test' list with an entry for every test in the input.\n"
@@ -475,23 +423,126 @@ def _groq_structured_summary(context: Dict[str, Any], results: List[Dict[str, An
             "overall_message": "1–2 lines wrap-up for the user"
         }
     }
-
+    messages = [
+        {"role": "system", "content": sys_text},
+        {"role": "user", "content": json.dumps(usr_obj, ensure_ascii=False)},
+        {"role": "system", "content": "Return ONLY valid JSON. No prose."},
+    ]
+    return messages, mode, len(payload)
+
+def _link_meal(meal: Dict[str, Any]) -> None:
+    """Add DoorDash/Instacart links to one LLM meal (in place; safe to repeat)."""
+    from urllib.parse import quote_plus
+    # Add DoorDash link for the dish
+    if meal.get("name"):
+        meal["doordash_link"] = f"https://www.doordash.com/search/store/{quote_plus(meal['name'])}"
+    # Add Instacart link to each ingredient individually (not as a list of objects)
+    if isinstance(meal.get("ingredients"), list):
+        valid_ings = []
+        for ing in meal["ingredients"]:
+            ing_name = None
+            if isinstance(ing, dict) and "name" in ing:
+                ing_name = str(ing["name"]).strip()
+            elif isinstance(ing, str):
+                ing_name = ing.strip()
+            if ing_name and ing_name.lower() != "undefined":
+                # Add/overwrite instacart_link directly on the dict or replace string with dict
+                if isinstance(ing, dict):
+                    ing["instacart_link"] = f"https://www.instacart.com/store/s?k={quote_plus(ing_name)}"
+                    valid_ings.append(ing)
+                else:
+                    valid_ings.append({"name": ing_name, "instacart_link": f"https://www.instacart.com/store/s?k={quote_plus(ing_name)}"})
+        meal["ingredients"] = valid_ings
+
+async def _finish_structured(context: Dict[str, Any], results: List[Dict[str, Any]], data: Dict[str, Any],
+                             model: str, mode: str) -> Dict[str, Any]:
+    """Refill incomplete per_test entries, compose the summary and stamp `_debug`."""
+    data.setdefault("diet_plan", {"add": [], "limit": []})
+    data.setdefault("per_test", [])
+    # Ensure every test in the input has a per_test entry with all required fields, and all are AI-generated
+    input_tests = [r["test"] for r in results]
+    per_test_dict = {p.get("test"): p for p in data["per_test"]}
+    required_fields = ["test", "importance", "reason", "risks"]
+    # refills reuse the model resolved above and run concurrently (bounded)
+    def _missing(test: str) -> bool:
+        p = per_test_dict.get(test)
+        return p is None or any(not p.get(field) for field in required_fields)
+
+    refill: List[Dict[str, Any]] = []
+    for test in dict.fromkeys(input_tests):
+        r = next((x for x in results if x["test"] == test), None)
+        if r and _missing(test):
+            refill.append(r)
+
+    async def _refill_one(r: Dict[str, Any]) -> Dict[str, Any]:
+        # Re-call LLM for just this test to fill in missing data
+        test = r["test"]
+        status_text = r["status"].replace("_", " ")
+        prompt = (
+            f"Lab test: {test} ({r.get('value','')} {r.get('unit','')}), status: {status_text}.\n"
+            "Please provide the following as clear, readable English sentences: "
+            f"1) Why Important: What is the importance of this test?\n"
+            f"2) Reason for High: What are the common reasons for high results?\n"
+            f"3) Reason for Low: What are the common reasons for low results?\n"
+            f"4) Risks: What are the risks if the result is abnormal?\n"
+            "Return a JSON object with keys: importance, reason_high, reason_low, risks."
+        )
+        completion = await achat(
+            model=model,
+            messages=[
+                {"role": "system", "content": "You are a medical AI assistant. Return ONLY valid JSON with keys: importance, reason_high, reason_low, risks, value, unit, status. No prose."},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.2,
+            max_tokens=400,
+            response_format={"type": "json_object"},
+        )
+        return json.loads(completion.choices[0].message.content.strip())
+
+    answers = await _bounded_gather([lambda r=r: _refill_one(r) for r in refill])
+    for r, ai_data in zip(refill, answers):
+        test = r["test"]
+        if not isinstance(ai_data, dict):
+            if isinstance(ai_data, Exception):
+                print(f"[GROQ][per_test single LLM call] Exception for {test}: {ai_data}")
+                get_model_registry().report_failure(model, ai_data)
+            else:
+                print(f"[GROQ][per_test single LLM call] Deadline passed for {test}")
+            ai_data = {}
+        per_test_dict[test] = {
+            "test": test,
+            "value": r.get("value", ""),
+            "unit": r.get("unit", ""),
+            "status": r["status"].replace("_", " "),
+            "importance": ai_data.get("importance", ""),
+            "reason_high": ai_data.get("reason_high", ""),
+            "reason_low": ai_data.get("reason_low", ""),
+            "risks": ai_data.get("risks", ""),
+        }
+    # Overwrite per_test with the complete list in input order
+    data["per_test"] = [per_test_dict[test] for test in input_tests]
+    # compose summary on top of per_test (keeps your consistent format)
     try:
-        client = Groq(api_key=key)
-    except Exception as e:
-        print(f"[GROQ] Client init failed: {e}")
-        return False, {}
+        summary_text = _compose_summary(context, results, data.get("per_test", []))
+        data["summary"] = summary_text or data.get("overall_message", "")
+    except Exception:
+        data.setdefault("summary", data.get("overall_message", ""))
+
+    data["_debug"] = {"groq_used": True, "path": "groq", "model": model, "mode": mode}
+    return data
 
+async def _groq_structured_summary(context: Dict[str, Any], results: List[Dict[str, Any]]) -> Tuple[bool, Dict[str, Any]]:
+    req = _structured_request(context, results)
+    if req is None:
+        return False, {}
+    messages, mode, n_items = req
+    model = None
     try:
-        model = resolve_model(client)
-        print(f"[GROQ] Using model: {model} with {len(payload)} {mode} items")
-        completion = client.chat.completions.create(
+        model = await resolve_model()
+        print(f"[GROQ] Using model: {model} with {n_items} {mode} items")
+        completion = await achat(
             model=model,
-            messages=[
-                {"role": "system", "content": sys_text},
-                {"role": "user", "content": json.dumps(usr_obj, ensure_ascii=False)},
-                {"role": "system", "content": "Return ONLY valid JSON. No prose."},
-            ],
+            messages=messages,
             temperature=0.1,
             max_tokens=400,
             response_format={"type": "json_object"},
@@ -502,122 +553,15 @@ def _groq_structured_summary(context: Dict[str, Any], results: List[Dict[str, An
         # Extra debug: print just the meal plan for quick inspection
         meal_plan = data.get("diet_plan") or {}
         print("[GROQ][DEBUG] LLM meal plan only:", json.dumps(meal_plan, indent=2, ensure_ascii=False))
-        data.setdefault("diet_plan", {"add": [], "limit": []})
-        data.setdefault("per_test", [])
-
-        # --- Add Instacart and DoorDash links to LLM meal plan output ---
-        from urllib.parse import quote_plus
-        meals = meal_plan.get("meals")
-        if isinstance(meals, list):
-            for meal in meals:
-                # Add DoorDash link for the dish
-                if meal.get("name"):
-                    meal["doordash_link"] = f"https://www.doordash.com/search/store/{quote_plus(meal['name'])}"
-                # Add Instacart link to each ingredient individually (not as a list of objects)
-                if isinstance(meal.get("ingredients"), list):
-                    valid_ings = []
-                    for ing in meal["ingredients"]:
-                        ing_name = None
-                        if isinstance(ing, dict) and "name" in ing:
-                            ing_name = str(ing["name"]).strip()
-                        elif isinstance(ing, str):
-                            ing_name = ing.strip()
-                        if ing_name and ing_name.lower() != "undefined":
-                            # Add/overwrite instacart_link directly on the dict or replace string with dict
-                            if isinstance(ing, dict):
-                                ing["instacart_link"] = f"https://www.instacart.com/store/s?k={quote_plus(ing_name)}"
-                                valid_ings.append(ing)
-                            else:
-                                valid_ings.append({"name": ing_name, "instacart_link": f"https://www.instacart.com/store/s?k={quote_plus(ing_name)}"})
-                    meal["ingredients"] = valid_ings
-        # Ensure every test in the input has a per_test entry with all required fields, and all are AI-generated
-        input_tests = [r["test"] for r in results]
-        per_test_dict = {p.get("test"): p for p in data["per_test"]}
-        required_fields = ["test", "importance", "reason", "risks"]
-        key = _get_groq_key() if "_get_groq_key" in globals() else os.getenv("GROQ_API_KEY", "").strip()
-        client = Groq(api_key=key)
-        model = resolve_model(client)
-        for test in input_tests:
-            missing = False
-            if test not in per_test_dict:
-                missing = True
-            else:
-                for field in required_fields:
-                    if field not in per_test_dict[test] or not per_test_dict[test][field]:
-                        missing = True
-                        break
-            if missing:
-                # Re-call LLM for just this test to fill in missing data
-                r = next((x for x in results if x["test"] == test), None)
-                if r:
-                    status_text = r["status"].replace("_", " ")
-                    rng = r.get("applied_range", {})
-                    if rng.get("low") is not None and rng.get("high") is not None:
-                        rng_text = f"{rng['low']}–{rng['high']} ({rng.get('source', 'KB')})"
-                    elif rng.get("low") is not None:
-                        rng_text = f"≥{rng['low']} ({rng.get('source', 'KB')})"
-                    elif rng.get("high") is not None:
-                        rng_text = f"≤{rng['high']} ({rng.get('source', 'KB')})"
-                    else:
-                        rng_text = "not available"
-                    prompt = (
-                        f"Lab test: {test} ({r.get('value','')} {r.get('unit','')}), status: {status_text}.\n"
-                        "Please provide the following as clear, readable English sentences: "
-                        f"1) Why Important: What is the importance of this test?\n"
-                        f"2) Reason for High: What are the common reasons for high results?\n"
-                        f"3) Reason for Low: What are the common reasons for low results?\n"
-                        f"4) Risks: What are the risks if the result is abnormal?\n"
-                        "Return a JSON object with keys: importance, reason_high, reason_low, risks."
-                    )
-                    try:
-                        completion = client.chat.completions.create(
-                            model=model,
-                            messages=[
-                                {"role": "system", "content": "You are a medical AI assistant. Return ONLY valid JSON with keys: importance, reason_high, reason_low, risks, value, unit, status. No prose."},
-                                {"role": "user", "content": prompt},
-                            ],
-                            temperature=0.2,
-                            max_tokens=400,
-                            response_format={"type": "json_object"},
-                        )
-                        content = completion.choices[0].message.content.strip()
-                        ai_data = json.loads(content)
-                        per_test_dict[test] = {
-                            "test": test,
-                            "value": r.get("value", ""),
-                            "unit": r.get("unit", ""),
-                            "status": status_text,
-                            "importance": ai_data.get("importance", ""),
-                            "reason_high": ai_data.get("reason_high", ""),
-                            "reason_low": ai_data.get("reason_low", ""),
-                            "risks": ai_data.get("risks", ""),
-                        }
-                    except Exception as e:
-                        print(f"[GROQ][per_test single LLM call] Exception for {test}: {e}")
-                        per_test_dict[test] = {
-                            "test": test,
-                            "value": r.get("value", ""),
-                            "unit": r.get("unit", ""),
-                            "status": status_text,
-                            "importance": "",
-                            "reason_high": "",
-                            "reason_low": "",
-                            "risks": "",
-                        }
-        # Overwrite per_test with the complete list in input order
-        data["per_test"] = [per_test_dict[test] for test in input_tests]
-        # compose summary on top of per_test (keeps your consistent format)
-        try:
-            summary_text = _compose_summary(context, results, data.get("per_test", []))
-            data["summary"] = summary_text or data.get("overall_message", "")
-        except Exception:
-            data.setdefault("summary", data.get("overall_message", ""))
-
-        data["_debug"] = {"groq_used": True, "path": "groq", "model": model, "mode": mode}
+        if isinstance(meal_plan.get("meals"), list):
+            for meal in meal_plan["meals"]:
+                _link_meal(meal)
+        data = await _finish_structured(context, results, data, model, mode)
         print(f"[GROQ] Success with {model} (mode={mode})")
         return True, data
     except Exception as e:
         print(f"[GROQ] All models failed or exception: {e}")
+        get_model_registry().report_failure(model, e)
         return False, {}
 
 def _compose_summary(context: Dict[str, Any],
@@ -691,14 +635,127 @@ def _compose_summary(context: Dict[str, Any],
     return "\n".join(lines).strip()
 
 
-def summarize_results_structured(context: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
-    ok, data = _groq_structured_summary(context, results)
+def _from_cache(cached: Dict[str, Any], context: Dict[str, Any], results: List[Dict[str, Any]], model: str) -> Dict[str, Any]:
+    """Cached explanations/meals re-stamped with this report's values and a fresh summary."""
+    by_test = {r["test"]: r for r in results}
+    for p in cached.get("per_test") or []:
+        r = by_test.get(p.get("test"))
+        if r:
+            p.update(value=r.get("value", ""), unit=r.get("unit", ""), status=r["status"].replace("_", " "))
+    try:
+        cached["summary"] = _compose_summary(context, results, cached.get("per_test", [])) or cached.get("overall_message", "")
+    except Exception:
+        cached["summary"] = cached.get("overall_message", "")
+    cached["_debug"] = {"groq_used": "cache", "path": "cache", "model": model}
+    return cached
+
+async def summarize_results_structured(context: Dict[str, Any], results: List[Dict[str, Any]],
+                                       deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    # Same abnormality pattern (tests + statuses, age bucket, sex) -> reuse the last LLM answer
+    model = get_model_registry().current() or os.getenv("GROQ_MODEL", "").strip()
+    if results and model:
+        cached = await asyncio.to_thread(get_summary_cache().get, summary_key(model, results, context))
+        if cached is not None:
+            print(f"[GROQ] Summary cache hit ({len(results)} results, model={model})")
+            return _from_cache(cached, context, results, model)
+
+    deadline = deadline or Deadline()
+    if deadline.expired():
+        deadline.skip("llm_summary")
+        ok, data = False, {}
+    else:
+        try:
+            ok, data = await asyncio.wait_for(_groq_structured_summary(context, results), deadline.remaining())
+        except asyncio.TimeoutError:
+            deadline.skip("llm_summary")
+            ok, data = False, {}
     if ok and (data.get("summary") or data.get("diet_plan") or data.get("per_test")):
+        await _cache_put(context, results, data)
         return data
+    return _no_llm(deadline)
+
+async def _cache_put(context: Dict[str, Any], results: List[Dict[str, Any]], data: Dict[str, Any]) -> None:
+    used = (data.get("_debug") or {}).get("model")
+    if results and used:
+        # SQLite write (and possible eviction): keep it off the event loop
+        await asyncio.to_thread(get_summary_cache().put, summary_key(used, results, context), {
+            "per_test": data.get("per_test") or [],
+            "diet_plan": data.get("diet_plan") or {},
+            "overall_message": data.get("overall_message", ""),
+        }, model=used)
+
+def _no_llm(deadline: Deadline) -> Dict[str, Any]:
     # If LLM fails, do not return fallback/static meal plan. Return error message only.
     return {
         "summary": "Sorry, we could not generate a meal plan at this time. Please try again later.",
         "diet_plan": {},
         "per_test": [],
-        "_debug": {"groq_used": False, "path": "no_llm", "reason": "llm_failed_no_fallback"}
+        "_debug": {"groq_used": False, "path": "no_llm",
+                   "reason": "deadline" if "llm_summary" in deadline.skipped else "llm_failed_no_fallback"}
     }
+
+async def stream_structured_summary(context: Dict[str, Any], results: List[Dict[str, Any]],
+                                    deadline: Optional[Deadline] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of summarize_results_structured: yields ("per_test", entry)
+    and ("meal", meal) as soon as the model has written each one, then
+    ("done", structured) - the same dict summarize_results_structured returns.
+    """
+    model = get_model_registry().current() or os.getenv("GROQ_MODEL", "").strip()
+    if results and model:
+        cached = await asyncio.to_thread(get_summary_cache().get, summary_key(model, results, context))
+        if cached is not None:
+            print(f"[GROQ] Summary cache hit ({len(results)} results, model={model})")
+            data = _from_cache(cached, context, results, model)
+            for p in data.get("per_test") or []:
+                yield "per_test", p
+            for meal in (data.get("diet_plan") or {}).get("meals") or []:
+                yield "meal", meal
+            yield "done", data
+            return
+
+    deadline = deadline or Deadline()
+    req = _structured_request(context, results)
+    if req is None:
+        yield "done", _no_llm(deadline)
+        return
+    if deadline.expired():
+        deadline.skip("llm_summary")
+        yield "done", _no_llm(deadline)
+        return
+    messages, mode, n_items = req
+    model = None
+    try:
+        model = await resolve_model()
+        print(f"[GROQ] Streaming with model: {model} ({n_items} {mode} items)")
+        parser = StreamingJSONParser(watch=[("per_test",), ("diet_plan", "meals")])
+        # no response_format: JSON mode does not stream; the parser skips any prose around the object
+        async with contextlib.aclosing(get_llm().astream(model, messages, temperature=0.1, max_tokens=400)) as deltas:
+            async for delta in deltas:
+                if deadline.expired():
+                    deadline.skip("llm_summary")
+                    yield "done", _no_llm(deadline)
+                    return
+                for path, obj in parser.feed(delta):
+                    if not isinstance(obj, dict):
+                        continue
+                    if path == ("per_test",):
+                        yield "per_test", obj
+                    else:
+                        _link_meal(obj)
+                        yield "meal", obj
+        data = parser.document()
+        if not isinstance(data, dict):
+            raise ValueError("streamed summary is not a complete JSON object")
+        for meal in (data.get("diet_plan") or {}).get("meals") or []:
+            if isinstance(meal, dict):
+                _link_meal(meal)
+        data = await _finish_structured(context, results, data, model, mode)
+    except Exception as e:
+        print(f"[GROQ] Streaming summary failed: {e}")
+        get_model_registry().report_failure(model, e)
+        yield "done", _no_llm(deadline)
+        return
+    print(f"[GROQ] Streamed summary with {model} (mode={mode})")
+    await _cache_put(context, results, data)
+    yield "done", data
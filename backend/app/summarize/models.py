@@ -0,0 +1,272 @@
+# app/summarize/models.py
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio, os, threading, time
+
+# Candidate chat models to try (order = preference). You can override with GROQ_MODEL.
+CANDIDATES: List[str] = [
+    "llama3-70b-8192",
+    "llama3-8b-8192",
+    "mixtral-8x7b-32768",
+    "gemma2-9b-it",
+    # Add more as needed
+]
+
+Probe = Callable[[str], Awaitable[Optional[bool]]]   # model -> True if a tiny completion works, None = not tried
+Lister = Callable[[], Awaitable[List[str]]]   # -> model ids the account can see
+
+
+def _is_chat_candidate(mid: str) -> bool:
+    s = mid.lower()
+    # Keep llama/gemma/mixtral style text/chat models. Exclude embeddings/audio/whisper/tokenizers.
+    bad = ("embed", "whisper", "audio", "tts", "stt", "vision", "token", "tool", "rerank")
+    return any(x in s for x in ("llama", "gemma", "mixtral")) and not any(b in s for b in bad)
+
+def _score(mid: str) -> Tuple[int, int, int, int]:
+    s = mid.lower()
+    # crude size hints
+    size = 0
+    if "405b" in s or "400b" in s or "340b" in s: size = 405
+    elif "200b" in s: size = 200
+    elif "90b" in s: size = 90
+    elif "70b" in s: size = 70
+    elif "40b" in s: size = 40
+    elif "30b" in s: size = 30
+    elif "11b" in s: size = 11
+    elif "8b" in s: size = 8
+    elif "3b" in s or "1b" in s: size = 3
+
+    # favor text/chat over instruct if both exist, but both are fine
+    is_text = 1 if "text" in s or "chat" in s else 0
+    is_llama = 1 if "llama" in s else 0
+    is_preview = 1 if "preview" in s else 0  # sometimes previews are newer/better
+    return (is_llama, size, is_text, is_preview)
+
+def rank_models(ids: List[str]) -> List[str]:
+    """Viable chat models, biggest/newest-looking first, GROQ_MODELS overrides on top."""
+    ranked = sorted((m for m in ids if _is_chat_candidate(m)), key=_score, reverse=True)
+    env_val = os.getenv("GROQ_MODELS", "").strip()
+    if env_val:
+        preferred = [m.strip() for m in env_val.split(",") if m.strip()]
+        # keep only those that exist; then append the rest
+        preferred_existing = [m for m in preferred if m in ranked]
+        ranked = preferred_existing + [m for m in ranked if m not in preferred_existing]
+    return ranked
+
+def is_model_gone(err: Exception) -> bool:
+    s = str(err)
+    return "model_decommissioned" in s or "model_not_found" in s or "does not exist" in s
+
+def is_transient(err: Exception) -> bool:
+    """Errors that say something about the model/endpoint right now (not about our prompt)."""
+    status = getattr(err, "status_code", None)
+    if status is None:
+        # connection errors/timeouts carry no status code
+        return type(err).__name__ in ("APIConnectionError", "APITimeoutError")
+    return status == 429 or status >= 500
+
+
+class ModelRegistry:
+    """
+    Process-wide answer to "which Groq chat model should this call use".
+
+    The working model is probed once and cached for `ttl` seconds; after that it
+    keeps being served while a background task re-validates it. Concurrent
+    callers share a single probe pass. Real call failures are reported back
+    via `report_failure` (passive health check): the model is skipped for
+    `cooldown` seconds, then re-probed in the background before callers are
+    routed to it again. Model discovery (`models.list`) is cached the same way.
+    """
+
+    def __init__(self, candidates: Optional[List[str]] = None, ttl: float = 3600.0, cooldown: float = 300.0):
+        self.candidates = list(candidates if candidates is not None else CANDIDATES)
+        self.ttl = ttl
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._working: Optional[str] = None
+        self._working_ts = 0.0
+        self._unhealthy: Dict[str, float] = {}   # model -> unhealthy until (monotonic)
+        self._discovered: List[str] = []
+        self._discovered_ts = 0.0
+        self._probe: Optional[Probe] = None
+        self._revalidating = False
+        self._reprobing: set = set()
+        self._tasks: set = set()
+        self._resolving: Optional[asyncio.Future] = None
+
+    # ---- health -------------------------------------------------------------
+    def healthy(self, model: str) -> bool:
+        until = self._unhealthy.get(model)
+        return until is None or until <= time.monotonic()
+
+    def report_success(self, model: str) -> None:
+        with self._lock:
+            self._unhealthy.pop(model, None)
+
+    def report_failure(self, model: Optional[str], err: Exception) -> None:
+        """Called by LLM call sites when a real completion fails."""
+        if not model:
+            return
+        gone = is_model_gone(err)
+        if not gone and not is_transient(err):
+            return  # prompt/validation problems are not the model's health
+        with self._lock:
+            self._unhealthy[model] = time.monotonic() + (self.ttl if gone else self.cooldown)
+            if self._working == model:
+                self._working = None
+        print(f"[GROQ] Marked {model} unhealthy ({'gone' if gone else 'transient'}): {err}")
+        if not gone:
+            self._schedule_reprobe(model)
+
+    # ---- discovery ----------------------------------------------------------
+    async def discover(self, lister: Lister) -> List[str]:
+        """Ranked chat models from `lister`, cached for `ttl`; unhealthy ones go last."""
+        now = time.monotonic()
+        if not self._discovered or now - self._discovered_ts >= self.ttl:
+            try:
+                ids = await lister()
+            except Exception as e:
+                print(f"[GROQ] Model discovery failed: {e}")
+                ids = None
+            if ids is not None:
+                with self._lock:
+                    self._discovered, self._discovered_ts = rank_models(ids), now
+                if os.getenv("GROQ_VERBOSE", "0") == "1":
+                    print(f"[GROQ] Discovered models (top 10): {self._discovered[:10]}")
+        return sorted(self._discovered, key=lambda m: not self.healthy(m))
+
+    # ---- resolution ---------------------------------------------------------
+    def preference(self) -> List[str]:
+        env_model = os.getenv("GROQ_MODEL", "").strip()
+        order = ([env_model] if env_model else []) + self.candidates + self._discovered
+        return list(dict.fromkeys(order))
+
+    async def resolve(self, probe: Probe) -> str:
+        """Cached working model; probes only when there is none (one probe pass at a time)."""
+        self._probe = probe
+        with self._lock:
+            working, age = self._working, time.monotonic() - self._working_ts
+        if working and self.healthy(working):
+            if age >= self.ttl:
+                self._revalidate()
+            return working
+        if self._resolving is not None and not self._resolving.done():
+            return await asyncio.shield(self._resolving)
+        self._resolving = asyncio.ensure_future(self._probe_pass(probe))
+        return await asyncio.shield(self._resolving)
+
+    async def _probe_pass(self, probe: Probe) -> str:
+        for m in self.preference():
+            if not self.healthy(m):
+                continue
+            ok = await probe(m)
+            if ok:
+                with self._lock:
+                    self._working, self._working_ts = m, time.monotonic()
+                    self._unhealthy.pop(m, None)
+                return m
+            if ok is None:
+                continue   # not tried (circuit open): the breaker already tracks it
+            with self._lock:
+                self._unhealthy[m] = time.monotonic() + self.cooldown
+        raise LookupError(
+            "No working Groq chat model found. "
+            "Set GROQ_MODEL to a supported model shown in your Groq console."
+        )
+
+    def current(self) -> Optional[str]:
+        return self._working if self._working and self.healthy(self._working) else None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "working": self._working,
+            "working_age_sec": round(now - self._working_ts, 1) if self._working else None,
+            "unhealthy": {m: round(u - now, 1) for m, u in self._unhealthy.items() if u > now},
+            "discovered": len(self._discovered),
+        }
+
+    # ---- background re-probing ---------------------------------------------
+    def _spawn(self, coro_fn: Callable[[], Awaitable[None]]) -> None:
+        try:
+            task = asyncio.get_running_loop().create_task(coro_fn())
+        except RuntimeError:
+            return  # no loop (sync caller): the next resolve() probes instead
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def stop(self) -> None:
+        for t in list(self._tasks):
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _revalidate(self) -> None:
+        with self._lock:
+            if self._revalidating or not self._probe:
+                return
+            self._revalidating = True
+        probe, model = self._probe, self._working
+
+        async def run():
+            try:
+                ok = bool(model) and await probe(model)
+                with self._lock:
+                    if ok is None:
+                        pass
+                    elif ok:
+                        self._working_ts = time.monotonic()
+                    elif self._working == model:
+                        self._working = None
+                        self._unhealthy[model] = time.monotonic() + self.cooldown
+            finally:
+                self._revalidating = False
+        self._spawn(run)
+
+    def _schedule_reprobe(self, model: str) -> None:
+        with self._lock:
+            if model in self._reprobing:
+                return
+            self._reprobing.add(model)
+
+        async def run():
+            retry = False
+            try:
+                await asyncio.sleep(self.cooldown)
+                probe = self._probe
+                if probe is None:
+                    return
+                ok = await probe(model)
+                if ok is None:
+                    retry = True   # not tried (circuit open): no verdict, look again after another cooldown
+                elif ok:
+                    with self._lock:
+                        self._unhealthy.pop(model, None)
+                        # prefer it again if it ranks above the model we fell back to
+                        pref = self.preference()
+                        if self._working is None or (model in pref and self._working in pref
+                                                     and pref.index(model) < pref.index(self._working)):
+                            self._working, self._working_ts = model, time.monotonic()
+                else:
+                    with self._lock:
+                        self._unhealthy[model] = time.monotonic() + self.cooldown
+            finally:
+                with self._lock:
+                    self._reprobing.discard(model)
+            if retry:
+                self._schedule_reprobe(model)
+        self._spawn(run)
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(
+                    ttl=float(os.getenv("GROQ_MODEL_TTL", "3600")),
+                    cooldown=float(os.getenv("GROQ_MODEL_COOLDOWN", "300")),
+                )
+    return _registry
@@ -0,0 +1,181 @@
+# app/summarize/scheduler.py
+from __future__ import annotations
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from collections import deque
+import asyncio, os, threading, time
+
+from app.core.latency import get_latency_tracker
+
+# Lower value = served first. Anything unknown is treated as "summary".
+PRIORITIES: Dict[str, int] = {"interactive": 0, "summary": 1, "background": 2}
+
+
+class SchedulerBusy(Exception):
+    """The LLM queue for this priority is full, or the request waited too long for a slot."""
+
+    def __init__(self, priority: str, reason: str):
+        super().__init__(f"LLM scheduler busy ({priority}: {reason})")
+        self.priority = priority
+        self.reason = reason
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `per_minute` / 60 per second, holding at most a minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.ts = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.ts) * self.rate)
+        self.ts = now
+
+    def wait(self, need: float) -> float:
+        """Seconds until `need` (capped at capacity, so huge requests still fit) is available."""
+        short = min(need, self.capacity) - self.level
+        return 0.0 if short <= 0 else short / self.rate
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], max_tokens: Optional[int]) -> int:
+    """Prompt size at ~4 characters per token, plus the completion budget."""
+    chars = sum(len(str(m.get("content") or "")) for m in messages or [])
+    return chars // 4 + int(max_tokens or 256)
+
+
+class LLMScheduler:
+    """
+    Admission control for every outbound Groq request.
+
+    Two token buckets - requests/min and tokens/min (estimated from the
+    prompt, corrected with the real usage afterwards) - gate the calls.
+    Waiting requests sit in one bounded FIFO per priority class and are
+    admitted strictly by class: interactive chat, then summaries, then
+    background enrichment, so a burst of uploads cannot starve the chatbot.
+    A full queue or a wait longer than `max_wait` raises SchedulerBusy and
+    the caller falls back as it would on any Groq failure.
+    rpm/tpm <= 0 disables that bucket.
+    """
+
+    def __init__(self, rpm: float = 30, tpm: float = 6000, max_queue: int = 50, max_wait: float = 30.0):
+        self._req = _Bucket(rpm) if rpm > 0 else None
+        self._tok = _Bucket(tpm) if tpm > 0 else None
+        self.max_queue = max(1, max_queue)
+        self.max_wait = max_wait
+        self._queues: Dict[str, Deque[Tuple[asyncio.Future, int]]] = {p: deque() for p in PRIORITIES}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock = threading.Lock()
+        self.counters = {p: {"admitted": 0, "queued": 0, "rejected": 0, "timeouts": 0} for p in PRIORITIES}
+
+    # ---- buckets ------------------------------------------------------------
+    def _wait(self, tokens: int) -> float:
+        now = time.monotonic()
+        waits = [0.0]
+        for b, need in ((self._req, 1), (self._tok, tokens)):
+            if b is not None:
+                b.refill(now)
+                waits.append(b.wait(need))
+        return max(waits)
+
+    def _take(self, tokens: int) -> None:
+        if self._req is not None:
+            self._req.level -= 1
+        if self._tok is not None:
+            self._tok.level -= min(tokens, self._tok.capacity)
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Charge the difference between the estimate and the real `usage.total_tokens`."""
+        if self._tok is None or actual is None:
+            return
+        with self._lock:
+            self._tok.level = max(-self._tok.capacity, self._tok.level - (actual - estimated))
+
+    # ---- admission ----------------------------------------------------------
+    async def acquire(self, priority: str, tokens: int) -> None:
+        priority = priority if priority in PRIORITIES else "summary"
+        rank = PRIORITIES[priority]
+        t0 = time.monotonic()
+        with self._lock:
+            ahead = any(self._queues[p] for p, r in PRIORITIES.items() if r <= rank)
+            if not ahead and self._wait(tokens) == 0.0:
+                self._take(tokens)
+                self.counters[priority]["admitted"] += 1
+                get_latency_tracker().record(f"llm.queue.{priority}", 0.0)
+                return
+            q = self._queues[priority]
+            if len(q) >= self.max_queue:
+                self.counters[priority]["rejected"] += 1
+                raise SchedulerBusy(priority, "queue full")
+            entry = (asyncio.get_running_loop().create_future(), tokens)
+            q.append(entry)
+            self.counters[priority]["queued"] += 1
+        self._pump()
+        try:
+            await asyncio.wait_for(entry[0], self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                try:
+                    q.remove(entry)
+                except ValueError:
+                    pass
+                if isinstance(e, asyncio.TimeoutError):
+                    self.counters[priority]["timeouts"] += 1
+            self._pump()   # whoever was behind us may fit now
+            if isinstance(e, asyncio.TimeoutError):
+                raise SchedulerBusy(priority, f"waited {self.max_wait:.0f}s") from None
+            raise
+        self.counters[priority]["admitted"] += 1
+        get_latency_tracker().record(f"llm.queue.{priority}", (time.monotonic() - t0) * 1000.0)
+
+    def _pump(self) -> None:
+        with self._lock:
+            for p in sorted(PRIORITIES, key=PRIORITIES.get):
+                q = self._queues[p]
+                while q:
+                    fut, tokens = q[0]
+                    if fut.done():
+                        q.popleft()
+                        continue
+                    wait = self._wait(tokens)
+                    if wait > 0:
+                        # strict priority: lower classes keep waiting behind this head
+                        self._arm(wait)
+                        return
+                    q.popleft()
+                    self._take(tokens)
+                    fut.set_result(None)
+
+    def _arm(self, wait: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(wait, self._pump)
+
+    def stats(self) -> Dict[str, Any]:
+        tracker = get_latency_tracker()
+        out: Dict[str, Any] = {
+            "requests_available": None if self._req is None else round(self._req.level, 1),
+            "tokens_available": None if self._tok is None else round(self._tok.level),
+        }
+        for p in PRIORITIES:
+            p99 = tracker.percentile(f"llm.queue.{p}", 0.99)
+            out[p] = {**self.counters[p], "waiting": len(self._queues[p]),
+                      "queue_p99_ms": None if p99 is None else round(p99, 1)}
+        return out
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler(
+                    rpm=float(os.getenv("GROQ_RPM", "30")),
+                    tpm=float(os.getenv("GROQ_TPM", "6000")),
+                    max_queue=int(os.getenv("GROQ_QUEUE_MAX", "50")),
+                    max_wait=float(os.getenv("GROQ_QUEUE_MAX_WAIT_SEC", "30")),
+                )
+    return _scheduler
@@ -0,0 +1,102 @@
+# app/summarize/stream_json.py
+from __future__ import annotations
+from typing import Any, Iterable, List, Optional, Tuple
+import json
+
+Path = Tuple[str, ...]
+
+
+class StreamingJSONParser:
+    """
+    Incremental scanner for a JSON document arriving in chunks (LLM token stream).
+
+    `feed(chunk)` returns the objects that just became complete inside one
+    of the watched arrays, as (path, value) pairs - e.g. with
+    watch=[("per_test",), ("diet_plan", "meals")] every finished per_test
+    entry and meal is returned as soon as its closing brace arrives, while
+    the rest of the document is still being generated.
+
+    Tolerant of what models wrap around JSON (```json fences, a sentence
+    before or after): nothing is tracked until the first "{" or "[".
+    Each character is scanned once; only completed watched objects are
+    handed to json.loads.
+    """
+
+    def __init__(self, watch: Iterable[Path]):
+        self.watch = {tuple(w) for w in watch}
+        self.text = ""
+        self._pos = 0
+        self._root: Optional[int] = None     # offset of the document's first bracket
+        self._end: Optional[int] = None      # offset just past its matching bracket
+        self._stack: List[list] = []         # [kind "{"/"[", path, current key, start offset of a watched object]
+        self._in_str = False
+        self._esc = False
+        self._str_start = 0
+        self._last_str: Optional[str] = None
+
+    def _child_path(self) -> Path:
+        if not self._stack:
+            return ()
+        kind, path, key, _ = self._stack[-1]
+        return path + (key,) if kind == "{" else path
+
+    def feed(self, chunk: str) -> List[Tuple[Path, Any]]:
+        out: List[Tuple[Path, Any]] = []
+        if self._end is not None or not chunk:
+            return out
+        self.text += chunk
+        text, i, n = self.text, self._pos, len(self.text)
+        while i < n:
+            c = text[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                    self._last_str = text[self._str_start:i + 1]
+            elif c == '"':
+                if self._stack:   # quotes in prose around the document are not JSON strings
+                    self._in_str, self._str_start = True, i
+            elif c in "{[":
+                path = self._child_path()
+                in_array = bool(self._stack) and self._stack[-1][0] == "["
+                start = i if c == "{" and in_array and path in self.watch else None
+                if self._root is None:
+                    self._root = i
+                self._stack.append([c, path, None, start])
+            elif c in "}]" and self._stack:
+                kind, path, _, start = self._stack.pop()
+                if start is not None:
+                    try:
+                        out.append((path, json.loads(text[start:i + 1])))
+                    except ValueError:
+                        pass   # malformed element: skip it, keep streaming
+                if not self._stack:
+                    self._end = i + 1
+                    break
+            elif self._stack and self._stack[-1][0] == "{":
+                if c == ":" and self._last_str is not None:
+                    try:
+                        self._stack[-1][2] = json.loads(self._last_str)
+                    except ValueError:
+                        self._stack[-1][2] = None
+                elif c == ",":
+                    self._stack[-1][2] = None
+            i += 1
+        self._pos = i
+        return out
+
+    @property
+    def complete(self) -> bool:
+        return self._end is not None
+
+    def document(self) -> Optional[Any]:
+        """The whole document once it is complete and valid, else None."""
+        if self._root is None or self._end is None:
+            return None
+        try:
+            return json.loads(self.text[self._root:self._end])
+        except ValueError:
+            return None
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+import app.api.routes as routes
+from app.core.latency import LatencyTracker
+from app.ingest.cache import ParseCache
+
+ROWS = [
+    {"test": "Hemoglobin", "value": 6.5, "unit": "g/dL"},          # in the KB, flagged low
+    {"test": "Mysterium Factor", "value": 3.0, "unit": "ng/mL"},   # unknown: needs an LLM range
+]
+
+
+class _Pool:
+    async def run(self, fn, raw_bytes, deadline):
+        return [dict(r) for r in ROWS], 0.95, [], ""
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    seen = {"range": [], "summary": 0}
+
+    async def llm_range(name, age, sex):
+        seen["range"].append(name)
+        return None
+
+    async def summarize(ctx, results, deadline=None):
+        seen["summary"] += 1
+        return {"summary": "llm", "per_test": [], "diet_plan": {}, "_debug": {"groq_used": True}}
+
+    monkeypatch.setattr(routes, "get_parse_pool", lambda: _Pool())
+    monkeypatch.setattr(routes, "get_parse_cache", lambda: ParseCache(None))
+    monkeypatch.setattr(routes, "get_entry_with_rag", lambda *a, **k: None)
+    monkeypatch.setattr(routes, "_get_groq_key", lambda: "gsk_fake")
+    monkeypatch.setattr(routes, "_llm_range", llm_range)
+    monkeypatch.setattr(routes, "summarize_results_structured", summarize)
+    monkeypatch.setattr(routes.store, "add", lambda doc: None)
+    monkeypatch.setattr(routes, "get_latency_tracker", lambda: LatencyTracker(p99_target_ms=60000))
+    return seen
+
+def _run(mode):
+    return asyncio.run(routes.run_analysis(b"%PDF", "r.pdf", "CBC", 40, "male", mode=mode))
+
+def test_fast_mode_never_calls_the_llm(calls):
+    report = _run("fast")
+    assert calls == {"range": [], "summary": 0}
+    assert report["meta"]["mode"] == "fast" and report["meta"]["groq_used"] is False
+    assert any(r["test"].lower().startswith("hemoglobin") for r in report["results"])
+
+def test_llm_mode_asks_for_ranges_and_summary(calls):
+    report = _run("llm")
+    assert calls["range"] and calls["summary"] == 1
+    assert report["meta"]["mode"] == "llm"
+
+def test_auto_mode_falls_back_to_kb_when_over_budget(calls, monkeypatch):
+    monkeypatch.setattr(routes, "get_latency_tracker", lambda: LatencyTracker(p99_target_ms=0))
+    report = _run("auto")
+    assert calls == {"range": [], "summary": 0}
+    meta = report["meta"]
+    assert meta["mode"] == "auto" and meta["groq_used"] is False
+    assert "llm_summary" in meta["skipped"] and any(s.startswith("llm_range:") for s in meta["skipped"])
+
+def test_invalid_mode_is_rejected(calls):
+    with pytest.raises(ValueError):
+        _run("turbo")
+    assert calls == {"range": [], "summary": 0}
+
+def test_endpoint_rejects_invalid_mode(calls):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    api = FastAPI()
+    api.include_router(routes.router)
+    r = TestClient(api).post("/api/analyze?mode=turbo", files={"file": ("r.pdf", b"%PDF", "application/pdf")})
+    assert r.status_code == 422
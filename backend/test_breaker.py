@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from app.summarize.breaker import ENDPOINT, CircuitBreaker, CircuitOpen, backoff_delay
+
+
+class _Resp:
+    def __init__(self, headers):
+        self.headers = headers
+
+class RateLimited(Exception):
+    status_code = 429
+    def __init__(self, headers=None):
+        super().__init__("rate limited")
+        self.response = _Resp(headers or {})
+
+class APIConnectionError(Exception):
+    pass
+
+
+def test_opens_short_circuits_and_recovers():
+    b = CircuitBreaker(failures=2, window=60, open_sec=0.05)
+    keys = (ENDPOINT, "m1")
+    for _ in range(2):
+        b.check(*keys)
+        b.record(keys, RateLimited())
+    with pytest.raises(CircuitOpen):
+        b.check(*keys)
+    b.check(ENDPOINT, "m2")                  # other models are unaffected by m1's 429s
+
+    time.sleep(0.06)
+    b.check(*keys)                           # half-open: one trial goes through...
+    with pytest.raises(CircuitOpen):
+        b.check(*keys)                       # ...and only one
+    b.record(keys, RateLimited())            # trial failed -> open again
+    with pytest.raises(CircuitOpen):
+        b.check(*keys)
+    time.sleep(0.06)
+    b.check(*keys)
+    b.record(keys)                           # trial succeeded -> closed
+    b.check(*keys); b.check(*keys)
+    assert b.stats()["circuits"]["m1"]["state"] == "closed"
+
+def test_connection_errors_open_the_endpoint_circuit():
+    b = CircuitBreaker(failures=1, window=60, open_sec=30)
+    b.check(ENDPOINT, "m1")
+    b.record((ENDPOINT, "m1"), APIConnectionError("down"))
+    with pytest.raises(CircuitOpen) as exc:
+        b.check(ENDPOINT, "m2")
+    assert exc.value.key == ENDPOINT
+
+def test_backoff_respects_retry_after():
+    assert backoff_delay(RateLimited({"retry-after": "2"}), 0) == 2.0
+    assert backoff_delay(RateLimited({"retry-after-ms": "150"}), 3) == 0.15
+    assert backoff_delay(RateLimited({"retry-after": "60"}), 0, cap=8) is None   # fail over instead of waiting
+    assert 0.25 <= backoff_delay(RateLimited(), 0) <= 0.5
+    assert 2.0 <= backoff_delay(RateLimited(), 5, cap=4) <= 4.0
+    assert backoff_delay(ValueError("bad prompt"), 0) is None
+
+def test_scheduler_busy_after_check_frees_half_open_trial(monkeypatch):
+    import asyncio
+    from app.summarize import client as client_mod
+    from app.summarize.scheduler import SchedulerBusy
+
+    class _BusyScheduler:
+        async def acquire(self, priority, tokens):
+            raise SchedulerBusy(priority, "waited 30s")
+
+    b = CircuitBreaker(failures=1, window=60, open_sec=0.01)
+    keys = (ENDPOINT, "m1")
+    b.check(*keys)
+    b.record(keys, RateLimited())
+    time.sleep(0.02)                          # open_sec over: next check claims the trial slot
+    monkeypatch.setattr(client_mod, "get_breaker", lambda: b)
+    monkeypatch.setattr(client_mod, "get_scheduler", lambda: _BusyScheduler())
+    llm = client_mod.LLMClient()
+    monkeypatch.setattr(llm, "get", lambda: object())
+    with pytest.raises(SchedulerBusy):
+        asyncio.run(llm.achat("m1", [{"role": "user", "content": "hi"}]))
+    b.check(*keys)                            # trial slot was given back, not stuck half-open
@@ -0,0 +1,21 @@
+import pickle, time
+
+from app.core.deadline import Deadline
+
+
+def test_budget_skip_and_pickle(monkeypatch):
+    monkeypatch.delenv("ANALYZE_DEADLINE_MS", raising=False)
+    assert Deadline.for_request(None).remaining() is None and Deadline().allows(1e9)
+    monkeypatch.setenv("ANALYZE_DEADLINE_MS", "5000")
+    assert 4.0 < Deadline.for_request(None).remaining() <= 5.0
+    assert Deadline.for_request("200").remaining() <= 0.2     # header wins over config
+
+    d = Deadline.from_ms(50)
+    assert d.allows(0.01) and not d.allows(1.0)
+    copy = pickle.loads(pickle.dumps(d))                        # what a parse-pool worker sees
+    assert 0 < copy.remaining() <= 0.05
+    time.sleep(0.06)
+    assert copy.expired()
+    copy.skip("ocr_page_2"); copy.skip("ocr_page_2")
+    d.merge(copy.skipped)
+    assert d.meta() == {"deadline_left_ms": 0.0, "skipped": ["ocr_page_2"]}
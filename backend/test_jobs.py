@@ -0,0 +1,57 @@
+import asyncio
+import json
+import os
+
+from app.core.jobs import JobManager
+from app.ingest.pool import ParsePoolSaturated
+
+
+def test_saturated_job_does_not_hold_the_worker(tmp_path):
+    calls = []
+
+    async def runner(pdf_bytes, job, progress):
+        calls.append(job.filename)
+        if job.filename == "busy.pdf" and calls.count("busy.pdf") == 1:
+            raise ParsePoolSaturated(1, 1, retry_after=5)
+        return {"id": f"report-{job.filename}"}
+
+    async def scenario():
+        jobs = JobManager(runner, str(tmp_path), workers=1)
+        busy = jobs.submit(b"%PDF", "busy.pdf", None, None, None)
+        ok = jobs.submit(b"%PDF", "ok.pdf", None, None, None)
+        await asyncio.sleep(0.1)
+        try:
+            # the single worker moved on right away instead of sleeping 5 s
+            assert jobs.get(ok.id).status == "done"
+            assert jobs.get(busy.id).status == "queued"
+        finally:
+            await jobs.stop()
+        return ok
+
+    ok = asyncio.run(scenario())
+    assert not os.path.exists(tmp_path / f"{ok.id}.pdf")
+
+def test_finished_jobs_are_pruned(tmp_path):
+    async def runner(pdf_bytes, job, progress):
+        if job.filename == "bad.pdf":
+            raise ValueError("unreadable")
+        return {"id": "r"}
+
+    # a job finished long ago, left on disk by an earlier run
+    with open(tmp_path / "old.json", "w") as f:
+        json.dump({"id": "old", "filename": "x.pdf", "status": "done", "updated_at": "2000-01-01T00:00:00Z"}, f)
+    (tmp_path / "old.pdf").write_bytes(b"%PDF")
+
+    async def scenario():
+        jobs = JobManager(runner, str(tmp_path), workers=1, max_finished=2)
+        jobs.start()
+        assert jobs.get("old") is None and not os.listdir(tmp_path)
+        ids = [jobs.submit(b"%PDF", name, None, None, None).id for name in ("bad.pdf", "a.pdf", "b.pdf")]
+        await asyncio.sleep(0.1)
+        await jobs.stop()
+        return jobs, ids
+
+    jobs, ids = asyncio.run(scenario())
+    assert jobs.get(ids[0]) is None                     # oldest finished job dropped (max_finished=2)
+    assert all(jobs.get(j).status == "done" for j in ids[1:])
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{j}.json" for j in ids[1:])   # no PDFs left, failed or not
@@ -0,0 +1,53 @@
+import json
+from app.kb.compiled import build_compiled_kb, get_kb
+
+
+def test_multi_unit_tables_pick_report_unit():
+    kb = get_kb()
+    e = kb.entry_for_unit("hemoglobin", "mmol/L")
+    assert e["unit_matched"] and e["unit"] == "mmol/L"
+    assert e["ranges"][0]["low"] == 8.4
+
+    # spacing/SI variants resolve to the same table
+    assert kb.entry_for_unit("white blood cell (wbc) count", "10^9/L")["unit_matched"]
+
+    # unknown unit: KB default table, caller converts
+    e = kb.entry_for_unit("hemoglobin", "g/L")
+    assert not e["unit_matched"] and e["unit"] == "g/dL"
+
+    # single-unit entries keep working
+    e = kb.entry_for_unit("glucose (fasting)", "mg/dl")
+    assert e["unit_matched"] and e["ranges"][0]["high"] == 99
+    assert kb.entry_for_unit("not a test", "mg/dL") is None
+
+def test_compiled_cache_invalidation(tmp_path, monkeypatch):
+    src = tmp_path / "kb.json"
+    src.write_text(json.dumps([{"test_name": "Foo (F)", "canonical_unit": "mg/dL",
+                                "ranges": [{"low": 1, "high": 2}]}]))
+    monkeypatch.setenv("KB_CACHE_PATH", str(tmp_path / "kb.pkl"))
+    first = build_compiled_kb(str(src))
+    assert (tmp_path / "kb.pkl").exists()
+    assert build_compiled_kb(str(src)).version == first.version
+    assert first.canonical_key("foo") == "foo (f)"
+
+    src.write_text(json.dumps([{"test_name": "Bar", "canonical_unit": "mg/dL", "ranges": []}]))
+    second = build_compiled_kb(str(src))
+    assert second.version != first.version and "bar" in second and "foo" not in second
+
+def test_range_index_precedence():
+    from app.core.resolver import RangeIndex
+    ranges = [
+        {"applies": {"sex": "any"}, "low": 1, "high": 10},
+        {"applies": {"sex": "any", "age_min": 12, "age_max": 17}, "low": 2, "high": 9},
+        {"applies": {"sex": "male", "age_min": 18}, "low": 3, "high": 8},
+        {"applies": {"sex": "female", "age_min": 18, "age_max": 50}, "low": 4, "high": 7},
+        {"applies": {"sex": "female", "age_min": 18, "age_max": 50}, "low": 5, "high": 6},
+    ]
+    idx = RangeIndex(ranges)
+    assert idx.lookup(40, "Male")["low"] == 3        # exact sex beats "any"
+    assert idx.lookup(15, "male")["low"] == 2        # narrowest span among matches
+    assert idx.lookup(17, "female")["low"] == 2      # closed upper bound
+    assert idx.lookup(50, "f")["low"] == 4           # ties keep declaration order
+    assert idx.lookup(51, "female")["low"] == 1
+    assert idx.lookup(40, None)["low"] == 1          # unknown sex only sees "any"
+    assert RangeIndex([]).lookup(40, "male") is None
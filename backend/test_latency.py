@@ -0,0 +1,19 @@
+from app.core.latency import LatencyTracker, analyze_mode
+
+
+def test_mode_resolution(monkeypatch):
+    monkeypatch.delenv("ANALYZE_MODE", raising=False)
+    assert analyze_mode(None) == "llm"
+    monkeypatch.setenv("ANALYZE_MODE", "fast")
+    assert analyze_mode(None) == "fast"
+    assert analyze_mode("Auto") == "auto"
+    assert analyze_mode("bogus") == "fast"
+
+def test_percentiles_and_target():
+    t = LatencyTracker(window=100, p99_target_ms=50)
+    assert t.percentile("analyze.fast", 0.99) is None
+    for ms in range(1, 201):            # only the last 100 samples (101..200) are kept
+        t.record("analyze.fast", ms)
+    assert t.percentile("analyze.fast", 0.5) in (150, 151)
+    assert t.percentile("analyze.fast", 0.99) == 199
+    assert t.stats()["analyze.fast"]["within_target"] is False
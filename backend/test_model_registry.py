@@ -0,0 +1,50 @@
+import asyncio
+from app.summarize.models import ModelRegistry
+
+
+class _Unavailable(Exception):
+    status_code = 503
+
+def test_resolves_once_and_fails_over():
+    calls = []
+    async def probe(m):
+        calls.append(m)
+        await asyncio.sleep(0)
+        return m in ("b", "c")
+
+    async def scenario():
+        reg = ModelRegistry(candidates=["a", "b", "c"], ttl=3600, cooldown=3600)
+        # concurrent callers share one probe pass
+        assert await asyncio.gather(reg.resolve(probe), reg.resolve(probe)) == ["b", "b"]
+        assert await reg.resolve(probe) == "b"
+        assert calls == ["a", "b"]
+
+        reg.report_failure("b", ValueError("bad json"))   # not a model problem
+        assert reg.current() == "b"
+
+        reg.report_failure("b", _Unavailable("503"))
+        assert reg.current() is None
+        assert await reg.resolve(probe) == "c"        # "a" is still cooling down, "b" unhealthy
+        assert calls == ["a", "b", "c"]
+        await reg.stop()
+
+    asyncio.run(scenario())
+
+def test_reprobe_with_open_circuit_is_not_a_failure():
+    answers = {"a": [None, True]}   # first re-probe not tried (circuit open), second works
+    calls = []
+    async def probe(m):
+        calls.append(m)
+        return answers[m].pop(0) if answers.get(m) else m == "b"
+
+    async def scenario():
+        reg = ModelRegistry(candidates=["a", "b"], ttl=3600, cooldown=0.05)
+        reg._probe = probe
+        reg.report_failure("a", _Unavailable("503"))
+        await asyncio.sleep(0.08)                     # first re-probe: None
+        assert calls == ["a"] and "a" not in reg.stats()["unhealthy"]
+        await asyncio.sleep(0.08)                     # rescheduled, now healthy again
+        assert calls == ["a", "a"] and reg.current() == "a"
+        await reg.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,59 @@
+from app.ingest.document import PdfDocument
+from app.ocr import extract
+from app.ocr import pool as ocr_pool
+
+
+class _MixedDoc(PdfDocument):
+    """Cover page with text, a bare scan, a searchable scan."""
+    LAYOUT = [
+        {"chars": 400, "image_ratio": 0.05, "chars_on_images": 0},
+        {"chars": 12, "image_ratio": 0.9, "chars_on_images": 0},
+        {"chars": 900, "image_ratio": 0.9, "chars_on_images": 850},
+    ]
+
+    def __init__(self):
+        super().__init__(b"")
+
+    @property
+    def page_count(self):
+        return 3
+
+    def page_text(self, i):
+        return f"native {i}"
+
+    def page_layout(self, i):
+        return self.LAYOUT[i]
+
+    def page_image(self, i, resolution=300):
+        return i
+
+
+def test_only_pages_without_text_layer_are_ocrd(monkeypatch):
+    seen = []
+    monkeypatch.setattr(extract, "ocr_available", lambda: True)
+    monkeypatch.setattr(extract, "OCR_MODE", "full")
+    monkeypatch.setattr(extract, "ocr_image", lambda im: seen.append(im) or f"ocr {im}")
+    monkeypatch.setattr(ocr_pool, "get_ocr_pool", lambda: ocr_pool.OcrPool(workers=0))
+    text = extract.extract_text_from_pdf(_MixedDoc())
+    assert seen == [1]
+    assert text == "native 0\nocr 1\nnative 2"
+
+def test_needs_ocr_rule():
+    assert extract.needs_ocr({"chars": 0, "image_ratio": 0.0, "chars_on_images": 0})
+    assert extract.needs_ocr({"chars": 120, "image_ratio": 0.6, "chars_on_images": 3})
+    assert not extract.needs_ocr({"chars": 120, "image_ratio": 0.1, "chars_on_images": 0})
+
+def test_missing_or_failed_ocr_is_marked_skipped(monkeypatch):
+    from app.core.deadline import Deadline
+    monkeypatch.setattr(extract, "OCR_MODE", "full")
+    monkeypatch.setattr(extract, "ocr_available", lambda: False)
+    deadline = Deadline()
+    assert extract.extract_text_from_pdf(_MixedDoc(), deadline) == "native 0\nnative 1\nnative 2"
+    assert deadline.skipped == ["ocr"]             # keeps this parse out of the parse cache
+
+    monkeypatch.setattr(extract, "ocr_available", lambda: True)
+    monkeypatch.setattr(extract, "ocr_image", lambda im: None)   # engine gave nothing back
+    monkeypatch.setattr(ocr_pool, "get_ocr_pool", lambda: ocr_pool.OcrPool(workers=0))
+    deadline = Deadline()
+    extract.extract_text_from_pdf(_MixedDoc(), deadline)
+    assert deadline.skipped == ["ocr"]
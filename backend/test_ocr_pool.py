@@ -0,0 +1,55 @@
+import hashlib
+import os
+import time
+
+from app.core.deadline import Deadline
+from app.ingest.document import PdfDocument
+from app.ocr import extract
+from app.ocr import pool as ocr_pool
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), '../test_reports/SAMPLE_REPORT.pdf')
+
+
+def _fake_ocr(im):
+    return hashlib.md5(im.tobytes()).hexdigest()
+
+def _slow_ocr(im):
+    time.sleep(2)
+    return "late"
+
+
+def test_pages_come_back_in_order(monkeypatch):
+    monkeypatch.setattr(extract, "ocr_image", _fake_ocr)   # inherited by the forked workers
+    with open(SAMPLE_PDF, 'rb') as f:
+        pdf_bytes = f.read()
+    p = ocr_pool.OcrPool(workers=2, page_timeout=30, resolution=20)
+    try:
+        out = p.ocr_pages(pdf_bytes, [2, 0, 1])
+    finally:
+        p.shutdown()
+    with PdfDocument(pdf_bytes) as doc:
+        assert out == [extract.ocr_page(doc, i, 20) for i in (2, 0, 1)]
+    assert len(set(out)) == 3
+    assert p.stats()["pages"] == 3
+
+def test_slow_pages_are_skipped(monkeypatch):
+    monkeypatch.setattr(extract, "ocr_image", _slow_ocr)
+    with open(SAMPLE_PDF, 'rb') as f:
+        pdf_bytes = f.read()
+    p = ocr_pool.OcrPool(workers=1, page_timeout=0.2, resolution=20)
+    deadline = Deadline()
+    try:
+        out = p.ocr_pages(pdf_bytes, [0, 1], deadline)
+    finally:
+        p.shutdown()
+    assert out == [None, None]
+    assert deadline.skipped == ["ocr_page_1", "ocr_page_2"]
+
+def test_default_size_splits_cores_between_parse_workers(monkeypatch):
+    monkeypatch.delenv("OCR_POOL_WORKERS", raising=False)
+    monkeypatch.setattr(ocr_pool.os, "cpu_count", lambda: 8)
+    for parse_workers, expected in (("2", 4), ("4", 2), ("8", 0)):
+        monkeypatch.setenv("PARSE_POOL_WORKERS", parse_workers)
+        monkeypatch.setattr(ocr_pool, "_ocr_pool", None)
+        assert ocr_pool.get_ocr_pool().workers == expected
+    monkeypatch.setattr(ocr_pool, "_ocr_pool", None)
@@ -0,0 +1,32 @@
+import pytest
+
+from app.ocr import regions
+
+
+def test_resolution_follows_glyph_height():
+    assert regions.ocr_resolution(None) == regions.ROI_MAX_DPI
+    small_text = regions.ocr_resolution(4.0, detect_dpi=72)     # 10 pt body text at 72 dpi
+    big_text = regions.ocr_resolution(14.0, detect_dpi=72)      # headings
+    assert regions.ROI_MIN_DPI <= big_text < small_text <= regions.ROI_MAX_DPI
+
+def test_boxes_merge_into_reading_order_bands():
+    boxes = [(300, 12, 400, 20), (10, 10, 100, 20), (10, 60, 200, 70)]
+    assert regions._bands(boxes, gap=3) == [(10, 10, 400, 20), (10, 60, 200, 70)]
+
+def test_text_lines_found_and_logo_dropped():
+    pytest.importorskip("cv2")
+    pytest.importorskip("numpy")
+    from PIL import Image, ImageDraw
+
+    page = Image.new("RGB", (600, 800), "white")
+    draw = ImageDraw.Draw(page)
+    draw.rectangle((20, 20, 120, 120), fill="black")              # logo
+    for row in range(5):                                           # five "lines" of 6px glyphs
+        for col in range(30):
+            x, y = 150 + col * 12, 300 + row * 30
+            draw.rectangle((x, y, x + 6, y + 6), fill="black")
+    boxes, glyph_px = regions.find_regions(page)
+    assert glyph_px == pytest.approx(7, abs=1)
+    assert len(boxes) == 5
+    assert all(top >= 290 for _, top, _, _ in boxes)              # the logo is not a text region
+    assert regions.coverage(boxes, page.size) < 0.2
@@ -0,0 +1,25 @@
+from app.ingest.cache import ParseCache, parse_key
+
+
+def test_roundtrip_and_key(tmp_path):
+    cache = ParseCache(str(tmp_path / "parse.db"))
+    key = parse_key(b"%PDF-1.4 same bytes")
+    assert key == parse_key(b"%PDF-1.4 same bytes") != parse_key(b"%PDF-1.4 other bytes")
+    assert cache.get(key) is None
+    rows = [{"test": "Hemoglobin", "value": 11.2, "unit": "g/dL"}]
+    cache.put(key, rows, 0.97, "Hemoglobin 11.2 g/dL")
+    assert cache.get(key) == {"rows": rows, "ocr_confidence": 0.97, "text": "Hemoglobin 11.2 g/dL"}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_lru_eviction_by_rows_and_size(tmp_path):
+    cache = ParseCache(str(tmp_path / "parse.db"), max_rows=2)
+    for k in ("a", "b"):
+        cache.put(k, [], 0.9)
+    cache.get("a")                    # b is now least recently used
+    cache.put("c", [], 0.9)
+    assert cache.get("b") is None and cache.get("a") and cache.get("c")
+
+    small = ParseCache(str(tmp_path / "small.db"), max_bytes=200)
+    small.put("x", [], 0.9, "x" * 150)
+    small.put("y", [], 0.9, "y" * 150)
+    assert small.get("x") is None and small.get("y") is not None
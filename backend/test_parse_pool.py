@@ -0,0 +1,68 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+
+import app.api.routes as routes
+from app.ingest.cache import ParseCache
+from app.ingest.pool import ParsePool, ParsePoolSaturated, ParsePoolTimeout
+
+
+def _crash():
+    os._exit(1)
+
+def _pid():
+    return os.getpid()
+
+def test_full_pool_answers_503_with_retry_after(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    pool = ParsePool(workers=1, max_in_flight=1, retry_after=7)
+    busy = threading.Thread(target=lambda: asyncio.run(pool.run(time.sleep, 1.0)))
+    busy.start()
+    while pool.stats()["in_flight"] < 1:
+        time.sleep(0.01)
+    try:
+        monkeypatch.setattr(routes, "get_parse_pool", lambda: pool)
+        monkeypatch.setattr(routes, "get_parse_cache", lambda: ParseCache(None))
+        api = FastAPI()
+        api.include_router(routes.router)
+        r = TestClient(api).post("/api/analyze", files={"file": ("r.pdf", b"%PDF", "application/pdf")})
+        assert r.status_code == 503 and r.headers["Retry-After"] == "7"
+        assert pool.stats()["rejected"] == 1
+    finally:
+        busy.join()
+        pool.shutdown()
+    assert pool.stats()["in_flight"] == 0 and pool.stats()["completed"] == 1
+
+def test_timeout_keeps_the_slot_until_the_worker_is_done():
+    async def main():
+        pool = ParsePool(workers=0, max_in_flight=1, timeout=0.05)
+        with pytest.raises(ParsePoolTimeout):
+            await pool.run(time.sleep, 0.3)
+        # the sleep is still running: the pool is still full
+        with pytest.raises(ParsePoolSaturated):
+            await pool.run(time.sleep, 0)
+        await asyncio.sleep(0.4)
+        assert pool.stats()["in_flight"] == 0 and pool.stats()["timeouts"] == 1
+        await pool.run(time.sleep, 0)
+
+    asyncio.run(main())
+
+def test_broken_worker_is_replaced():
+    async def main():
+        pool = ParsePool(workers=1, max_in_flight=2)
+        try:
+            first = await pool.run(_pid)
+            with pytest.raises(BrokenProcessPool):
+                await pool.run(_crash)
+            assert await pool.run(_pid) != first       # a fresh worker process
+            assert pool.stats()["failed"] == 1 and pool.stats()["in_flight"] == 0
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
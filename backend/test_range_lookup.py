@@ -0,0 +1,49 @@
+import asyncio
+
+from app.kb.range_lookup import RangeLookup
+
+
+def test_single_flight_negative_cache_and_write_through():
+    calls, saved, priorities = [], [], []
+
+    async def fetch(name, age, sex, priority):
+        calls.append((name, age, sex))
+        priorities.append(priority)
+        await asyncio.sleep(0.01)
+        if name == "mystery marker":
+            return {"unit": None, "ranges": [{"low": None, "high": None}]}   # unusable answer
+        return {"unit": "ng/mL", "ranges": [{"low": 1.0, "high": 5.0}], "advice": {}, "source": "groq_llm"}
+
+    async def main():
+        lookup = RangeLookup(fetch=fetch, persist=lambda name, entry: saved.append(name))
+        first = await asyncio.gather(*[lookup.lookup(" Procalcitonin ", 40, "Male") for _ in range(5)])
+        assert all(e and e["ranges"][0]["high"] == 5.0 for e in first)
+        assert len(calls) == 1 and lookup.stats()["coalesced"] == 4
+
+        # same age band and sex spelling variants hit the cache; another sex is its own key
+        assert await lookup.lookup("procalcitonin", 55, "m") is not None
+        await lookup.lookup("procalcitonin", 40, "female", priority="summary")
+        assert len(calls) == 2 and priorities == ["background", "summary"]
+
+        assert await lookup.lookup("mystery marker", 40, "male") is None
+        assert await lookup.lookup("Mystery Marker", 41, "male") is None
+        assert len(calls) == 3 and lookup.stats()["negative_hits"] == 1
+
+        await lookup.flush()
+        assert saved == ["procalcitonin", "procalcitonin"]
+
+    asyncio.run(main())
+
+def test_request_path_lookups_use_summary_priority(monkeypatch):
+    import app.api.routes as routes
+    seen = []
+
+    class Lookup:
+        async def lookup(self, name, age, sex, priority="background"):
+            seen.append(priority)
+            return None
+
+    monkeypatch.setattr(routes, "_get_groq_key", lambda: "gsk_fake")
+    monkeypatch.setattr(routes, "get_range_lookup", lambda: Lookup())
+    asyncio.run(routes._llm_range("procalcitonin", 40, "male"))
+    assert seen == ["summary"]
@@ -0,0 +1,104 @@
+import json, os
+from datetime import datetime
+from app.storage.reports_store import ReportsStore
+
+
+def _doc(rid, name="CBC", age=40, sex="male"):
+    return {"id": rid, "context": {"report_id": rid, "report_name": name, "age": age, "sex": sex},
+            "results": [], "status": "analyzed"}
+
+def test_add_get_delete_and_order(tmp_path):
+    store = ReportsStore(str(tmp_path / "reports.db"))
+    for i in range(5):
+        store.add(_doc(f"r{i}"))
+    assert store.count() == 5
+    assert store.get("r3")["context"]["report_name"] == "CBC"
+
+    total, items = store.list_paginated(1, 2)
+    assert total == 5
+    assert [it["id"] for it in items] == ["r4", "r3"]
+    _, items = store.list_paginated(3, 2)
+    assert [it["id"] for it in items] == ["r0"]
+
+    # re-adding an id moves it to the newest position
+    store.add(_doc("r1"))
+    assert [it["id"] for it in store.list_paginated(1, 2)[1]] == ["r1", "r4"]
+
+    assert store.delete("r2") is True
+    assert store.delete("r2") is False
+    assert store.get("r2") is None
+    assert store.count() == 4
+
+def test_migrates_legacy_json_once(tmp_path):
+    legacy = tmp_path / "reports.json"
+    legacy.write_text(json.dumps({"store": {"a": _doc("a"), "b": _doc("b")}, "order": ["a", "b"]}))
+    db = str(tmp_path / "reports.db")
+    store = ReportsStore(db, legacy_json_path=str(legacy))
+    assert [it["id"] for it in store.list_paginated(1, 10)[1]] == ["b", "a"]
+
+    store.delete("a")
+    # a second start must not re-import deleted reports
+    store = ReportsStore(db, legacy_json_path=str(legacy))
+    assert store.count() == 1
+
+def test_migration_keeps_each_record_time(tmp_path):
+    legacy = tmp_path / "reports.json"
+    a = {**_doc("a"), "created_at": "2023-01-02T03:04:05Z"}
+    b = _doc("b")
+    b["context"]["date"] = "2023-06-01"
+    legacy.write_text(json.dumps({"store": {"a": a, "b": b, "c": _doc("c")}, "order": ["a", "b", "c"]}))
+    store = ReportsStore(str(tmp_path / "reports.db"), legacy_json_path=str(legacy))
+    created = dict(store._conn().execute("SELECT id, created_at FROM reports").fetchall())
+    assert created["a"] == "2023-01-02T03:04:05Z"
+    assert created["b"] == "2023-06-01T00:00:00Z"
+    # no time of its own: falls back to the file's mtime
+    assert created["c"] == datetime.utcfromtimestamp(os.path.getmtime(legacy)).isoformat() + "Z"
+
+def test_keyset_summaries(tmp_path):
+    store = ReportsStore(str(tmp_path / "reports.db"))
+    for i in range(5):
+        doc = _doc(f"r{i}", name=f"Report {i}")
+        doc["filename"] = f"r{i}.pdf"
+        store.add(doc)
+
+    seen, cursor = [], None
+    while True:
+        items, cursor = store.list_summaries(cursor=cursor, limit=2)
+        seen += [it["id"] for it in items]
+        if not cursor:
+            break
+    assert seen == ["r4", "r3", "r2", "r1", "r0"]
+    assert set(items[0]) == {"id", "report_name", "age", "sex", "filename", "status", "created_at"}
+    assert items[0]["filename"] == "r0.pdf" and items[0]["age"] == 40
+
+    # a cursor stays valid when newer reports arrive in between
+    first, cursor = store.list_summaries(limit=2)
+    store.add(_doc("r5"))
+    items, _ = store.list_summaries(cursor=cursor, limit=2)
+    assert [it["id"] for it in items] == ["r2", "r1"]
+
+def test_search_filters(tmp_path):
+    from app.storage.reports_store import ReportQuery
+    store = ReportsStore(str(tmp_path / "reports.db"))
+    a = _doc("a", name="Annual CBC", age=30, sex="Female")
+    a["results"] = [{"test": "Hemoglobin", "status": "low"}]
+    b = _doc("b", name="Vitamin panel", age=60, sex="male")
+    b["results"] = [{"test": "Vitamin D (25-oh)", "status": "low"}, {"test": "Hemoglobin", "status": "normal"}]
+    store.add(a); store.add(b); store.add(_doc("c", name="Lipid profile", age=45))
+
+    def ids(**kw):
+        return [it["id"] for it in store.list_summaries(limit=10, query=ReportQuery(**kw))[0]]
+
+    assert ids(q="cbc") == ["a"]
+    assert ids(q="hemo") == ["b", "a"]          # prefix match over test names
+    assert ids(q="vitamin pan") == ["b"]        # every token must match
+    assert ids(sex="female") == ["a"]
+    assert ids(age_min=40, age_max=50) == ["c"]
+    assert ids(flagged_test="hemoglobin") == ["a"]
+    assert ids(flagged_test="vitamin d") == ["b"]
+    assert store.count(ReportQuery(sex="MALE")) == 2
+
+    store.delete("a")
+    assert ids(q="hemo") == ["b"]
+    store.add(b)                                 # re-adding keeps one index entry set
+    assert ids(flagged_test="vitamin") == ["b"]
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.summarize.scheduler import LLMScheduler, SchedulerBusy, estimate_tokens
+
+
+def test_priority_order_and_bounded_queue():
+    async def main():
+        s = LLMScheduler(rpm=600, tpm=0, max_queue=2, max_wait=5)   # one request per 0.1s once drained
+        s._req.level = 0
+        order = []
+
+        async def call(p):
+            await s.acquire(p, 10)
+            order.append(p)
+
+        tasks = [asyncio.ensure_future(call(p)) for p in ("background", "background", "summary", "interactive")]
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerBusy):
+            await s.acquire("background", 10)          # background queue already holds two
+        await asyncio.gather(*tasks)
+        assert order == ["interactive", "summary", "background", "background"]
+        assert s.stats()["background"]["rejected"] == 1
+
+    asyncio.run(main())
+
+def test_token_budget_and_wait_limit():
+    async def main():
+        s = LLMScheduler(rpm=0, tpm=600, max_wait=0.05)
+        assert estimate_tokens([{"content": "x" * 400}], 200) == 300
+        await s.acquire("summary", 300)
+        await s.acquire("summary", 300)                # burst of one minute's budget
+        with pytest.raises(SchedulerBusy):
+            await s.acquire("summary", 300)            # needs ~30s of refill
+        s.settle(estimated=300, actual=100)            # real usage was lower: 200 refunded
+        await s.acquire("summary", 200)
+
+    asyncio.run(main())
+
+def test_stream_settles_tokens_from_final_usage(monkeypatch):
+    from types import SimpleNamespace as NS
+    from app.summarize import client as client_mod
+    from app.summarize.breaker import CircuitBreaker
+
+    sent = {}
+
+    class _Stream:
+        def __init__(self):
+            delta = lambda text: NS(choices=[NS(delta=NS(content=text))], usage=None, x_groq=None)
+            self.chunks = [delta('{"a"'), delta(": 1}"),
+                           NS(choices=[], usage=NS(total_tokens=42), x_groq=NS(usage=NS(total_tokens=42)))]
+        async def __aenter__(self):
+            return self
+        async def __aexit__(self, *exc):
+            return False
+        def __aiter__(self):
+            return self._gen()
+        async def _gen(self):
+            for c in self.chunks:
+                yield c
+
+    async def create(**kwargs):
+        sent.update(kwargs)
+        return _Stream()
+
+    sched = LLMScheduler(rpm=600, tpm=10000, max_queue=2, max_wait=5)
+    monkeypatch.setattr(client_mod, "get_scheduler", lambda: sched)
+    monkeypatch.setattr(client_mod, "get_breaker", lambda: CircuitBreaker())
+    llm = client_mod.LLMClient()
+    monkeypatch.setattr(llm, "get", lambda: NS(chat=NS(completions=NS(create=create))))
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def main():
+        before = sched._tok.level
+        out = [d async for d in llm.astream("m1", messages, max_tokens=400)]
+        assert "".join(out) == '{"a": 1}'
+        return before - sched._tok.level
+
+    assert asyncio.run(main()) == pytest.approx(42, abs=5)   # charged the real usage once, not the estimate
+    assert sent["extra_body"]["stream_options"] == {"include_usage": True}
+    assert estimate_tokens(messages, 400) > 42
@@ -0,0 +1,31 @@
+import asyncio
+
+from app.core.startup import Startup
+
+
+def test_phases_and_readiness():
+    s = Startup(require_warm=True)
+    with s.phase("import"):
+        pass
+    assert not s.ready
+    s.mark_started()
+    assert not s.ready            # waits for warm-up
+
+    async def warm():
+        await asyncio.sleep(0)
+
+    def boom():
+        raise RuntimeError("no weights")
+
+    asyncio.run(s.warm_up([("async_step", warm), ("broken", boom), ("sync_step", lambda: None)]))
+    report = s.report()
+    assert s.ready and report["warmed"]
+    assert report["phases"]["warm.broken"]["ok"] is False
+    assert "no weights" in report["phases"]["warm.broken"]["error"]
+    assert report["phases"]["warm.sync_step"]["ok"] and report["phases"]["warm.async_step"]["ok"]
+    assert report["startup_ms"] == report["phases"]["import"]["ms"]
+
+def test_ready_without_warm_up():
+    s = Startup()
+    s.mark_started()
+    assert s.ready and not s.warmed
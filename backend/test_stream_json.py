@@ -0,0 +1,36 @@
+import json
+
+from app.summarize.stream_json import StreamingJSONParser
+
+DOC = {
+    "per_test": [
+        {"test": "Vitamin D", "importance": "Bones {and} \"immunity\"", "range": {"low": 30, "high": 100}},
+        {"test": "Calcium", "why_low": ["diet", "vitamin D: low"]},
+    ],
+    "diet_plan": {"add": ["eggs"], "meals": [{"name": "Salmon", "ingredients": ["salmon", "lemon"]}]},
+    "overall_message": "Mostly fine, see [notes].",
+}
+
+
+def test_emits_watched_objects_as_they_complete():
+    text = "Sure! ```json\n" + json.dumps(DOC, indent=1) + "\n``` Hope this helps {!}"
+    p = StreamingJSONParser(watch=[("per_test",), ("diet_plan", "meals")])
+    seen = []
+    for i, ch in enumerate(text):
+        for path, obj in p.feed(ch):
+            seen.append((path, obj, p.complete))
+    assert [(path, obj) for path, obj, _ in seen] == [
+        (("per_test",), DOC["per_test"][0]),
+        (("per_test",), DOC["per_test"][1]),
+        (("diet_plan", "meals"), DOC["diet_plan"]["meals"][0]),
+    ]
+    assert not any(done for _, _, done in seen)     # all emitted before the document closed
+    assert p.complete and p.document() == DOC
+
+def test_truncated_stream_keeps_finished_entries():
+    text = json.dumps(DOC)
+    cut = text.index('"Calcium"') + 5
+    p = StreamingJSONParser(watch=[("per_test",)])
+    got = p.feed(text[:cut])
+    assert [obj["test"] for _, obj in got] == ["Vitamin D"]
+    assert not p.complete and p.document() is None
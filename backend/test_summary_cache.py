@@ -0,0 +1,39 @@
+from app.summarize.cache import SummaryCache, summary_key
+
+
+def test_key_is_content_addressed():
+    a = [{"test": "Hemoglobin", "status": "low", "value": 6.5}, {"test": "RBC", "status": "low", "value": 1.8}]
+    b = [{"test": "rbc", "status": "low", "value": 2.9}, {"test": "hemoglobin", "status": "low", "value": 9.0}]
+    ctx = {"age": 41, "sex": "Male"}
+    assert summary_key("m", a, ctx) == summary_key("m", b, {"age": 55, "sex": "m"})
+    assert summary_key("m", a, ctx) != summary_key("m", a, {"age": 30, "sex": "male"})
+    assert summary_key("m", a, ctx) != summary_key("other", a, ctx)
+    assert summary_key("m", a, ctx) != summary_key("m", [dict(a[0], status="high"), a[1]], ctx)
+
+def test_tiers_ttl_and_eviction(tmp_path):
+    db = str(tmp_path / "cache.db")
+    cache = SummaryCache(db, ttl=3600, max_memory=1, max_rows=2)
+    cache.put("k1", {"per_test": [1]})
+    cache.put("k2", {"per_test": [2]})
+    assert cache.get("k2") == {"per_test": [2]}          # memory
+    assert cache.get("k1") == {"per_test": [1]}          # disk (memory holds one)
+    assert cache.stats()["hits_memory"] == 1 and cache.stats()["hits_disk"] == 1
+
+    cache.put("k3", {"per_test": [3]})                    # evicts least recently used (k2)
+    fresh = SummaryCache(db, ttl=3600)
+    assert fresh.get("k2") is None and fresh.get("k1") is not None and fresh.get("k3") is not None
+
+    expired = SummaryCache(db, ttl=0)
+    assert expired.get("k1") is None
+    assert expired.stats()["misses"] == 1
+
+def test_put_tracks_rows_without_counting(tmp_path):
+    cache = SummaryCache(str(tmp_path / "cache.db"), ttl=3600, max_memory=0, max_rows=2)
+    seen = []
+    cache._conn().set_trace_callback(seen.append)
+    for key in ("k1", "k1", "k2", "k1", "k3"):
+        cache.put(key, {"per_test": [key]})
+    assert not [q for q in seen if "COUNT(" in q]
+    # re-puts of k1 do not count as new rows: only k3 pushes the table past max_rows
+    assert cache.stats()["evictions"] == 1 and cache._rows == 2
+    assert cache.get("k2") is None and cache.get("k1") is not None
@@ -9,7 +9,9 @@ def reports():
     if not app.storage.user.get(str('token')):
         ui.navigate.to('/login')
         return
-    r = api('/api/reports', 'GET', params={'page': 1, 'page_size': 8})
+    PAGE_SIZE = 8
+    first_params = {'page_size': PAGE_SIZE}
+    r = api('/api/reports', 'GET', params=first_params)
     if not r.ok:
         with ui.column().classes('items-center justify-center min-h-[60vh]'):
             ui.label(f'Failed to load reports: {r.status_code}').classes('text-red-700')
@@ -27,6 +29,8 @@ def reports():
         footer()
         return
     items = data if isinstance(data, list) else (data.get('items') or data.get('reports') or [])
+    # The cursor is only valid for the filters that produced it, so they are kept together
+    next_cursor = {'value': None if isinstance(data, list) else data.get('next_cursor'), 'params': first_params}
     if not items:
         with ui.column().classes('items-center justify-center min-h-[80vh] w-full'):
             with ui.card().classes('rounded-2xl shadow-lg bg-white p-8 flex flex-col items-center w-full'):
@@ -66,38 +70,63 @@ def reports():
                     ui.button('Delete', on_click=do_delete).style('background-color:#dc2626 !important;color:#fff !important;').classes('rounded-full px-4 py-1 font-semibold')
                     ui.button('Go to Reports', on_click=lambda: ui.navigate.to('/reports')).classes('rounded-full px-6 py-2 text-lg font-semibold shadow w-full sm:w-auto').style('background-color:#059669 !important;color:#fff !important;border:none !important;')
             dialog.open()
-        def do_search():
-            q = search_val['value'].strip().lower()
-            def match(it):
-                if q:
-                    if not (q in str(it.get('report_name', '')).lower() or q in str(it.get('name', '')).lower()):
-                        return False
-                return True
-            filtered['value'] = [it for it in items if match(it)]
+        def query_params():
+            # Search and filters run on the server so reports beyond the first page are found too
+            params = {'page_size': PAGE_SIZE}
+            q = search_val['value'].strip()
+            if q:
+                params['q'] = q
+            if sex_val['value'] and sex_val['value'] != 'All':
+                params['sex'] = sex_val['value']
+            a = str(age_val['value'] or '').strip()
+            if a:
+                if not a.isdigit():
+                    ui.notify('Age must be a number', type='warning'); return None
+                params['age_min'] = params['age_max'] = int(a)
+            return params
+        def fetch_reports():
+            nonlocal items
+            params = query_params()
+            if params is None:
+                return
+            r = api('/api/reports', 'GET', params=params)
+            if not r.ok:
+                ui.notify('Failed to search reports', type='warning'); return
+            page = r.json()
+            items = page.get('items') or []
+            filtered['value'] = items[:]
+            next_cursor['value'] = page.get('next_cursor')
+            next_cursor['params'] = params
             render_reports()
+        def reset_cursor(_=None):
+            # Edited filters no longer match the listed page: "Load more" waits for Search/Apply
+            if next_cursor['value']:
+                next_cursor['value'] = None
+                render_reports()
+        def do_search():
+            fetch_reports()
         def do_filter():
-            s = sex_val['value'] or 'All'
-            a = age_val['value'].strip()
-            def match(it):
-                if s != 'All' and (it.get('sex', '').capitalize() != s):
-                    return False
-                if a:
-                    try:
-                        if str(it.get('age', '')).strip() != str(a):
-                            return False
-                    except Exception:
-                        return False
-                return True
-            filtered['value'] = [it for it in items if match(it)]
-            render_reports()
+            fetch_reports()
         with ui.row().classes('items-end gap-4 flex-nowrap').style('border:1px solid #05966933;border-radius:10px;padding:18px 16px 12px 16px;margin-bottom:18px;background:#fff;'):
-            ui.input('Search by name...').bind_value(search_val, 'value').classes('w-full sm:w-64 mb-2 sm:mb-0').style('display:inline-flex;vertical-align:bottom;')
+            ui.input('Search by name or test...', on_change=reset_cursor).bind_value(search_val, 'value').classes('w-full sm:w-64 mb-2 sm:mb-0').style('display:inline-flex;vertical-align:bottom;')
             ui.button('Search', on_click=do_search).classes('rounded-full px-4 py-1 font-semibold w-full sm:w-auto').style('background-color:#059669 !important;color:#fff !important;border:none !important;display:inline-flex;vertical-align:bottom;')
             ui.html('<div class="hidden sm:block" style="width:1px;height:32px;background:#05966922;margin:0 18px;"></div>')
-            ui.select(['All', 'Male', 'Female'], label='Sex').bind_value(sex_val, 'value').classes('w-full sm:w-32 mb-2 sm:mb-0').style('display:inline-flex;vertical-align:bottom;')
-            ui.input('Age').bind_value(age_val, 'value').classes('w-full sm:w-24 mb-2 sm:mb-0').style('display:inline-flex;vertical-align:bottom;')
+            ui.select(['All', 'Male', 'Female'], value='All', label='Sex', on_change=reset_cursor).bind_value(sex_val, 'value').classes('w-full sm:w-32 mb-2 sm:mb-0').style('display:inline-flex;vertical-align:bottom;')
+            ui.input('Age', on_change=reset_cursor).bind_value(age_val, 'value').classes('w-full sm:w-24 mb-2 sm:mb-0').style('display:inline-flex;vertical-align:bottom;')
             ui.button('Apply', on_click=do_filter).classes('rounded-full px-4 py-1 font-semibold w-full sm:w-auto').style('background-color:#059669 !important;color:#fff !important;border:none !important;display:inline-flex;vertical-align:bottom;')
         report_grid = ui.column().classes('w-full')
+        def load_more():
+            nonlocal items
+            if not next_cursor['value']:
+                return
+            r = api('/api/reports', 'GET', params={**next_cursor['params'], 'cursor': next_cursor['value']})
+            if not r.ok:
+                ui.notify('Failed to load more reports', type='warning'); return
+            page = r.json()
+            items = items + (page.get('items') or [])
+            filtered['value'] = filtered['value'] + (page.get('items') or [])
+            next_cursor['value'] = page.get('next_cursor')
+            render_reports()
         def render_reports():
             report_grid.clear()
             if not filtered['value']:
@@ -134,5 +163,8 @@ def reports():
                                         if rid is not None:
                                             ui.button('OPEN', on_click=lambda r=rid: ui.navigate.to(f'/report/{r}')).classes('rounded-full px-5 py-1 font-semibold w-full sm:w-auto').style('background-color:#059669 !important;color:#fff !important;border:none !important;')
                                             ui.button('DELETE', on_click=lambda r=rid: delete_report(r)).classes('rounded-full px-5 py-1 font-semibold w-full sm:w-auto').style('background-color:#dc2626 !important;color:#fff !important;border:none !important;')
+                if next_cursor['value']:
+                    with ui.row().classes('w-full justify-center'):
+                        ui.button('Load more', on_click=load_more).classes('rounded-full px-6 py-2 font-semibold shadow').style('background-color:#fff !important;color:#059669 !important;border:2px solid #059669 !important;')
         render_reports()
     footer()
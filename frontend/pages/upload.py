@@ -1,4 +1,5 @@
-from nicegui import ui, app
+import asyncio
+from nicegui import ui, app, run
 from components.header import header
 from components.footer import footer
 from utils import api
@@ -36,24 +37,47 @@ def upload():
                     ui.button('Choose PDF', on_click=trigger_upload).classes('rounded-full px-6 py-2 text-lg font-semibold shadow').style('background-color:#fff !important;color:#059669 !important;border:2px solid #059669 !important;')
                     if file_name['name']:
                         ui.label(f"Selected: {file_name['name']}").classes('text-sm text-emerald-700 ml-4')
-                def submit():
+                STAGE_LABELS = {
+                    'queued': 'Waiting in queue…',
+                    'running': 'Reading your PDF…',
+                    'parsed': 'Checking values against reference ranges…',
+                    'evaluated': 'Writing your summary and meal plan…',
+                    'summarized': 'Saving your report…',
+                }
+                async def submit():
                     if not (file_bytes['data'] and file_name['name']):
                         ui.notify('Choose a PDF file', type='warning'); return
                     if not report_name.value or not age.value or not sex.value:
                         ui.notify('Fill report name, age, and sex', type='warning'); return
                     files = {'file': (file_name['name'], file_bytes['data'], 'application/pdf')}
                     data  = {'report_name': report_name.value, 'age': age.value, 'sex': sex.value}
-                    r = api('/api/analyze', 'POST', files=files, data=data)
-                    if r.ok:
-                        j = r.json()
-                        rid = (j.get('context') or {}).get('report_id')
-                        ui.notify('Analyzed successfully')
-                        if rid:
-                            ui.navigate.to(f'/report/{rid}')
-                    else:
-                        ui.notify(r.text, type='warning')
+                    r = await run.io_bound(api, '/upload-report', 'POST', files=files, data=data)
+                    if not r.ok:
+                        ui.notify(r.text, type='warning'); return
+                    job_id = r.json().get('job_id')
+                    status_label.set_visibility(True)
+                    # Poll the job instead of holding the request open through parsing and LLM calls
+                    while True:
+                        jr = await run.io_bound(api, f'/api/jobs/{job_id}')
+                        if not jr.ok:
+                            status_label.set_visibility(False)
+                            ui.notify(jr.text, type='warning'); return
+                        job = jr.json()
+                        if job.get('status') == 'done':
+                            status_label.set_visibility(False)
+                            ui.notify('Analyzed successfully')
+                            if job.get('report_id'):
+                                ui.navigate.to(f"/report/{job['report_id']}")
+                            return
+                        if job.get('status') == 'failed':
+                            status_label.set_visibility(False)
+                            ui.notify(f"Analysis failed: {job.get('error')}", type='warning'); return
+                        status_label.set_text(STAGE_LABELS.get(job.get('stage') or job.get('status'), 'Analyzing…'))
+                        await asyncio.sleep(1)
                 with ui.element('div').classes('flex flex-col items-start mt-4 max-w-sm w-full'):
                     ui.button('Upload & Analyze', on_click=submit).classes('w-full rounded-full py-3 text-base font-semibold shadow').style('background-color:#059669 !important;color:#fff !important;border:none !important;')
+                    status_label = ui.label('').classes('text-sm text-emerald-700 mt-2')
+                    status_label.set_visibility(False)
         # Right: Instructions
         with ui.element('div').classes('flex-1 flex flex-col bg-emerald-50 px-8 py-12 items-center justify-center'):
             ui.label('How to Upload a Lab Report').classes('text-2xl font-bold mb-4 text-emerald-800')